@@ -0,0 +1,166 @@
+"""
+Throughput benchmark against a local listener farm.
+
+Builds a block of loopback ports where some are open (listeners that send
+a banner straight away), some are blackholed (listeners whose accept
+queue is full, so SYNs are silently dropped) and the rest are closed, then
+reports ports/second for the old chunked gather scheduler, the
+sliding-window one, and the sliding window with RTT-adaptive timeouts.
+
+With --shards N it instead measures how ShardedScanner scales from 1 to N
+processes, scanning the farm's port block on --hosts loopback addresses.
+
+    python benchmarks/bench_scan.py --ports 2000 --concurrency 500
+    python benchmarks/bench_scan.py --ports 4000 --hosts 8 --shards 8
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from portxcan.async_scanner import AsyncPortScanner  # noqa: E402
+from portxcan.sharding import ShardedScanner  # noqa: E402
+
+
+HOST = "127.0.0.1"
+
+
+# ─── Listener farm ────────────────────────────────
+class ListenerFarm:
+    def __init__(self, base, count, open_every=10, blackhole_every=25):
+        self.base = base
+        self.count = count
+        self.open_every = open_every
+        self.blackhole_every = blackhole_every
+        self.open_ports = []
+        self.blackholed = []
+        self._socks = []
+        self._servers = []
+
+    def _blackhole(self, port):
+        srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        srv.bind((HOST, port))
+        srv.listen(0)
+        self._socks.append(srv)
+        # fill the accept queue; further SYNs are dropped by the kernel
+        for _ in range(3):
+            c = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            c.setblocking(False)
+            c.connect_ex((HOST, port))
+            self._socks.append(c)
+
+    async def _on_client(self, reader, writer):
+        writer.write(b"SSH-2.0-bench\r\n")
+        try:
+            await writer.drain()
+            writer.close()
+        except Exception:
+            pass
+
+    async def start(self):
+        for i in range(self.count):
+            port = self.base + i
+            try:
+                if i % self.open_every == 0:
+                    srv = await asyncio.start_server(self._on_client, HOST, port)
+                    self._servers.append(srv)
+                    self.open_ports.append(port)
+                elif i % self.blackhole_every == 1:
+                    self._blackhole(port)
+                    self.blackholed.append(port)
+            except OSError:
+                pass
+        await asyncio.sleep(0.2)
+
+    def close(self):
+        for srv in self._servers:
+            srv.close()
+        for s in self._socks:
+            s.close()
+
+
+# ─── Schedulers ───────────────────────────────────
+async def chunked_run(scanner, chunk=200):
+    # the scheduler AsyncPortScanner.run used before the sliding window
+    ports = list(scanner.ports)
+    for i in range(0, len(ports), chunk):
+        await asyncio.gather(*[scanner.scan_port(p) for p in ports[i:i + chunk]])
+    return scanner.results
+
+
+async def bench(farm, concurrency, timeout):
+    rows = []
+    # retries are off so every row sends one probe per port
+    for name, runner, adaptive, autotune in (
+        ("chunked-gather", chunked_run, False, False),
+        ("sliding-window", lambda s: s.run(), False, False),
+        ("adaptive-rtt", lambda s: s.run(), True, False),
+        ("aimd-window", lambda s: s.run(), True, True),
+    ):
+        scanner = AsyncPortScanner(
+            HOST, farm.base, farm.base + farm.count - 1,
+            timeout=timeout, concurrency=concurrency, adaptive=adaptive,
+            autotune=autotune, retries=0,
+        )
+        t0 = time.perf_counter()
+        results = await runner(scanner)
+        elapsed = time.perf_counter() - t0
+        rows.append((name, len(results), elapsed, scanner.total / elapsed))
+    return rows
+
+
+async def bench_shards(farm, hosts, max_shards, concurrency, timeout):
+    # closed loopback ports answer at once, so this is CPU-bound per shard
+    targets = [f"127.0.0.{i + 1}" for i in range(hosts)]
+    ports = range(farm.base, farm.base + farm.count)
+    rows = []
+    shards = 1
+    while True:
+        scanner = ShardedScanner(
+            targets, ports, shards=shards,
+            timeout=timeout, concurrency=concurrency,
+        )
+        t0 = time.perf_counter()
+        results = await scanner.run()
+        elapsed = time.perf_counter() - t0
+        rows.append((f"{shards} shard(s)", len(results), elapsed, scanner.total / elapsed))
+        if shards >= max_shards:
+            return rows
+        shards = min(shards * 2, max_shards)
+
+
+async def main(args):
+    farm = ListenerFarm(args.base, args.ports)
+    await farm.start()
+    print(f"ports={farm.count} open={len(farm.open_ports)} "
+          f"blackholed={len(farm.blackholed)} concurrency={args.concurrency} "
+          f"timeout={args.timeout}s")
+    try:
+        if args.shards:
+            rows = await bench_shards(farm, args.hosts, args.shards, args.concurrency, args.timeout)
+        else:
+            rows = await bench(farm, args.concurrency, args.timeout)
+        base = rows[0][3]
+        for name, found, elapsed, rate in rows:
+            print(f"  {name:<16} open={found:<5} {elapsed:7.2f}s  {rate:9.0f} ports/s"
+                  f"  x{rate / base:.2f}")
+    finally:
+        farm.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base", type=int, default=42000)
+    parser.add_argument("--ports", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=1.0)
+    parser.add_argument("--shards", type=int, default=0,
+                        help="benchmark sharded scanning with 1..N processes")
+    parser.add_argument("--hosts", type=int, default=8,
+                        help="loopback addresses to scan with --shards")
+    asyncio.run(main(parser.parse_args()))
@@ -1,6 +1,5 @@
 import asyncio
 import json
-import csv
 import os
 import subprocess
 import sys
@@ -18,10 +17,18 @@ from rich.progress import (
 from rich.text import Text
 from rich.align import Align
 from rich.rule import Rule
-from rich.prompt import Prompt, IntPrompt
+from rich.prompt import Prompt, IntPrompt, Confirm
 from rich import box
 
-from portxcan.async_scanner import AsyncPortScanner
+from portxcan.checkpoint import Checkpoint
+from portxcan.discovery import HostDiscovery
+from portxcan.engine import ScanEngine
+from portxcan.ports import PORT_PROFILES, parse_ports
+from portxcan.sharding import ShardedScanner
+from portxcan.sinks import CsvWriter, NdjsonWriter
+from portxcan.syn_scanner import SynScanner, can_syn_scan
+from portxcan.targets import TargetSet, has_ipv6
+from portxcan.udp_scanner import UdpScanner
 from portxcan.utils import expand_target
 
 # ─── Globals ──────────────────────────────────────
@@ -106,17 +113,15 @@ def show_menu():
 
 
 # ─── Input helpers ────────────────────────────────
-def get_port_range():
+def get_ports():
+    # port lists, ranges and profiles: "22,80,8000-8100", "top-100", "web,databases"
+    console.print(f"  [dim]Profiles: {', '.join(PORT_PROFILES)}[/]")
+    spec = Prompt.ask("  [cyan]Ports[/]", default="top-1000,common", console=console)
     try:
-        start = IntPrompt.ask("  [cyan]Start port[/]", default=1, console=console)
-        end = IntPrompt.ask("  [cyan]End port[/]",   default=1024, console=console)
-        if start < 1 or end > 65535 or start > end:
-            console.print("[red]  ✗ Invalid range (1-65535, start ≤ end)[/]")
-            return get_port_range()
-        return start, end
-    except ValueError:
-        console.print("[red]  ✗ Enter valid numbers[/]")
-        return get_port_range()
+        return spec.strip(), parse_ports(spec)
+    except ValueError as e:
+        console.print(f"[red]  ✗ {e}[/]")
+        return get_ports()
 
 
 # ─── Service colour helper ────────────────────────
@@ -161,12 +166,15 @@ def show_results(results):
         )
         table.add_column("Port",    style="cyan",  justify="right", width=8)
         table.add_column("Service", min_width=14)
+        table.add_column("Product", min_width=14)
         table.add_column("Banner",  style="dim",   ratio=1)
 
         for e in sorted(entries, key=lambda x: x["port"]):
             st = svc_style(e["service"])
             ban = e["banner"] if e["banner"] != "Not disclosed" else "—"
-            table.add_row(str(e["port"]), f"[{st}]{e['service']}[/]", ban)
+            prod = " ".join(filter(None, (e.get("product"), e.get("version")))) or "—"
+            port = f"{e['port']}/udp" if e.get("protocol") == "udp" else str(e["port"])
+            table.add_row(port, f"[{st}]{e['service']}[/]", prod, ban)
 
         console.print(table)
         console.print()
@@ -182,11 +190,9 @@ def export_json(results):
 
 def export_csv(results):
     name = f"portxcan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    with open(name, "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(["host", "port", "service", "banner"])
+    with CsvWriter(name) as writer:
         for r in results:
-            writer.writerow([r["host"], r["port"], r["service"], r["banner"]])
+            writer.write(r)
     console.print(f"  [green]✓[/] Saved → [cyan]{name}[/]")
 
 
@@ -215,8 +221,38 @@ def post_scan_menu(results):
 
 
 # ─── Scan logic ───────────────────────────────────
+def discover_hosts(hosts):
+    with Progress(
+        SpinnerColumn(style="cyan"),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(bar_width=40, complete_style="bright_cyan", finished_style="green"),
+        MofNCompleteColumn(),
+        console=console,
+        transient=True,
+    ) as progress:
+        task = progress.add_task("[cyan]Host discovery[/]", total=len(hosts))
+        discovery = HostDiscovery(
+            hosts,
+            progress_cb=lambda checked, total: progress.update(task, completed=checked),
+        )
+        alive = asyncio.run(discovery.run())
+    console.print(f"  [green]✓[/] {len(alive)} of {len(hosts)} hosts are up")
+    return alive
+
+
 def run_scan(target):
-    start, end = get_port_range()
+    spec, ports = get_ports()
+
+    # half-open scanning needs raw sockets (root / CAP_NET_RAW)
+    modes = ["connect", "syn", "udp"] if can_syn_scan() else ["connect", "udp"]
+    mode = Prompt.ask("  [cyan]Scan type[/]", choices=modes,
+                      default="connect", console=console)
+
+    # results are appended as they are found, so a crash keeps what was seen
+    live = None
+    if Confirm.ask("  [cyan]Stream results to an NDJSON log?[/]", default=False,
+                   console=console):
+        live = NdjsonWriter(f"portxcan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson")
 
     try:
         hosts = expand_target(target)
@@ -224,9 +260,55 @@ def run_scan(target):
         console.print(f"[bold red]  ✗ Error:[/] {e}")
         return
 
+    if mode == "syn" and has_ipv6(hosts):
+        console.print("[bold yellow]  ! SYN scans are IPv4 only[/] (using a connect scan)")
+        mode = "connect"
+
+    # connect scans are checkpointed so an interrupted sweep can resume
+    checkpoint = None
+    if mode == "connect":
+        checkpoint = Checkpoint.for_key(f"{target}|{ports}",
+                                        meta={"target": target, "ports": spec})
+        if checkpoint.is_pending():
+            if not Confirm.ask("  [cyan]Resume the unfinished scan of this target?[/]",
+                               default=True, console=console):
+                checkpoint.remove()
+        elif checkpoint.exists():
+            checkpoint.remove()
+
+    # ranges are mostly empty: find the live hosts first, unless forced. A
+    # resumed scan keeps the hosts found live back then, which is the host
+    # list its checkpoint was written for
+    saved = checkpoint.pending_meta() if checkpoint else None
+    discovered = False
+    if saved and "alive" in saved:
+        hosts = TargetSet(saved["alive"])
+        discovered = True
+        console.print(f"  [green]✓[/] Resuming with the {len(hosts)} live hosts found before")
+    elif len(hosts) > 1 and Confirm.ask("  [cyan]Skip hosts that do not respond?[/]",
+                                        default=True, console=console):
+        hosts = discover_hosts(hosts)
+        discovered = True
+        if not hosts:
+            console.print("[bold yellow]  ! No live hosts found[/] (answer no to scan them all)")
+            return
+    if checkpoint and discovered:
+        checkpoint.meta["alive"] = list(hosts.spans)
+
+    # big connect scans can be split across processes, one per core
+    shards = 1
+    if mode == "connect" and (os.cpu_count() or 1) > 1:
+        shards = IntPrompt.ask("  [cyan]Processes[/]", default=1, console=console)
+        shards = min(max(1, shards), os.cpu_count())
+
+    # caps connection attempts to stay below IDS / conntrack thresholds
+    rate = 0
+    if mode == "connect":
+        rate = IntPrompt.ask("  [cyan]Max connections per second (0 = unlimited)[/]",
+                             default=0, console=console)
+
     console.print()
-    total_ports = len(hosts) * (end - start + 1)
-    results = []
+    total_ports = len(hosts) * len(ports)
     t0 = time.time()
 
     with Progress(
@@ -239,25 +321,61 @@ def run_scan(target):
         console=console,
         transient=False,
     ) as progress:
-        for host in hosts:
-            task = progress.add_task(f"[cyan]{host}[/]", total=end - start + 1)
-
-            def make_cb(t):
-                def _cb(scanned, total):
-                    progress.advance(t)
-                return _cb
-
-            scanner = AsyncPortScanner(
-                target=host,
-                start_port=start,
-                end_port=end,
-                timeout=1,
-                progress_cb=make_cb(task),
-            )
-            host_results = asyncio.run(scanner.run())
-            for r in host_results:
-                r["host"] = host
-                results.append(r)
+        label = hosts[0] if len(hosts) == 1 else f"{len(hosts)} hosts"
+        task = progress.add_task(f"[cyan]{label}[/]", total=total_ports)
+        engine = None
+
+        def _cb(scanned, total):
+            window = getattr(engine, "window", None)
+            if window:
+                progress.update(task, completed=scanned,
+                                description=f"[cyan]{label}[/] [dim]{window} in flight[/]")
+            else:
+                progress.update(task, completed=scanned)
+
+        try:
+            if mode == "syn":
+                engine = SynScanner(
+                    hosts=hosts,
+                    ports=ports,
+                    timeout=1,
+                    progress_cb=_cb,
+                    result_cb=live,
+                )
+                results = engine.run()
+            elif mode == "udp":
+                engine = UdpScanner(
+                    hosts=hosts,
+                    ports=ports,
+                    timeout=1,
+                    progress_cb=_cb,
+                    result_cb=live,
+                )
+                results = asyncio.run(engine.run())
+            else:
+                options = dict(
+                    hosts=hosts,
+                    ports=ports,
+                    timeout=1,
+                    progress_cb=_cb,
+                    result_cb=live,
+                    checkpoint=checkpoint,
+                    rate=rate or None,
+                    # the window shown next to the progress bar adapts
+                    autotune=True,
+                )
+                if shards > 1:
+                    engine = ShardedScanner(shards=shards, **options)
+                else:
+                    engine = ScanEngine(**options)
+                results = asyncio.run(engine.run())
+                checkpoint.remove()
+        finally:
+            if live:
+                live.close()
+
+    if live:
+        console.print(f"  [green]✓[/] Live log → [cyan]{live.filename}[/]")
 
     elapsed = time.time() - t0
     speed = total_ports / elapsed if elapsed > 0 else 0
@@ -273,7 +391,7 @@ def run_scan(target):
     summary.add_column(ratio=1)
     summary.add_row(
         f"[bold]Hosts[/]  [cyan]{len(hosts)}[/]",
-        f"[bold]Ports[/]  [cyan]{start}–{end}[/]",
+        f"[bold]Ports[/]  [cyan]{len(ports)}[/]",
         f"[bold]Open[/]   [green]{len(results)}[/]",
         f"[bold]Time[/]   [yellow]{elapsed:.1f}s[/]",
         f"[bold]Speed[/]  [dim]{speed:.0f} p/s[/]",
@@ -281,6 +399,16 @@ def run_scan(target):
     console.print(Panel(summary, title="[bold]Scan Summary[/]", border_style="blue",
                         box=box.ROUNDED))
 
+    states = getattr(engine, "states", None)
+    if states and (states["closed"] or states["filtered"]):
+        console.print(f"  [dim]{states['closed']} closed • {states['filtered']} filtered"
+                      f"{' • %d errors' % states['error'] if states['error'] else ''}[/]")
+
+    unresolved = getattr(engine, "unresolved", 0)
+    if unresolved:
+        console.print(f"  [yellow]![/] {unresolved} probes could not be sent (out of sockets); "
+                      f"lower the rate or raise [cyan]ulimit -n[/] and scan again")
+
     if results:
         console.print()
         show_results(results)
@@ -304,7 +432,7 @@ def menu():
             run_scan(target.strip())
 
         elif choice == "2":
-            target = Prompt.ask("  [cyan]Enter CIDR (e.g. 192.168.1.0/24)[/]",
+            target = Prompt.ask("  [cyan]Enter CIDRs / ranges / @file (e.g. 192.168.1.0/24 !192.168.1.1)[/]",
                                 console=console)
             run_scan(target.strip())
 
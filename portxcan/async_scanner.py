@@ -1,8 +1,15 @@
-import asyncio
-from portxcan.utils import get_service_name
+from portxcan.banner import grab_banner
+from portxcan.engine import ScanEngine
+from portxcan.states import OPEN
 
 
 class AsyncPortScanner:
+    """
+    Scans the ports of a single target. Probing, retries and reporting are
+    done by a one-host ScanEngine, so results carry the same keys as the
+    engine's, "host" included, and ports are visited in ascending order.
+    """
+
     def __init__(
         self,
         target,
@@ -10,77 +17,113 @@ class AsyncPortScanner:
         end_port,
         timeout=1,
         concurrency=200,
-        progress_cb=None
+        progress_cb=None,
+        adaptive=True,
+        min_timeout=0.1,
+        max_timeout=5.0,
+        grab_banners=True,
+        banner_concurrency=50,
+        banner_timeout=1,
+        active_probes=True,
+        result_cb=None,
+        keep_results=True,
+        rate=None,
+        limiter=None,
+        autotune=False,
+        max_concurrency=None,
+        fit_fds=True,
+        resource_retries=5,
+        retries=1,
+        retry_backoff=2.0,
+        retry_delay=0.1,
+        report=(OPEN,),
+        ports=None
     ):
         self.target = target
         self.start_port = start_port
         self.end_port = end_port
-        self.timeout = timeout
-
-        self.semaphore = asyncio.Semaphore(concurrency)
-        self.results = []
-
-        self.total = end_port - start_port + 1
-        self.scanned = 0
-
-        # optional progress callback (CLI or Web UI)
-        self.progress_cb = progress_cb
-
+        self.banner_timeout = banner_timeout
+        # an explicit port list (e.g. a PortSet) replaces start/end
+        if ports is None:
+            ports = range(start_port, end_port + 1)
+        self.engine = ScanEngine(
+            [target],
+            ports,
+            timeout=timeout,
+            concurrency=concurrency,
+            progress_cb=progress_cb,
+            adaptive=adaptive,
+            min_timeout=min_timeout,
+            max_timeout=max_timeout,
+            grab_banners=grab_banners,
+            banner_concurrency=banner_concurrency,
+            banner_timeout=banner_timeout,
+            active_probes=active_probes,
+            result_cb=result_cb,
+            keep_results=keep_results,
+            randomize=False,
+            rate=rate,
+            limiter=limiter,
+            autotune=autotune,
+            max_concurrency=max_concurrency,
+            fit_fds=fit_fds,
+            resource_retries=resource_retries,
+            retries=retries,
+            retry_backoff=retry_backoff,
+            retry_delay=retry_delay,
+            report=report
+        )
+        self.ports = self.engine.ports
+
+    # ── Engine state ────────────────────────────────
+    @property
+    def results(self):
+        return self.engine.results
+
+    @property
+    def states(self):
+        return self.engine.states
+
+    @property
+    def scanned(self):
+        return self.engine.scanned
+
+    @property
+    def total(self):
+        return self.engine.total
+
+    @property
+    def unresolved(self):
+        return self.engine.unresolved
+
+    @property
+    def concurrency(self):
+        return self.engine.concurrency
+
+    @property
+    def window(self):
+        """Connects currently allowed in flight."""
+        return self.engine.window
+
+    @property
+    def result_cb(self):
+        return self.engine.result_cb
+
+    @result_cb.setter
+    def result_cb(self, cb):
+        self.engine.result_cb = cb
+
+    # ── Scanning ────────────────────────────────────
     async def grab_banner(self, reader):
-        try:
-            data = await asyncio.wait_for(reader.read(1024), timeout=1)
-            banner = data.decode(errors="ignore").strip()
-            return banner if banner else "Not disclosed"
-        except Exception:
-            return "Not disclosed"
+        return await grab_banner(reader, self.banner_timeout)
 
     async def scan_port(self, port):
-        async with self.semaphore:
-            try:
-                reader, writer = await asyncio.wait_for(
-                    asyncio.open_connection(self.target, port),
-                    timeout=self.timeout
-                )
-
-                service = get_service_name(port)
-
-                # record open port immediately
-                entry = {
-                    "port": port,
-                    "service": service,
-                    "banner": "Not disclosed"
-                }
-                self.results.append(entry)
-
-                # banner is optional
-                try:
-                    entry["banner"] = await self.grab_banner(reader)
-                except Exception:
-                    pass
-
-                writer.close()
-                await writer.wait_closed()
-
-            except Exception:
-                # port closed / filtered
-                pass
-
-            finally:
-                self.scanned += 1
-                if self.progress_cb:
-                    try:
-                        self.progress_cb(self.scanned, self.total)
-                    except Exception:
-                        pass
-
+        """Probes one port (retrying it while filtered); returns its state."""
+        return await self.engine.scan_port(self.target, port)
 
     async def run(self):
-        ports = list(range(self.start_port, self.end_port + 1))
-
-        # chunked scheduling prevents FD exhaustion on Windows
-        for i in range(0, len(ports), 200):
-            chunk = ports[i:i + 200]
-            tasks = [self.scan_port(p) for p in chunk]
-            await asyncio.gather(*tasks)
+        return await self.engine.run()
 
-        return self.results
+    def stream(self, maxsize=1000):
+        """Async iterator over results as they are found."""
+        return self.engine.stream(maxsize)
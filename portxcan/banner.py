@@ -0,0 +1,111 @@
+import asyncio
+
+from portxcan.fingerprint import fingerprint
+from portxcan.probes import fallback_probe, match_probe, probe_for_port
+
+
+async def grab_banner(reader, timeout=1):
+    try:
+        data = await asyncio.wait_for(reader.read(1024), timeout=timeout)
+        banner = data.decode(errors="ignore").strip()
+        return banner if banner else "Not disclosed"
+    except Exception:
+        return "Not disclosed"
+
+
+async def send_probe(probe, reader, writer, timeout=1):
+    try:
+        host = writer.get_extra_info("peername")[0]
+        writer.write(probe.request(host))
+        await writer.drain()
+        data = await asyncio.wait_for(reader.read(4096), timeout=timeout)
+    except Exception:
+        return "Not disclosed"
+    banner = match_probe(probe, data)
+    if banner:
+        return banner
+    banner = data.decode(errors="ignore").strip()
+    return banner if banner else "Not disclosed"
+
+
+async def identify(reader, writer, port, timeout=1):
+    """
+    Known silent services (HTTP, TLS, Redis, ...) are probed right away;
+    everything else is read passively first and only falls back to one
+    probe if the server stays quiet, so identification costs at most one
+    extra round trip.
+    """
+    probe = probe_for_port(port)
+    if probe is None:
+        banner = await grab_banner(reader, timeout)
+        if banner != "Not disclosed":
+            return banner
+        probe = fallback_probe(port)
+    return await send_probe(probe, reader, writer, timeout)
+
+
+async def close_writer(writer):
+    try:
+        writer.close()
+        await writer.wait_closed()
+    except Exception:
+        pass
+
+
+class BannerStage:
+    """
+    Second pipeline stage: discovery hands over already-connected streams
+    through a bounded queue and returns its connect slot immediately,
+    while a separate pool of `concurrency` workers reads banners with
+    their own timeout. The queue bound doubles as backpressure, capping
+    how many open sockets can wait for a banner worker.
+    """
+
+    def __init__(self, concurrency=50, timeout=1, probes=True, done_cb=None):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.probes = probes
+        # awaited with each finished entry
+        self.done_cb = done_cb
+        self.queue = None
+        self._workers = []
+
+    def start(self):
+        self.queue = asyncio.Queue(maxsize=self.concurrency)
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(self.concurrency)
+        ]
+
+    async def submit(self, entry, reader, writer):
+        if self.queue is None:
+            # stage not running (scan_port called on its own): read inline
+            await self._grab(entry, reader, writer)
+            return
+        await self.queue.put((entry, reader, writer))
+
+    async def _grab(self, entry, reader, writer):
+        try:
+            if self.probes:
+                entry["banner"] = await identify(reader, writer, entry["port"], self.timeout)
+            else:
+                entry["banner"] = await grab_banner(reader, self.timeout)
+            fingerprint(entry)
+        finally:
+            await close_writer(writer)
+        if self.done_cb:
+            await self.done_cb(entry)
+
+    async def _worker(self):
+        while True:
+            item = await self.queue.get()
+            if item is None:
+                return
+            await self._grab(*item)
+
+    async def close(self):
+        for _ in self._workers:
+            await self.queue.put(None)
+        await asyncio.gather(*self._workers)
+        self._workers = []
+        self.queue = None
@@ -0,0 +1,220 @@
+import glob
+import hashlib
+import json
+import os
+import time
+
+from portxcan.sinks import NdjsonWriter
+
+
+CHECKPOINT_DIR = os.path.join(".portxcan", "checkpoints")
+
+
+def job_signature(hosts, ports, shard=None, order=None):
+    """Identifies a scan by its exact work list, so a resume never mixes jobs."""
+    h = hashlib.sha1()
+    if shard:
+        h.update(f"shard {shard[0]}/{shard[1]}|".encode())
+    if order:
+        h.update(f"order {order}|".encode())
+    spans = getattr(hosts, "spans", None)
+    if spans is not None:
+        # a TargetSet is identified by its ranges, not its expansion
+        h.update(repr(spans).encode())
+    else:
+        for host in hosts:
+            h.update(host.encode())
+            h.update(b"\0")
+    h.update(b"|")
+    for port in ports:
+        h.update(port.to_bytes(2, "big"))
+    return h.hexdigest()
+
+
+class Frontier:
+    """
+    Set of completed work indices, stored as a low watermark (everything
+    below it is done) plus the sparse set of finished indices above it.
+    With a sliding-window scheduler the sparse part never grows much past
+    the concurrency limit, so the frontier stays tiny at any scan size.
+    It also remembers the permutation step each unfinished index was
+    taken at, so a resume can restart the walk at the watermark.
+    """
+
+    def __init__(self, watermark=0, done=(), step=None):
+        self.watermark = watermark
+        self.done = set(done)
+        self.count = watermark + len(self.done)
+        self.steps = {}
+        # step of the next index the walk will reach; unknown (None) for
+        # a frontier saved without one, which is then walked from step 0
+        self.next_step = 0 if step is None and watermark == 0 else step
+
+    @property
+    def step(self):
+        """Walk step of the watermark, or None if unknown."""
+        return self.steps.get(self.watermark, self.next_step)
+
+    def visit(self, index, step):
+        """Notes that the walk reached `index` at `step`."""
+        if not self.is_done(index):
+            self.steps[index] = step
+        self.next_step = step + 1
+
+    def finish(self, index):
+        self.steps.pop(index, None)
+        if self.is_done(index):
+            return
+        self.done.add(index)
+        self.count += 1
+        while self.watermark in self.done:
+            self.done.remove(self.watermark)
+            self.watermark += 1
+
+    def is_done(self, index):
+        return index < self.watermark or index in self.done
+
+
+class Checkpoint:
+    """
+    On-disk scan state: a small JSON frontier rewritten atomically every
+    `interval` seconds, plus an append-only NDJSON file of results found
+    so far. `meta` holds whatever the caller needs to restart the scan
+    (target, port range, ...).
+    """
+
+    def __init__(self, path, meta=None, interval=5.0):
+        self.path = path
+        self.results_path = path + ".results.ndjson"
+        self.meta = meta or {}
+        self.interval = interval
+        self.signature = None
+        self.frontier = Frontier()
+        self.complete = False
+        self._writer = None
+        self._last_save = time.monotonic()
+
+    @classmethod
+    def for_key(cls, key, meta=None, interval=5.0, directory=CHECKPOINT_DIR):
+        name = hashlib.sha1(key.encode()).hexdigest()[:16]
+        return cls(os.path.join(directory, name + ".json"), meta, interval)
+
+    def shard(self, k, n):
+        """Checkpoint for shard k of n, stored next to this one."""
+        return Checkpoint(f"{self.path}.{k}-of-{n}", self.meta, self.interval)
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def pending_meta(self):
+        """The meta of an unfinished scan checkpointed at this path, or None."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("complete", False):
+            return None
+        return data.get("meta", {})
+
+    def is_pending(self):
+        """True if an unfinished scan was checkpointed at this path."""
+        return self.pending_meta() is not None
+
+    def load(self, signature):
+        """
+        Restores the frontier if the file belongs to the same job. Otherwise
+        the results file left next to it is another job's, and is dropped
+        so they are never replayed into this one.
+        """
+        self.signature = signature
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        if not data or data.get("signature") != signature:
+            self._drop_results()
+            return False
+        self.frontier = Frontier(data.get("watermark", 0), data.get("done", []), data.get("step"))
+        self.complete = data.get("complete", False)
+        self.meta = data.get("meta", self.meta)
+        return True
+
+    def _drop_results(self):
+        self.close()
+        try:
+            os.remove(self.results_path)
+        except FileNotFoundError:
+            pass
+
+    def saved_results(self):
+        if not os.path.exists(self.results_path):
+            return
+        with open(self.results_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # torn last line from a crash
+                    continue
+
+    def record(self, entry):
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._writer = NdjsonWriter(self.results_path, flush_every=1)
+        self._writer.write(entry)
+
+    def finish(self, index):
+        self.frontier.finish(index)
+        if time.monotonic() - self._last_save >= self.interval:
+            self.save()
+
+    def save(self, complete=False):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.complete = complete
+        data = {
+            "signature": self.signature,
+            "meta": self.meta,
+            "watermark": self.frontier.watermark,
+            "done": sorted(self.frontier.done),
+            "step": self.frontier.step,
+            "complete": complete,
+        }
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+        self._last_save = time.monotonic()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def remove(self):
+        self.close()
+        shards = glob.glob(glob.escape(self.path) + ".*-of-*")
+        for p in [self.path, self.results_path] + shards:
+            try:
+                os.remove(p)
+            except FileNotFoundError:
+                pass
+
+
+def pending_checkpoints(directory=CHECKPOINT_DIR):
+    """Checkpoints of scans that never completed."""
+    if not os.path.isdir(directory):
+        return
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        ckpt = Checkpoint(os.path.join(directory, name))
+        try:
+            with open(ckpt.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not data.get("complete"):
+            ckpt.meta = data.get("meta", {})
+            yield ckpt
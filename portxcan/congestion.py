@@ -0,0 +1,154 @@
+import asyncio
+import collections
+import errno
+import threading
+
+
+OK = "ok"
+TIMEOUT = "timeout"
+EXHAUSTED = "exhausted"
+
+# an autotuned window may grow to this many times its starting size
+AUTOTUNE_HEADROOM = 4
+
+# local resource errors: the kernel is out of sockets/buffers, not the target
+RESOURCE_ERRNOS = {errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.ENOMEM, errno.EADDRNOTAVAIL}
+
+
+def classify(exc):
+    """Maps a failed connect to an outcome: TIMEOUT, EXHAUSTED or OK."""
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError)):
+        return TIMEOUT
+    if isinstance(exc, OSError) and exc.errno in RESOURCE_ERRNOS:
+        return EXHAUSTED
+    # refused, unreachable, ...: the network answered
+    return OK
+
+
+def classify_errno(rc):
+    """Same for the return code of socket.connect_ex()."""
+    if rc in RESOURCE_ERRNOS:
+        return EXHAUSTED
+    if rc in (errno.EAGAIN, errno.EWOULDBLOCK, errno.ETIMEDOUT, errno.EINPROGRESS):
+        return TIMEOUT
+    return OK
+
+
+class AimdController:
+    """
+    AIMD control of the number of probes in flight, in the style of TCP
+    congestion control. Every answered probe grows the window: by one
+    while below `ssthresh` (slow start), by 1/window otherwise. The
+    window halves when the share of timeouts in an epoch (one window's
+    worth of probes) climbs clearly above its running baseline, or when
+    connects fail for lack of local resources (EMFILE, ENOBUFS, ...).
+    There is at most one cut per epoch, so one burst of losses cannot
+    collapse the window.
+    """
+
+    def __init__(self, initial=32, minimum=4, maximum=500, loss_margin=0.2):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.window = float(min(max(initial, self.minimum), self.maximum))
+        self.ssthresh = float(self.maximum)
+        self.loss_margin = loss_margin
+
+        self._epoch = 0
+        self._timeouts = 0
+        self._since_cut = self.limit  # the first cut needs no wait
+        self._baseline = None
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self):
+        return int(self.window)
+
+    def update(self, outcome):
+        with self._lock:
+            self._epoch += 1
+            self._since_cut += 1
+            if outcome == OK:
+                if self.window < self.ssthresh:
+                    self.window += 1
+                else:
+                    self.window += 1 / self.window
+                self.window = min(self.window, self.maximum)
+            elif outcome == TIMEOUT:
+                self._timeouts += 1
+            elif outcome == EXHAUSTED:
+                self._cut()
+
+            if self._epoch >= max(16, self.limit):
+                ratio = self._timeouts / self._epoch
+                self._epoch = self._timeouts = 0
+                if self._baseline is not None and ratio > self._baseline + self.loss_margin:
+                    self._cut()
+                # the baseline follows slowly, so a spike stands out
+                if self._baseline is None:
+                    self._baseline = ratio
+                else:
+                    self._baseline = 0.9 * self._baseline + 0.1 * ratio
+
+    def _cut(self):
+        if self._since_cut < self.limit:
+            return
+        self._since_cut = 0
+        self.window = max(self.minimum, self.window / 2)
+        self.ssthresh = self.window
+
+
+class WindowGate:
+    """Async admission gate that keeps in-flight probes under the window."""
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.in_flight = 0
+        self._waiters = collections.deque()
+
+    async def acquire(self):
+        if self.in_flight < self.controller.limit and not self._waiters:
+            self.in_flight += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # the slot was granted just before the cancel
+                self.release(None)
+            else:
+                self._waiters.remove(fut)
+            raise
+
+    def release(self, outcome):
+        self.in_flight -= 1
+        if outcome is not None:
+            self.controller.update(outcome)
+        while self._waiters and self.in_flight < self.controller.limit:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                self.in_flight += 1
+                fut.set_result(None)
+
+
+class ThreadGate:
+    """Blocking counterpart of WindowGate for threaded scanners."""
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= self.controller.limit:
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, outcome):
+        if outcome is not None:
+            self.controller.update(outcome)
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
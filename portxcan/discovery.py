@@ -0,0 +1,241 @@
+import asyncio
+import ipaddress
+import os
+import socket
+import struct
+import threading
+import time
+
+from portxcan.banner import close_writer
+from portxcan.fdlimit import fit_concurrency
+from portxcan.scheduler import run_bounded
+from portxcan.syn_scanner import checksum
+from portxcan.targets import TargetSet, as_sequence
+
+
+# ports that answer (SYN-ACK or RST) on most live machines
+DISCOVERY_PORTS = (80, 443, 22, 445, 3389, 139)
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+ICMPV6_ECHO_REQUEST = 128
+ICMPV6_ECHO_REPLY = 129
+
+
+# ─── Neighbour table ──────────────────────────────
+def neighbour_table(path="/proc/net/arp"):
+    """
+    Addresses with a complete ARP entry. Only a hint: an entry means the
+    host answered recently on a local subnet, a missing one means nothing.
+    Empty where the table cannot be read (non-Linux).
+    """
+    found = set()
+    try:
+        with open(path, encoding="ascii") as f:
+            next(f, None)  # header
+            for line in f:
+                fields = line.split()
+                # flags 0x2 (ATF_COM): the MAC address was resolved
+                if len(fields) >= 4 and int(fields[2], 16) & 0x2:
+                    found.add(fields[0])
+    except (OSError, ValueError):
+        pass
+    return found
+
+
+# ─── ICMP echo ────────────────────────────────────
+def _icmp_socket(family=socket.AF_INET):
+    """(socket, raw) for sending echo requests, or (None, False) if not allowed."""
+    proto = socket.IPPROTO_ICMPV6 if family == socket.AF_INET6 else socket.IPPROTO_ICMP
+    try:
+        # unprivileged "ping" socket, see net.ipv4.ping_group_range
+        return socket.socket(family, socket.SOCK_DGRAM, proto), False
+    except OSError:
+        pass
+    try:
+        return socket.socket(family, socket.SOCK_RAW, proto), True
+    except OSError:
+        return None, False
+
+
+def _echo_request(ident, seq, family=socket.AF_INET):
+    payload = b"portxcan"
+    if family == socket.AF_INET6:
+        # the kernel fills in ICMPv6 checksums, they cover the IPv6 header
+        return struct.pack("!BBHHH", ICMPV6_ECHO_REQUEST, 0, 0, ident, seq) + payload
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    csum = checksum(header + payload)
+    return header[:2] + struct.pack("!H", csum) + header[4:] + payload
+
+
+def _receive(sock, raw, family, ident, found, done):
+    reply = ICMPV6_ECHO_REPLY if family == socket.AF_INET6 else ICMP_ECHO_REPLY
+    sock.settimeout(0.2)
+    while not done.is_set():
+        try:
+            data, addr = sock.recvfrom(1024)
+        except socket.timeout:
+            continue
+        except OSError:
+            break
+        if raw:
+            # raw sockets see every echo reply on the box, IPv4 ones with
+            # the IP header in front
+            if family == socket.AF_INET:
+                data = data[(data[0] & 0x0F) * 4:]
+            if len(data) < 8 or struct.unpack("!H", data[4:6])[0] != ident:
+                continue
+        if len(data) >= 8 and data[0] == reply:
+            found.add(addr[0].split("%", 1)[0])
+
+
+def icmp_sweep(hosts, timeout=1, rate=5000, found=None):
+    """
+    Sends one echo request to every host, from a single socket per address
+    family (ICMPv6 for IPv6 hosts), and collects the replies for `timeout`
+    seconds after the last one. Returns the set of hosts that answered, or
+    None when ICMP sockets are not permitted.
+    """
+    found = set() if found is None else found
+    ident = os.getpid() & 0xFFFF
+    done = threading.Event()
+    sockets = {}
+    threads = []
+
+    def socket_for(family):
+        if family not in sockets:
+            sock, raw = _icmp_socket(family)
+            sockets[family] = sock
+            if sock is not None:
+                rx = threading.Thread(target=_receive, daemon=True,
+                                      args=(sock, raw, family, ident, found, done))
+                rx.start()
+                threads.append(rx)
+        return sockets[family]
+
+    interval = 1.0 / rate if rate else 0
+    next_send = time.perf_counter()
+    try:
+        for seq, host in enumerate(hosts):
+            if host in found:
+                continue
+            family = socket.AF_INET6 if ":" in host else socket.AF_INET
+            sock = socket_for(family)
+            if sock is None:
+                continue
+            if interval:
+                delay = next_send - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                next_send = max(next_send, time.perf_counter() - 1) + interval
+            try:
+                sock.sendto(_echo_request(ident, seq & 0xFFFF, family), (host, 0))
+            except OSError:
+                pass
+        if threads:
+            time.sleep(timeout)
+    finally:
+        done.set()
+        for rx in threads:
+            rx.join()
+        for sock in sockets.values():
+            if sock is not None:
+                sock.close()
+    if sockets and not threads:
+        return None
+    return found
+
+
+# ─── TCP ──────────────────────────────────────────
+async def tcp_alive(host, ports=DISCOVERY_PORTS, timeout=1):
+    """True as soon as any of `ports` answers, with a SYN-ACK or an RST."""
+
+    async def knock(port):
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        except ConnectionRefusedError:
+            return True
+        except (asyncio.TimeoutError, OSError):
+            # timeouts, but also EHOSTUNREACH after a failed ARP lookup
+            return False
+        await close_writer(writer)
+        return True
+
+    tasks = [asyncio.create_task(knock(port)) for port in ports]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            if await fut:
+                return True
+        return False
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class HostDiscovery:
+    """
+    Finds the live hosts of a target set before a port scan. Hosts with a
+    neighbour-table entry are taken as live, the rest get one ICMP echo
+    (if the process may send it) and the silent remainder TCP probes to a
+    few common ports. Each stage only handles the hosts the previous ones
+    could not confirm, and runs across all of them concurrently. The live
+    hosts come back as a TargetSet, so neighbouring ones share a range.
+    """
+
+    def __init__(self, hosts, ports=DISCOVERY_PORTS, timeout=1, concurrency=500,
+                 icmp=True, icmp_rate=5000, neighbours=True, progress_cb=None):
+        self.hosts = as_sequence(hosts)
+        self.ports = ports
+        self.timeout = timeout
+        # every host in flight holds one socket per discovery port
+        self.concurrency = max(1, fit_concurrency(concurrency) // max(1, len(ports)))
+        self.icmp = icmp
+        self.icmp_rate = icmp_rate
+        self.neighbours = neighbours
+        self.progress_cb = progress_cb
+
+        self.alive = TargetSet()
+        self.checked = 0
+        self.total = len(self.hosts)
+        self._found = set()
+
+    def _progress(self):
+        if self.progress_cb:
+            try:
+                self.progress_cb(self.checked, self.total)
+            except Exception:
+                pass
+
+    async def _check(self, host):
+        try:
+            if host not in self._found and await tcp_alive(host, self.ports, self.timeout):
+                self._found.add(host)
+        finally:
+            self.checked += 1
+            self._progress()
+
+    async def run(self):
+        if self.neighbours:
+            self._found |= neighbour_table()
+        if self.icmp:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                None, icmp_sweep, self.hosts, self.timeout, self.icmp_rate, self._found
+            )
+        await run_bounded(self.hosts, self._check, min(self.concurrency, self.total))
+        # neighbour entries outside the set drop out; a run of live hosts
+        # in address order becomes one span
+        spans = []
+        for host in self.hosts:
+            if host not in self._found:
+                continue
+            ip = ipaddress.ip_address(host)
+            n = int(ip)
+            if spans and spans[-1][0] == ip.version and spans[-1][2] == n - 1:
+                spans[-1][2] = n
+            else:
+                spans.append([ip.version, n, n])
+        self._found.clear()
+        self.alive = TargetSet(tuple(span) for span in spans)
+        return self.alive
@@ -0,0 +1,418 @@
+import asyncio
+import time
+from collections import OrderedDict
+from portxcan.banner import BannerStage, close_writer
+from portxcan.checkpoint import job_signature
+from portxcan.congestion import (
+    AUTOTUNE_HEADROOM, EXHAUSTED, OK, TIMEOUT, AimdController, WindowGate, classify
+)
+from portxcan.fdlimit import fit_concurrency
+from portxcan.permute import CyclicPermutation
+from portxcan.ratelimit import RateLimiter
+from portxcan.rtt import RttEstimator
+from portxcan.scheduler import run_bounded
+from portxcan.sinks import call_result_cb, stream_results
+from portxcan.states import CLOSED, ERROR, FILTERED, OPEN, STATES, port_entry, state_of
+from portxcan.targets import as_sequence
+from portxcan.utils import get_service_name
+
+
+class ScanEngine:
+    """
+    Scans the whole (host, port) cross-product of a target set on one
+    event loop, under a single global concurrency budget and an optional
+    per-host cap.
+    """
+
+    def __init__(
+        self,
+        hosts,
+        ports,
+        timeout=1,
+        concurrency=500,
+        per_host=None,
+        progress_cb=None,
+        adaptive=True,
+        min_timeout=0.1,
+        max_timeout=5.0,
+        grab_banners=True,
+        banner_concurrency=50,
+        banner_timeout=1,
+        active_probes=True,
+        result_cb=None,
+        keep_results=True,
+        checkpoint=None,
+        shard=None,
+        randomize=True,
+        seed=None,
+        rate=None,
+        host_rate=None,
+        limiter=None,
+        autotune=False,
+        max_concurrency=None,
+        fit_fds=True,
+        resource_retries=5,
+        retries=1,
+        retry_backoff=2.0,
+        retry_delay=0.1,
+        rtt_hosts=4096,
+        report=(OPEN,)
+    ):
+        self.hosts = as_sequence(hosts)
+        self.ports = as_sequence(ports)
+        self.timeout = timeout
+        self.per_host = per_host
+
+        # with autotune an AIMD window decides how many connects are in
+        # flight: it starts at `concurrency`, halves when timeouts spike or
+        # sockets run out, and grows while probes are answered, up to
+        # `max_concurrency` (default: AUTOTUNE_HEADROOM times concurrency)
+        ceiling = concurrency
+        if autotune:
+            ceiling = max(concurrency, max_concurrency or AUTOTUNE_HEADROOM * concurrency)
+
+        # every connect and every open port waiting for a banner holds a
+        # descriptor; fit_fds raises RLIMIT_NOFILE if it can and otherwise
+        # lowers the ceiling until both fit
+        if fit_fds:
+            held = 2 * banner_concurrency if grab_banners else 0
+            ceiling = fit_concurrency(ceiling, held)
+        self.concurrency = min(concurrency, ceiling)
+        self.max_concurrency = ceiling
+
+        # a connect failing with EMFILE/ENOBUFS says nothing about the
+        # port: it is retried after a pause, and counted as unresolved
+        # (never as closed) if the host stays out of sockets
+        self.resource_retries = resource_retries
+        self.unresolved = 0
+
+        self.congestion = AimdController(self.concurrency, maximum=ceiling) if autotune else None
+        self._gate = WindowGate(self.congestion) if autotune else None
+
+        # per-host connect timeouts derived from measured RTT. Only the
+        # `rtt_hosts` most recently answering hosts keep an estimator;
+        # others (not yet answered, or evicted) use one fed by every host,
+        # which starts at `timeout`
+        self.adaptive = adaptive
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.rtt_hosts = rtt_hosts
+        self._rtt = OrderedDict()
+        self._global_rtt = RttEstimator(timeout, min_timeout, max_timeout)
+
+        # connection attempts/s, globally and per host; pass `limiter` to
+        # share one portxcan.ratelimit.RateLimiter between engines
+        self.limiter = limiter
+        if limiter is None and (rate or host_rate):
+            self.limiter = RateLimiter(rate, host_rate)
+
+        # banners are read by a separate stage so slow services never hold
+        # a connect slot; grab_banners=False is discovery-only
+        self.banners = BannerStage(
+            banner_concurrency, banner_timeout, active_probes, self.emit
+        ) if grab_banners else None
+
+        # finished results are handed to result_cb as they are found;
+        # keep_results=False stops them piling up in self.results
+        self.results = []
+        self.result_cb = result_cb
+        self.keep_results = keep_results
+
+        # every probe ends open, closed, filtered or error (see
+        # portxcan.states); `report` picks the states that become results
+        # and `states` counts them all
+        self.report = set(report)
+        self.states = dict.fromkeys(STATES, 0)
+
+        # filtered pairs are probed again, up to `retries` times, by the
+        # task that found them: nothing waits in memory for a later pass.
+        # Each retry pauses `retry_delay`, then `retry_backoff` times
+        # longer every time, and stretches the connect timeout alike
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.retry_delay = retry_delay
+
+        # (k, n) restricts this engine to every n-th pair starting at k,
+        # so n engines in separate processes split one scan between them;
+        # each visits its own pairs in a permutation of their own
+        self.shard = shard
+        self.total = len(self.hosts) * len(self.ports)
+        if shard:
+            self.total = len(range(shard[0], self.total, shard[1]))
+        self.scanned = 0
+
+        # pairs are visited in a pseudo-random permutation so consecutive
+        # probes spread over hosts and ports; the default seed is derived
+        # from the job, so shards and resumed runs agree on the order
+        self.randomize = randomize
+        if randomize and seed is None:
+            seed = int(job_signature(self.hosts, self.ports)[:16], 16)
+        self.seed = seed
+
+        # optional progress callback (CLI or Web UI)
+        self.progress_cb = progress_cb
+
+        self._host_slots = {}
+
+        # optional portxcan.checkpoint.Checkpoint for resumable scans; open
+        # ports waiting on the banner stage are only marked done once
+        # their result has been recorded
+        self.checkpoint = checkpoint
+        self._pending = {}
+        self._restored = set()
+
+    def _order(self, step=0):
+        # (step, pair) from `step` on. A shard permutes only its own pairs,
+        # k, k + n, k + 2n, ..., so its cost does not grow with the number
+        # of shards
+        k, n = self.shard or (0, 1)
+        if self.randomize:
+            order = CyclicPermutation(self.total, self.seed).walk(step)
+        else:
+            order = ((j, j) for j in range(step, self.total))
+        return ((s, k + j * n) for s, j in order)
+
+    def _pair(self, i):
+        # pair i is (ports[i // hosts], hosts[i % hosts]), i.e. port-major
+        nhosts = len(self.hosts)
+        return self.hosts[i % nhosts], self.ports[i // nhosts]
+
+    def _pairs(self):
+        # yields (index, pair); indices count this shard's pairs only, so
+        # its checkpoint frontier stays contiguous. A resume restarts the
+        # walk at the watermark's step instead of skipping up to it
+        frontier = self.checkpoint.frontier if self.checkpoint else None
+        index, step = 0, 0
+        if frontier and frontier.step is not None:
+            index, step = frontier.watermark, frontier.step
+        for step, i in self._order(step):
+            if frontier:
+                frontier.visit(index, step)
+            if not (frontier and frontier.is_done(index)):
+                yield index, i
+            index += 1
+
+    def _host_slot(self, host):
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = asyncio.Semaphore(self.per_host)
+            self._host_slots[host] = slot
+        return slot
+
+    def rtt(self, host):
+        est = self._rtt.get(host)
+        if est is None:
+            return self._global_rtt
+        self._rtt.move_to_end(host)
+        return est
+
+    def _sample_rtt(self, host, sample):
+        self._global_rtt.update(sample)
+        est = self._rtt.get(host)
+        if est is None:
+            est = RttEstimator(self.timeout, self.min_timeout, self.max_timeout)
+            self._rtt[host] = est
+            if len(self._rtt) > self.rtt_hosts:
+                self._rtt.popitem(last=False)
+        else:
+            self._rtt.move_to_end(host)
+        est.update(sample)
+
+    def connect_timeout(self, host, scale=1.0):
+        if not self.adaptive:
+            return self.timeout * scale
+        return self.rtt(host).timeout() * scale
+
+    @property
+    def window(self):
+        """Connects currently allowed in flight."""
+        if self.congestion:
+            return self.congestion.limit
+        return self.concurrency
+
+    async def _connect(self, host, port, scale=1.0):
+        """(state, (reader, writer) or None); state is None if out of sockets."""
+        if self.limiter:
+            await self.limiter.acquire(host)
+        if self._gate:
+            await self._gate.acquire()
+        outcome = None
+        t0 = time.perf_counter()
+        try:
+            opened = await asyncio.wait_for(
+                asyncio.open_connection(host, port),
+                timeout=self.connect_timeout(host, scale)
+            )
+        except ConnectionRefusedError:
+            # an RST is still a round trip worth measuring
+            self._sample_rtt(host, time.perf_counter() - t0)
+            self._record(True)
+            outcome = OK
+            return CLOSED, None
+        except asyncio.TimeoutError:
+            self._record(False)
+            outcome = TIMEOUT
+            return FILTERED, None
+        except Exception as e:
+            outcome = classify(e)
+            if outcome == EXHAUSTED:
+                return None, None
+            return state_of(e), None
+        else:
+            outcome = OK
+        finally:
+            # the window only covers the connect, not the banner stage
+            if self._gate:
+                self._gate.release(outcome)
+
+        self._sample_rtt(host, time.perf_counter() - t0)
+        self._record(True)
+        return OPEN, opened
+
+    async def probe(self, host, port, index=None, scale=1.0):
+        """
+        Returns the port's state, or None if no socket could be had.
+        `scale` stretches the connect timeout, for retries.
+        """
+        state, streams = await self._connect(host, port, scale)
+        delay = 0.05
+        for _ in range(self.resource_retries):
+            if state is not None:
+                break
+            # give sockets in TIME_WAIT / banner reads a moment to close
+            await asyncio.sleep(delay)
+            delay = min(1.0, delay * 2)
+            state, streams = await self._connect(host, port, scale)
+        if state is None:
+            self.unresolved += 1
+            return None
+        if state != OPEN:
+            return state
+        reader, writer = streams
+
+        entry = port_entry(host, port, OPEN, get_service_name(port))
+
+        if index is not None:
+            self._pending[(host, port)] = index
+
+        if self.banners:
+            await self.banners.submit(entry, reader, writer)
+        else:
+            await close_writer(writer)
+            await self.emit(entry)
+        return OPEN
+
+    def _record(self, answered):
+        if self.limiter:
+            self.limiter.record(answered)
+
+    async def _deliver(self, entry):
+        if self.keep_results:
+            self.results.append(entry)
+        try:
+            await call_result_cb(self.result_cb, entry)
+        except Exception:
+            pass
+
+    async def emit(self, entry):
+        key = (entry["host"], entry["port"])
+        if key not in self._restored:
+            if self.checkpoint:
+                self.checkpoint.record(entry)
+            await self._deliver(entry)
+        index = self._pending.pop(key, None)
+        if index is not None:
+            self.checkpoint.finish(index)
+
+    async def _report_state(self, host, port, state):
+        if state != OPEN and state in self.report:
+            await self.emit(port_entry(host, port, state, get_service_name(port)))
+
+    async def _probe(self, host, port, index=None, scale=1.0):
+        if self.per_host:
+            async with self._host_slot(host):
+                return await self.probe(host, port, index, scale)
+        return await self.probe(host, port, index, scale)
+
+    async def scan_port(self, host, port, index=None):
+        """
+        Probes one pair, retrying it while it stays filtered; returns its
+        state (None if unresolved).
+        """
+        try:
+            state = await self._probe(host, port, index)
+            delay, scale = self.retry_delay, 1.0
+            for _ in range(self.retries):
+                if state != FILTERED:
+                    break
+                await asyncio.sleep(delay)
+                delay *= self.retry_backoff
+                scale *= self.retry_backoff
+                # a retry that runs out of sockets leaves the port filtered
+                state = await self._probe(host, port, index, scale) or FILTERED
+            self.states[state or ERROR] += 1
+            await self._report_state(host, port, state or ERROR)
+            # unresolved pairs are counted as errors and finished too, or
+            # the frontier's watermark would stall behind them; cancelled
+            # probes never get here and are redone on resume. Open ones
+            # are finished by emit() once their banner is in
+            if index is not None and state != OPEN:
+                self.checkpoint.finish(index)
+            return state
+        finally:
+            # counted once its retries are over, so progress includes them
+            self.scanned += 1
+            self._progress()
+
+    async def _scan_pair(self, item):
+        index, i = item
+        host, port = self._pair(i)
+        await self.scan_port(host, port, index if self.checkpoint else None)
+
+    def _progress(self):
+        if self.progress_cb:
+            try:
+                self.progress_cb(self.scanned, self.total)
+            except Exception:
+                pass
+
+    async def _resume(self):
+        ckpt = self.checkpoint
+        order = f"permuted {self.seed}" if self.randomize else None
+        if not ckpt.load(job_signature(self.hosts, self.ports, self.shard, order)):
+            return
+        for entry in ckpt.saved_results():
+            key = (entry["host"], entry["port"])
+            if key not in self._restored:
+                self._restored.add(key)
+                await self._deliver(entry)
+        self.scanned = ckpt.frontier.count
+        self._progress()
+
+    async def run(self):
+        if self.checkpoint:
+            await self._resume()
+            if self.checkpoint.complete:
+                return self.results
+
+        if self.banners:
+            self.banners.start()
+        complete = False
+        try:
+            await run_bounded(
+                self._pairs(),
+                self._scan_pair,
+                min(self.max_concurrency, self.total - self.scanned)
+            )
+            complete = True
+        finally:
+            if self.banners:
+                await self.banners.close()
+            if self.checkpoint:
+                self.checkpoint.save(complete=complete)
+                self.checkpoint.close()
+        return self.results
+
+    def stream(self, maxsize=1000):
+        """Async iterator over results as they are found."""
+        return stream_results(self, maxsize)
@@ -0,0 +1,80 @@
+import os
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# descriptors kept free for stdio, log files, the database, DNS, ...
+RESERVED_FDS = 64
+
+# soft limit asked for when the hard limit is unlimited
+UNLIMITED_TARGET = 65536
+
+
+def fd_limits():
+    """(soft, hard) RLIMIT_NOFILE, or None where it does not exist."""
+    if resource is None:
+        return None
+    return resource.getrlimit(resource.RLIMIT_NOFILE)
+
+
+def raise_fd_limit(wanted=None):
+    """
+    Raises the soft RLIMIT_NOFILE towards `wanted` (default: the hard
+    limit). Never lowers it and never fails; returns the soft limit in
+    effect afterwards, or None where there is no such limit.
+    """
+    limits = fd_limits()
+    if limits is None:
+        return None
+    soft, hard = limits
+    unlimited = resource.RLIM_INFINITY
+    if soft == unlimited:
+        return soft
+    if hard == unlimited:
+        # the kernel still has a per-process ceiling (nr_open), stay sane
+        target = wanted or UNLIMITED_TARGET
+    else:
+        target = min(wanted or hard, hard)
+    if target > soft:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+            soft = target
+        except (ValueError, OSError):
+            pass
+    return soft
+
+
+def open_fds():
+    for path in ("/proc/self/fd", "/dev/fd"):
+        try:
+            return len(os.listdir(path))
+        except OSError:
+            continue
+    return 0
+
+
+def fd_budget(reserve=RESERVED_FDS):
+    """Descriptors still available to this process, or None if unlimited."""
+    limits = fd_limits()
+    if limits is None or limits[0] == resource.RLIM_INFINITY:
+        return None
+    return max(0, limits[0] - open_fds() - reserve)
+
+
+def fit_concurrency(concurrency, held=0, raise_limit=True):
+    """
+    Caps `concurrency` so that it, plus `held` sockets kept open
+    elsewhere (e.g. waiting for banners), fits in the descriptor budget.
+    With raise_limit the soft limit is raised first if that is needed.
+    """
+    if raise_limit:
+        budget = fd_budget()
+        if budget is not None and budget < concurrency + held:
+            raise_fd_limit(fd_limits()[0] + concurrency + held - budget)
+    budget = fd_budget()
+    if budget is None:
+        return concurrency
+    return max(1, min(concurrency, budget - held))
@@ -0,0 +1,162 @@
+import re
+
+from portxcan.probes import SERVICE_PROBES
+from portxcan.utils import get_service_name
+
+
+class Signature:
+    """
+    One banner signature. `product` and `version` may reference the
+    pattern's capture groups as $1, $2, ... (nmap style). `prefix` is the
+    literal start of every banner the pattern can match and is used to
+    index the signature; leave it empty for patterns that can match
+    anywhere. A `soft` signature only names the service when the port
+    number itself did not.
+    """
+
+    def __init__(self, service, pattern, product="", version="", prefix="", soft=False):
+        self.service = service
+        self.pattern = pattern
+        self.product = product
+        self.version = version
+        self.prefix = prefix
+        self.soft = soft
+        self.groups = re.compile(pattern, re.S).groups
+
+
+# order matters inside a bucket: the first matching signature wins
+SIGNATURES = [
+    # --- SSH ---
+    Signature("SSH", r"SSH-[\d.]+-OpenSSH[_-]([\w.]+)", "OpenSSH", "$1", "SSH"),
+    Signature("SSH", r"SSH-[\d.]+-dropbear_([\w.]+)", "Dropbear", "$1", "SSH"),
+    Signature("SSH", r"SSH-[\d.]+-libssh[_-]([\w.]+)", "libssh", "$1", "SSH"),
+    Signature("SSH", r"SSH-[\d.]+-([^\s_]+)(?:_(\S+))?", "$1", "$2", "SSH"),
+
+    # --- HTTP (status line plus Server header from the HTTP probe) ---
+    Signature("HTTP", r"HTTP/[\d.]+ \d{3}[^|]*\| Server: nginx(?:/([\d.]+))?", "nginx", "$1", "HTT"),
+    Signature("HTTP", r"HTTP/[\d.]+ \d{3}[^|]*\| Server: Apache(?:/([\d.]+))?", "Apache httpd", "$1", "HTT"),
+    Signature("HTTP", r"HTTP/[\d.]+ \d{3}[^|]*\| Server: Microsoft-IIS/([\d.]+)", "Microsoft IIS", "$1", "HTT"),
+    Signature("HTTP", r"HTTP/[\d.]+ \d{3}[^|]*\| Server: lighttpd(?:/([\d.]+))?", "lighttpd", "$1", "HTT"),
+    Signature("HTTP", r"HTTP/[\d.]+ \d{3}[^|]*\| Server: Jetty\(([\w.-]+)\)", "Jetty", "$1", "HTT"),
+    Signature("HTTP", r"HTTP/[\d.]+ \d{3}[^|]*\| Server: ([^/|\s]+)(?:/(\S+))?", "$1", "$2", "HTT"),
+    Signature("HTTP", r"HTTP/[\d.]+ \d{3}", prefix="HTT"),
+
+    # --- FTP / SMTP (both greet with 220) ---
+    Signature("FTP", r"220[- ].*?vsFTPd ([\d.]+)", "vsftpd", "$1", "220"),
+    Signature("FTP", r"220[- ]ProFTPD ([\d.]+)", "ProFTPD", "$1", "220"),
+    Signature("FTP", r"220[- ].*?FileZilla Server(?: version)? ([\w.]+)", "FileZilla ftpd", "$1", "220"),
+    Signature("FTP", r"220[- ].*?Pure-FTPd", "Pure-FTPd", "", "220"),
+    Signature("SMTP", r"220[- ].*?ESMTP Postfix", "Postfix smtpd", "", "220"),
+    Signature("SMTP", r"220[- ].*?ESMTP Exim ([\d.]+)", "Exim smtpd", "$1", "220"),
+    Signature("SMTP", r"220[- ].*?Microsoft ESMTP MAIL Service", "Microsoft Exchange smtpd", "", "220"),
+    Signature("SMTP", r"220[- ].*?E?SMTP", prefix="220"),
+    Signature("FTP", r"220[- ].*?FTP", prefix="220"),
+
+    # --- Mail ---
+    Signature("POP3", r"\+OK.*?Dovecot", "Dovecot pop3d", "", "+OK"),
+    Signature("POP3", r"\+OK", prefix="+OK"),
+    Signature("IMAP", r"\* OK.*?Dovecot", "Dovecot imapd", "", "* O"),
+    Signature("IMAP", r"\* OK.*?IMAP", prefix="* O"),
+
+    # --- Databases / caches (some via active probes) ---
+    Signature("Redis", r"Redis ", "Redis", "", "Red"),
+    Signature("Memcached", r"Memcached VERSION ([\d.]+)", "Memcached", "$1", "Mem"),
+    Signature("PostgreSQL", r"PostgreSQL", "PostgreSQL", "", "Pos"),
+    Signature("MySQL", r".*?5\.5\.5-([\d.]+)-MariaDB", "MariaDB", "$1"),
+    Signature("MySQL", r".*?(\d+\.\d+\.\d+)[-\w.]*\x00.*?(?:mysql_native_password|caching_sha2_password)", "MySQL", "$1"),
+
+    # --- Remote access ---
+    Signature("VNC", r"RFB (\d{3}\.\d{3})", "VNC", "$1", "RFB"),
+
+    # --- TLS (from the ClientHello probe) ---
+    Signature("SSL/TLS", r"TLS \((TLSv[\d.]+|SSLv3)", "TLS", "$1", "TLS", soft=True),
+]
+
+
+class FingerprintMatcher:
+    """
+    Signatures are compiled once into one alternation per prefix bucket,
+    so matching a banner is a dict lookup on its first characters plus a
+    single regex match, however many signatures there are. Signatures
+    without a prefix are appended to every bucket and form the fallback.
+    """
+
+    PREFIX_LEN = 3
+
+    def __init__(self, signatures):
+        generic = [s for s in signatures if len(s.prefix) < self.PREFIX_LEN]
+        buckets = {}
+        for s in signatures:
+            if len(s.prefix) >= self.PREFIX_LEN:
+                buckets.setdefault(s.prefix[:self.PREFIX_LEN], []).append(s)
+
+        self._fallback = self._compile(generic)
+        self._index = {
+            key: self._compile(sigs + generic) for key, sigs in buckets.items()
+        }
+
+    @staticmethod
+    def _compile(signatures):
+        parts = []
+        table = {}
+        group = 0
+        for s in signatures:
+            group += 1
+            # the outer group closes last, so lastindex names the signature
+            table[group] = (s, group)
+            parts.append(f"({s.pattern})")
+            group += s.groups
+        regex = re.compile("|".join(parts), re.S) if parts else None
+        return regex, table
+
+    def match(self, banner):
+        if not banner or banner == "Not disclosed":
+            return None
+        regex, table = self._index.get(banner[:self.PREFIX_LEN], self._fallback)
+        if regex is None:
+            return None
+        m = regex.match(banner)
+        if not m:
+            return None
+
+        sig, first = table[m.lastindex]
+        groups = m.groups()[first:first + sig.groups]
+
+        def expand(template):
+            def sub(g):
+                value = groups[int(g.group(1)) - 1]
+                return value or ""
+            return re.sub(r"\$(\d)", sub, template).strip()
+
+        return sig, expand(sig.product), expand(sig.version)
+
+
+MATCHER = FingerprintMatcher(SIGNATURES)
+
+
+def fingerprint(entry):
+    """Adds product/version to a result dict and corrects its service."""
+    entry.setdefault("product", "")
+    entry.setdefault("version", "")
+
+    found = MATCHER.match(entry.get("banner"))
+    if not found:
+        return entry
+    sig, product, version = found
+
+    entry["product"] = product
+    entry["version"] = version
+
+    # keep the port's more specific name (HTTP-ALT, Elasticsearch, ...)
+    # when the banner confirms the protocol family it implies
+    port_service = get_service_name(entry["port"])
+    expected = SERVICE_PROBES.get(port_service)
+    if port_service == "Unknown":
+        entry["service"] = sig.service
+    elif sig.soft or port_service.upper().startswith(sig.service.upper()):
+        pass
+    elif expected and expected.name.upper() == sig.service.upper():
+        pass
+    else:
+        entry["service"] = sig.service
+    return entry
@@ -0,0 +1,121 @@
+import random
+
+
+# deterministic Miller-Rabin bases for n < 3.3e24, far beyond any scan
+_MR_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+
+def is_prime(n):
+    if n < 2:
+        return False
+    for p in _MR_BASES:
+        if n % p == 0:
+            return n == p
+    d, r = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        r += 1
+    for a in _MR_BASES:
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(r - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def next_prime(n):
+    n += 1
+    while not is_prime(n):
+        n += 1
+    return n
+
+
+def _pollard_rho(n, rng):
+    if n % 2 == 0:
+        return 2
+    while True:
+        c = rng.randrange(1, n)
+        x = y = rng.randrange(2, n)
+        d = 1
+        while d == 1:
+            x = (x * x + c) % n
+            y = (y * y + c) % n
+            y = (y * y + c) % n
+            d = _gcd(abs(x - y), n)
+        if d != n:
+            return d
+
+
+def _gcd(a, b):
+    while b:
+        a, b = b, a % b
+    return a
+
+
+def prime_factors(n, rng=None):
+    rng = rng or random.Random(0)
+    factors = set()
+    stack = [n]
+    while stack:
+        m = stack.pop()
+        if m == 1:
+            continue
+        if is_prime(m):
+            factors.add(m)
+            continue
+        for p in _MR_BASES:
+            if m % p == 0:
+                d = p
+                break
+        else:
+            d = _pollard_rho(m, rng)
+        stack += [d, m // d]
+    return factors
+
+
+class CyclicPermutation:
+    """
+    A pseudo-random order over range(n) in O(1) memory. Picks the first
+    prime p > n and a random generator g of the multiplicative group mod
+    p; the sequence start * g^k (mod p) then visits every element of
+    1..p-1 exactly once, and the values above n are skipped (prime gaps
+    are tiny, so almost nothing is). The whole state is the step k, so a
+    walk can be resumed from a single counter. The same `seed` always
+    gives the same order.
+    """
+
+    def __init__(self, n, seed=None):
+        self.n = n
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        rng = random.Random(self.seed)
+
+        self.prime = next_prime(max(n, 2))
+        order = self.prime - 1
+        factors = prime_factors(order, rng) if order > 1 else set()
+        while True:
+            g = rng.randrange(2, self.prime) if self.prime > 3 else self.prime - 1
+            if all(pow(g, order // q, self.prime) != 1 for q in factors):
+                break
+        self.generator = g
+        self.start = pow(g, rng.randrange(order), self.prime)
+
+    def __len__(self):
+        return self.n
+
+    def walk(self, step=0):
+        """Yields (step, value) from `step` on; resume with the last step + 1."""
+        p, g = self.prime, self.generator
+        x = self.start * pow(g, step, p) % p
+        for k in range(step, p - 1):
+            if x <= self.n:
+                yield k, x - 1
+            x = x * g % p
+
+    def __iter__(self):
+        for _, value in self.walk():
+            yield value
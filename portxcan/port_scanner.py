@@ -1,64 +1,262 @@
+import errno
 import socket
 import threading
-from queue import Queue
+import time
+from queue import Empty, Queue
+from portxcan.congestion import AUTOTUNE_HEADROOM, EXHAUSTED, AimdController, ThreadGate, classify_errno
+from portxcan.fdlimit import fit_concurrency
+from portxcan.fingerprint import fingerprint
+from portxcan.probes import fallback_probe, match_probe, probe_for_port
+from portxcan.ratelimit import RateLimiter
+from portxcan.rtt import RttEstimator
+from portxcan.states import ERROR, FILTERED, OPEN, STATES, port_entry, state_of_errno
+from portxcan.targets import as_sequence
 from portxcan.utils import get_service_name, print_progress, end_progress
 
 class PortScanner:
-    def __init__(self, target, start_port, end_port, threads=100, timeout=1):
+    def __init__(self, target, start_port, end_port, threads=100, timeout=1,
+                 adaptive=True, min_timeout=0.1, max_timeout=5.0,
+                 grab_banners=True, banner_threads=20, banner_timeout=1,
+                 active_probes=True, rate=None, limiter=None, autotune=False,
+                 max_threads=None, fit_fds=True, resource_retries=5, retries=1, retry_backoff=2.0,
+                 retry_delay=0.1, report=(OPEN,), ports=None):
         self.target = target
         self.start_port = start_port
         self.end_port = end_port
-        self.threads = threads
+        # an explicit port list (e.g. a PortSet) replaces start/end
+        self.ports = range(start_port, end_port + 1) if ports is None else as_sequence(ports)
+        # with autotune `threads` is where the AIMD window starts; up to
+        # `max_threads` (default: AUTOTUNE_HEADROOM times threads) workers
+        # are started so the window can grow past it
+        ceiling = threads
+        if autotune:
+            ceiling = max(threads, max_threads or AUTOTUNE_HEADROOM * threads)
+        # every thread holds a socket, banner threads and their queue too
+        if fit_fds:
+            held = 2 * banner_threads if grab_banners else 0
+            ceiling = fit_concurrency(ceiling, held)
+        self.threads = ceiling
+        # EMFILE/ENOBUFS connects are retried, never reported as closed
+        self.resource_retries = resource_retries
+        self.unresolved = 0
         self.timeout = timeout
-        self.queue = Queue()
+        self.adaptive = adaptive
+        self.rtt = RttEstimator(timeout, min_timeout, max_timeout)
+        # connection attempts/s cap, shared by all worker threads
+        self.limiter = limiter
+        if limiter is None and rate:
+            self.limiter = RateLimiter(rate)
+        # the AIMD window limits connects in flight below self.threads
+        self.congestion = AimdController(min(threads, ceiling), maximum=ceiling) if autotune else None
+        self.gate = ThreadGate(self.congestion) if autotune else None
+        # open sockets are handed to a separate pool of banner threads
+        self.grab_banners = grab_banners
+        self.banner_threads = banner_threads
+        self.banner_timeout = banner_timeout
+        self.active_probes = active_probes
+        self.banner_queue = Queue(maxsize=banner_threads)
         self.lock = threading.Lock()
         self.results = []
         self.scanned = 0
-        self.total = end_port - start_port + 1
+        self.total = len(self.ports)
+        # per-state counts; `report` picks the states that become results
+        self.report_states = set(report)
+        self.states = dict.fromkeys(STATES, 0)
+        # filtered ports are retried up to `retries` times by the thread
+        # that found them, each time after a longer pause and with a
+        # longer timeout (both grow by `retry_backoff`)
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.retry_delay = retry_delay
+        self._address = None
 
     def grab_banner(self, sock):
         try:
-            sock.settimeout(1)
+            sock.settimeout(self.banner_timeout)
             banner = sock.recv(1024).decode(errors="ignore").strip()
             return banner if banner else "Not disclosed"
         except:
             return "Not disclosed"
 
+    def send_probe(self, probe, sock):
+        try:
+            sock.settimeout(self.banner_timeout)
+            sock.sendall(probe.request(self.target))
+            data = sock.recv(4096)
+        except OSError:
+            return "Not disclosed"
+        banner = match_probe(probe, data)
+        if banner:
+            return banner
+        banner = data.decode(errors="ignore").strip()
+        return banner if banner else "Not disclosed"
+
+    def identify(self, sock, port):
+        # silent services are probed at once, others only if they stay quiet
+        probe = probe_for_port(port)
+        if probe is None:
+            banner = self.grab_banner(sock)
+            if banner != "Not disclosed":
+                return banner
+            probe = fallback_probe(port)
+        return self.send_probe(probe, sock)
+
+    def report(self, entry):
+        with self.lock:
+            print(
+                f"\n[OPEN] {self.target}:{entry['port']} | {entry['service']} | {entry['banner']}"
+            )
+
+    def address(self):
+        """(family, host) to connect to; IPv6 targets get AF_INET6 sockets."""
+        # resolved once, connect_ex would look a hostname up on every port
+        if self._address is None:
+            try:
+                family, _, _, _, sockaddr = socket.getaddrinfo(
+                    self.target, None, type=socket.SOCK_STREAM
+                )[0]
+                self._address = (family, sockaddr[0])
+            except (socket.gaierror, UnicodeError):
+                # unresolvable: every connect fails into an error state
+                self._address = (socket.AF_INET, self.target)
+        return self._address
+
+    def connect(self, port, scale=1.0):
+        """Returns (rc, sock): connect_ex's errno, and the socket if it is open."""
+        family, host = self.address()
+        try:
+            sock = socket.socket(family, socket.SOCK_STREAM)
+        except OSError as e:
+            # EMFILE/ENFILE: no socket at all, retried by the caller
+            return e.errno, None
+        rc = None
+        try:
+            sock.settimeout((self.rtt.timeout() if self.adaptive else self.timeout) * scale)
+            if self.limiter:
+                self.limiter.wait(self.target)
+            if self.gate:
+                self.gate.acquire()
+            t0 = time.perf_counter()
+            try:
+                rc = sock.connect_ex((host, port))
+            except OSError as e:
+                # e.g. an unresolvable name: an error state, not a dead thread
+                rc = e.errno or -1
+            finally:
+                if self.gate:
+                    self.gate.release(None if rc is None else classify_errno(rc))
+            if rc in (0, errno.ECONNREFUSED):
+                self.rtt.update(time.perf_counter() - t0)
+            if self.limiter:
+                self.limiter.record(rc in (0, errno.ECONNREFUSED))
+        finally:
+            if rc != 0:
+                sock.close()
+        return rc, sock
+
+    def probe(self, port, scale=1.0):
+        """Returns (state, sock); state is None if no socket could be had."""
+        rc, sock = self.connect(port, scale)
+        delay = 0.05
+        for _ in range(self.resource_retries):
+            if classify_errno(rc) != EXHAUSTED:
+                break
+            time.sleep(delay)
+            delay = min(1.0, delay * 2)
+            rc, sock = self.connect(port, scale)
+        if classify_errno(rc) == EXHAUSTED:
+            # out of sockets, not a closed port
+            with self.lock:
+                self.unresolved += 1
+            return None, None
+        return state_of_errno(rc), sock
+
+    def finish(self, port, state, sock):
+        if state == OPEN:
+            entry = port_entry(None, port, OPEN, get_service_name(port))
+            with self.lock:
+                self.results.append(entry)
+            if self.grab_banners:
+                self.banner_queue.put((entry, sock))
+            else:
+                sock.close()
+                self.report(entry)
+        elif state in self.report_states:
+            with self.lock:
+                self.results.append(port_entry(None, port, state, get_service_name(port)))
+
     def scan_port(self, port):
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-                sock.settimeout(self.timeout)
-                if sock.connect_ex((self.target, port)) == 0:
-                    service = get_service_name(port)
-                    banner = self.grab_banner(sock)
-                    with self.lock:
-                        self.results.append({
-                            "port": port,
-                            "service": service,
-                            "banner": banner
-                        })
-                        print(
-                            f"\n[OPEN] {self.target}:{port} | {service} | {banner}"
-                        )
+            state, sock = self.probe(port)
+            delay, scale = self.retry_delay, 1.0
+            for _ in range(self.retries):
+                if state != FILTERED:
+                    break
+                time.sleep(delay)
+                delay *= self.retry_backoff
+                scale *= self.retry_backoff
+                retried, sock = self.probe(port, scale)
+                # a retry that runs out of sockets leaves the port filtered
+                state = retried or FILTERED
+            state = state or ERROR
+            with self.lock:
+                self.states[state] += 1
+            self.finish(port, state, sock)
         finally:
             with self.lock:
                 self.scanned += 1
                 print_progress(self.scanned, self.total, f"Scanning {self.target}")
 
-    def worker(self):
-        while not self.queue.empty():
-            port = self.queue.get()
-            self.scan_port(port)
-            self.queue.task_done()
+    def banner_worker(self):
+        while True:
+            item = self.banner_queue.get()
+            if item is None:
+                break
+            entry, sock = item
+            try:
+                if self.active_probes:
+                    entry["banner"] = self.identify(sock, entry["port"])
+                else:
+                    entry["banner"] = self.grab_banner(sock)
+                fingerprint(entry)
+            finally:
+                sock.close()
+            self.report(entry)
 
-    def run(self):
-        for port in range(self.start_port, self.end_port + 1):
-            self.queue.put(port)
+    def worker(self, tasks, scan):
+        while True:
+            try:
+                port = tasks.get_nowait()
+            except Empty:
+                return
+            try:
+                scan(port)
+            finally:
+                tasks.task_done()
 
-        for _ in range(self.threads):
-            t = threading.Thread(target=self.worker, daemon=True)
+    def run_pass(self, ports, scan):
+        # workers drain the queue with get_nowait() and exit once it is empty
+        tasks = Queue()
+        for port in ports:
+            tasks.put(port)
+        for _ in range(min(self.threads, len(ports))):
+            t = threading.Thread(target=self.worker, args=(tasks, scan), daemon=True)
             t.start()
+        tasks.join()
+
+    def run(self):
+        banner_workers = []
+        if self.grab_banners:
+            for _ in range(self.banner_threads):
+                t = threading.Thread(target=self.banner_worker, daemon=True)
+                t.start()
+                banner_workers.append(t)
+
+        self.run_pass(self.ports, self.scan_port)
 
-        self.queue.join()
+        for _ in banner_workers:
+            self.banner_queue.put(None)
+        for t in banner_workers:
+            t.join()
         end_progress()
         return self.results
@@ -0,0 +1,202 @@
+import ssl
+import struct
+
+from portxcan.utils import get_service_name
+
+
+TLS_VERSIONS = {
+    0x0300: "SSLv3",
+    0x0301: "TLSv1.0",
+    0x0302: "TLSv1.1",
+    0x0303: "TLSv1.2",
+    0x0304: "TLSv1.3",
+}
+
+
+class Probe:
+    """A minimal request for a protocol that waits for the client to speak."""
+
+    def __init__(self, name, payload, parse):
+        self.name = name
+        self.payload = payload
+        self.parse = parse
+
+    def request(self, host):
+        payload = self.payload
+        if callable(payload):
+            payload = payload(host)
+        return payload
+
+
+# ─── Parsers ──────────────────────────────────────
+def _first_line(data):
+    return data.split(b"\n", 1)[0].decode(errors="ignore").strip()
+
+
+def parse_http(data):
+    if not data.startswith(b"HTTP/"):
+        return None
+    head = data.split(b"\r\n\r\n", 1)[0].decode(errors="ignore")
+    lines = head.split("\r\n")
+    parts = [lines[0].strip()]
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "server" and value.strip():
+            parts.append(f"Server: {value.strip()}")
+    return " | ".join(parts)
+
+
+def parse_tls(data):
+    # TLS record: type(1) version(2) length(2), then the handshake message
+    if len(data) < 6:
+        return None
+    if data[0] == 0x15:
+        return "TLS (alert)"
+    if data[0] != 0x16 or data[5] != 0x02:
+        return None
+
+    hello = data[9:]
+    if len(hello) < 35:
+        return "TLS"
+    version = struct.unpack("!H", hello[0:2])[0]
+    pos = 34
+    sid_len = hello[pos]
+    pos += 1 + sid_len
+    if len(hello) < pos + 3:
+        return f"TLS ({TLS_VERSIONS.get(version, hex(version))})"
+    cipher = struct.unpack("!H", hello[pos:pos + 2])[0]
+    pos += 3
+
+    # TLS 1.3 hides its real version in the supported_versions extension
+    if len(hello) >= pos + 2:
+        end = min(len(hello), pos + 2 + struct.unpack("!H", hello[pos:pos + 2])[0])
+        pos += 2
+        while pos + 4 <= end:
+            ext, size = struct.unpack("!HH", hello[pos:pos + 4])
+            if ext == 0x002B and size == 2:
+                version = struct.unpack("!H", hello[pos + 4:pos + 6])[0]
+            pos += 4 + size
+
+    return f"TLS ({TLS_VERSIONS.get(version, hex(version))}, cipher 0x{cipher:04x})"
+
+
+def parse_redis(data):
+    if data[:1] not in (b"+", b"-"):
+        return None
+    return f"Redis {_first_line(data)}"
+
+
+def parse_memcached(data):
+    if not data.startswith(b"VERSION"):
+        return None
+    return f"Memcached {_first_line(data)}"
+
+
+def parse_postgres(data):
+    if data[:1] == b"S":
+        return "PostgreSQL (SSL supported)"
+    if data[:1] == b"N":
+        return "PostgreSQL (SSL not supported)"
+    return None
+
+
+# ─── Payloads ─────────────────────────────────────
+def _http_head(host):
+    return (
+        f"HEAD / HTTP/1.0\r\nHost: {host}\r\n"
+        "User-Agent: PortXcan\r\nAccept: */*\r\n\r\n"
+    ).encode()
+
+
+_client_hello = None
+
+
+def _tls_client_hello(host):
+    # let the ssl module produce a real ClientHello without a socket
+    global _client_hello
+    if _client_hello is None:
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+        incoming, outgoing = ssl.MemoryBIO(), ssl.MemoryBIO()
+        obj = ctx.wrap_bio(incoming, outgoing)
+        try:
+            obj.do_handshake()
+        except ssl.SSLWantReadError:
+            pass
+        _client_hello = outgoing.read()
+    return _client_hello
+
+
+HTTP = Probe("http", _http_head, parse_http)
+TLS = Probe("tls", _tls_client_hello, parse_tls)
+REDIS = Probe("redis", b"PING\r\n", parse_redis)
+MEMCACHED = Probe("memcached", b"version\r\n", parse_memcached)
+POSTGRES = Probe("postgres", b"\x00\x00\x00\x08\x04\xd2\x16\x2f", parse_postgres)
+
+
+# service names from COMMON_SERVICES whose servers stay silent until asked
+SERVICE_PROBES = {
+    "HTTP": HTTP,
+    "HTTP-ALT": HTTP,
+    "HTTP-DEV": HTTP,
+    "RPC-over-HTTP": HTTP,
+    "Elasticsearch": HTTP,
+    "Solr": HTTP,
+    "Prometheus": HTTP,
+    "Grafana": HTTP,
+    "Kibana": HTTP,
+    "Docker": HTTP,
+    "Kubelet-RO": HTTP,
+    "WebLogic": HTTP,
+    "Webmin": HTTP,
+    "cPanel": HTTP,
+    "WHM": HTTP,
+    "Webmail": HTTP,
+
+    "HTTPS": TLS,
+    "HTTPS-ALT": TLS,
+    "SMTPS": TLS,
+    "IMAPS": TLS,
+    "POP3S": TLS,
+    "LDAPS": TLS,
+    "Global-Catalog-SSL": TLS,
+    "cPanel-SSL": TLS,
+    "WHM-SSL": TLS,
+    "Webmail-SSL": TLS,
+    "WebLogic-SSL": TLS,
+    "Docker-SSL": TLS,
+    "Kubernetes-API": TLS,
+    "Kubelet": TLS,
+    "RabbitMQ-SSL": TLS,
+    "SIP-TLS": TLS,
+
+    "Redis": REDIS,
+    "Memcached": MEMCACHED,
+    "PostgreSQL": POSTGRES,
+    "PostgreSQL-ALT": POSTGRES,
+}
+
+
+def probe_for_port(port):
+    """Probe to send straight after connecting, or None to listen first."""
+    return SERVICE_PROBES.get(get_service_name(port))
+
+
+def fallback_probe(port):
+    """
+    Probe for an unknown port that stayed silent. Only one is tried, so
+    pick the most likely silent protocol: TLS on *443 ports, else HTTP.
+    """
+    if str(port).endswith("443"):
+        return TLS
+    return HTTP
+
+
+def match_probe(probe, data):
+    if not data:
+        return None
+    try:
+        return probe.parse(data)
+    except Exception:
+        return None
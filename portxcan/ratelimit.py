@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Reservation-style token bucket: taking a token never blocks, it
+    returns how long the caller has to wait before using it. That makes
+    the same bucket usable from coroutines and from threads.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate / 10)
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, factor=1.0):
+        rate = self.rate * factor
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * rate)
+            self.stamp = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / rate
+
+    def idle(self):
+        """True once the bucket has refilled completely."""
+        return self.tokens + (time.monotonic() - self.stamp) * self.rate >= self.burst
+
+
+class RateLimiter:
+    """
+    Caps connection attempts per second globally (`rate`) and per
+    destination host (`host_rate`); either may be None for no cap. One
+    limiter can be shared by every engine of a process.
+
+    Callers report each attempt with record(answered): a SYN-ACK or RST
+    counts as answered, a timeout as lost. When the loss rate of a window
+    climbs clearly above its running baseline, both rates are halved
+    (down to `min_factor` of the configured rate); healthy windows let
+    them recover by 25% at a time.
+    """
+
+    def __init__(self, rate=None, host_rate=None, burst=None, backoff=True,
+                 window=200, loss_margin=0.15, min_factor=0.05, max_hosts=10000):
+        self.rate = rate
+        self.host_rate = host_rate
+        self.burst = burst
+        self.backoff = backoff
+        self.window = window
+        self.loss_margin = loss_margin
+        self.min_factor = min_factor
+        self.max_hosts = max_hosts
+
+        self.factor = 1.0
+        self._global = TokenBucket(rate, burst) if rate else None
+        self._hosts = {}
+        self._hosts_lock = threading.Lock()
+        self._sent = 0
+        self._lost = 0
+        self._baseline = None
+        self._lock = threading.Lock()
+
+    def _host_bucket(self, host):
+        bucket = self._hosts.get(host)
+        if bucket is not None:
+            return bucket
+        # threaded scanners get here concurrently: two threads must not
+        # each create a bucket for one host, nor lose one to the pruning
+        with self._hosts_lock:
+            bucket = self._hosts.get(host)
+            if bucket is None:
+                if len(self._hosts) >= self.max_hosts:
+                    # forget hosts whose bucket has refilled, they cost nothing
+                    self._hosts = {h: b for h, b in self._hosts.items() if not b.idle()}
+                bucket = self._hosts[host] = TokenBucket(self.host_rate, self.burst)
+            return bucket
+
+    def reserve(self, host=None):
+        """Takes a token for `host`; returns the seconds to wait."""
+        wait = 0.0
+        if self._global:
+            wait = self._global.reserve(self.factor)
+        if self.host_rate and host is not None:
+            wait = max(wait, self._host_bucket(host).reserve(self.factor))
+        return wait
+
+    async def acquire(self, host=None):
+        wait = self.reserve(host)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def wait(self, host=None):
+        """Blocking acquire for threaded scanners."""
+        wait = self.reserve(host)
+        if wait > 0:
+            time.sleep(wait)
+
+    def record(self, answered):
+        if not self.backoff:
+            return
+        with self._lock:
+            self._sent += 1
+            if not answered:
+                self._lost += 1
+            if self._sent < self.window:
+                return
+            loss = self._lost / self._sent
+            self._sent = self._lost = 0
+
+            if self._baseline is None:
+                self._baseline = loss
+            elif loss > self._baseline + self.loss_margin:
+                self.factor = max(self.min_factor, self.factor / 2)
+            else:
+                self.factor = min(1.0, self.factor * 1.25)
+            # the baseline follows slowly, so a loss spike stands out
+            self._baseline = 0.9 * self._baseline + 0.1 * loss
@@ -0,0 +1,366 @@
+import asyncio
+import ipaddress
+import os
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from portxcan.scheduler import run_bounded
+
+
+QTYPE_A = 1
+QTYPE_AAAA = 28
+QTYPE_CNAME = 5
+QTYPE_SOA = 6
+
+RCODE_NOERROR = 0
+RCODE_NXDOMAIN = 3
+
+
+# ─── System configuration ─────────────────────────
+def nameservers(path="/etc/resolv.conf"):
+    """The `nameserver` entries of resolv.conf; empty if it cannot be read."""
+    servers = []
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                fields = line.split("#", 1)[0].split()
+                if len(fields) >= 2 and fields[0] == "nameserver":
+                    try:
+                        servers.append(str(ipaddress.ip_address(fields[1].split("%", 1)[0])))
+                    except ValueError:
+                        pass
+    except OSError:
+        pass
+    return servers
+
+
+def search_options(path="/etc/resolv.conf"):
+    """(search domains, ndots) from resolv.conf; the last search/domain line wins."""
+    search, ndots = [], 1
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                fields = line.split("#", 1)[0].split()
+                if not fields:
+                    continue
+                if fields[0] in ("search", "domain"):
+                    search = [d.lower().rstrip(".") for d in fields[1:]]
+                elif fields[0] == "options":
+                    for opt in fields[1:]:
+                        if opt.startswith("ndots:") and opt[6:].isdigit():
+                            ndots = min(int(opt[6:]), 15)
+    except OSError:
+        pass
+    return search, ndots
+
+
+def hosts_file(path="/etc/hosts"):
+    """name -> addresses from a hosts file, in file order."""
+    table = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                fields = line.split("#", 1)[0].split()
+                if len(fields) < 2:
+                    continue
+                try:
+                    addr = str(ipaddress.ip_address(fields[0].split("%", 1)[0]))
+                except ValueError:
+                    continue
+                for name in fields[1:]:
+                    addrs = table.setdefault(name.lower(), [])
+                    if addr not in addrs:
+                        addrs.append(addr)
+    except OSError:
+        pass
+    return table
+
+
+# ─── Wire format ──────────────────────────────────
+def _query(ident, name, qtype):
+    header = struct.pack("!HHHHHH", ident, 0x0100, 1, 0, 0, 0)  # RD set
+    qname = b"".join(bytes([len(label)]) + label for label in name.encode("idna").split(b"."))
+    return header + qname + b"\x00" + struct.pack("!HH", qtype, 1)
+
+
+def _skip_name(data, pos):
+    while True:
+        length = data[pos]
+        if length & 0xC0 == 0xC0:  # compression pointer ends the name
+            return pos + 2
+        pos += 1 + length
+        if not length:
+            return pos
+
+
+def parse_reply(data, qtype):
+    """
+    (rcode, addresses, ttl) from a DNS reply. The TTL is the smallest of
+    the records used, or for a negative answer the SOA's negative TTL
+    (RFC 2308); None when the reply says nothing about caching.
+    """
+    _, flags, qdcount, ancount, nscount, _ = struct.unpack("!HHHHHH", data[:12])
+    rcode = flags & 0x0F
+    pos = 12
+    for _ in range(qdcount):
+        pos = _skip_name(data, pos) + 4
+    addrs, ttls = [], []
+    for n in range(ancount + nscount):
+        pos = _skip_name(data, pos)
+        rtype, _, ttl, rdlength = struct.unpack("!HHIH", data[pos:pos + 10])
+        pos += 10
+        rdata = data[pos:pos + rdlength]
+        pos += rdlength
+        if n < ancount:
+            # CNAME records of the chain expire with the addresses
+            if rtype == qtype == QTYPE_A and rdlength == 4:
+                addrs.append(socket.inet_ntop(socket.AF_INET, rdata))
+                ttls.append(ttl)
+            elif rtype == qtype == QTYPE_AAAA and rdlength == 16:
+                addrs.append(socket.inet_ntop(socket.AF_INET6, rdata))
+                ttls.append(ttl)
+            elif rtype == QTYPE_CNAME:
+                ttls.append(ttl)
+        elif rtype == QTYPE_SOA and not addrs:
+            end = _skip_name(data, _skip_name(data, pos - rdlength))
+            minimum = struct.unpack("!I", data[end + 16:end + 20])[0]
+            ttls.append(min(ttl, minimum))
+    return rcode, addrs, min(ttls) if ttls else None
+
+
+class _DnsClient(asyncio.DatagramProtocol):
+    """One UDP socket per nameserver; replies are matched by query id."""
+
+    def __init__(self):
+        self.transport = None
+        self.waiters = {}
+
+    def connection_made(self, transport):
+        self.transport = transport
+        sock = transport.get_extra_info("socket")
+        try:
+            # replies to a whole batch of queries can arrive in one burst
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        except OSError:
+            pass
+
+    def datagram_received(self, data, addr):
+        if len(data) >= 12:
+            fut = self.waiters.pop(data[:2], None)
+            if fut is not None and not fut.done():
+                fut.set_result(data)
+
+    def error_received(self, exc):
+        pass  # an ICMP error for some query; it times out and is retried
+
+    async def ask(self, name, qtype, timeout):
+        while True:
+            ident = os.urandom(2)
+            if ident not in self.waiters:
+                break
+        fut = asyncio.get_running_loop().create_future()
+        self.waiters[ident] = fut
+        try:
+            self.transport.sendto(_query(int.from_bytes(ident, "big"), name, qtype))
+            return await asyncio.wait_for(fut, timeout)
+        finally:
+            self.waiters.pop(ident, None)
+
+
+# ─── Resolver ─────────────────────────────────────
+class Resolver:
+    """
+    Non-blocking hostname resolution with an in-process cache. Hosts file
+    entries are answered first. Names the system resolver would look up
+    as they are (at least `ndots` dots, or no search domains) are then
+    sent as A and AAAA queries straight to the resolv.conf nameservers
+    and cached for the TTL of their records. Everything else, i.e. names
+    the search list would rewrite, mDNS `.local` names, and names DNS
+    has no addresses for, goes through getaddrinfo on a thread pool, so
+    search domains and nsswitch still apply; those answers, negative
+    ones included, are cached for `fallback_ttl` seconds. Resolution
+    returns a list of address strings, IPv4 first, or raises ValueError.
+    """
+
+    def __init__(self, servers=None, timeout=1.0, attempts=2, concurrency=256,
+                 max_ttl=3600, negative_ttl=30, fallback_ttl=60, maxsize=100000):
+        self.servers = nameservers() if servers is None else list(servers)
+        self.search, self.ndots = search_options()
+        self.timeout = timeout
+        self.attempts = attempts
+        self.concurrency = concurrency
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.fallback_ttl = fallback_ttl
+        self.maxsize = maxsize
+
+        # name -> (expires, addresses or None for "does not exist"); the
+        # shared resolver is used from several threads, so writes lock
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self._hosts_mtime = None
+
+    def _from_hosts(self, name):
+        try:
+            mtime = os.stat("/etc/hosts").st_mtime
+        except OSError:
+            mtime = None
+        if mtime != self._hosts_mtime:
+            self._hosts = hosts_file()
+            self._hosts_mtime = mtime
+        return self._hosts.get(name)
+
+    def _cached(self, name):
+        hit = self._cache.get(name)
+        if hit is not None and hit[0] > time.monotonic():
+            return hit
+        return None
+
+    def _store(self, name, addrs, ttl):
+        ttl = min(ttl, self.max_ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            if len(self._cache) >= self.maxsize:
+                now = time.monotonic()
+                for key in [k for k, v in self._cache.items() if v[0] <= now]:
+                    del self._cache[key]
+                if len(self._cache) >= self.maxsize:
+                    # still full: drop the oldest half
+                    for key in list(self._cache)[:len(self._cache) // 2]:
+                        del self._cache[key]
+            self._cache[name] = (time.monotonic() + ttl, addrs)
+
+    def _direct(self, name):
+        """True if the system resolver would query `name` unchanged first."""
+        if "." not in name or name == "local" or name.endswith(".local"):
+            return False
+        return not self.search or name.count(".") >= self.ndots
+
+    async def _ask(self, clients, name, qtype):
+        """(rcode, addresses, ttl) from the first nameserver that answers."""
+        for attempt in range(self.attempts):
+            for client in clients:
+                try:
+                    data = await client.ask(name, qtype, self.timeout)
+                except asyncio.TimeoutError:
+                    continue
+                if data[2] & 0x02:
+                    return None  # truncated: let the system resolver use TCP
+                try:
+                    reply = parse_reply(data, qtype)
+                except (struct.error, IndexError, ValueError):
+                    continue
+                if reply[0] in (RCODE_NOERROR, RCODE_NXDOMAIN):
+                    return reply
+        return None
+
+    async def _lookup(self, clients, name):
+        """(addresses or None, ttl), or None if DNS gave no usable answer."""
+        replies = await asyncio.gather(
+            self._ask(clients, name, QTYPE_A), self._ask(clients, name, QTYPE_AAAA)
+        )
+        if None in replies:
+            return None
+        addrs, ttls = [], []
+        for rcode, found, ttl in replies:
+            addrs.extend(found)
+            ttls.append(self.negative_ttl if ttl is None else ttl)
+        return addrs or None, min(ttls)
+
+    async def _getaddrinfo(self, name):
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await loop.getaddrinfo(name, None, type=socket.SOCK_STREAM)
+        except (socket.gaierror, UnicodeError):
+            return None
+        addrs = []
+        for *_, sockaddr in sorted(infos, key=lambda info: info[0] != socket.AF_INET):
+            addr = sockaddr[0].split("%", 1)[0]
+            if addr not in addrs:
+                addrs.append(addr)
+        return addrs
+
+    async def _resolve(self, clients, name):
+        hit = self._cached(name)
+        if hit is not None:
+            return hit[1]
+        addrs = self._from_hosts(name)
+        if addrs:
+            return addrs
+        answer = None
+        if clients and self._direct(name):
+            try:
+                answer = await self._lookup(clients, name)
+            except UnicodeError:
+                pass
+            if answer is not None and answer[0] is None:
+                # the search list or another nsswitch source may still know it
+                answer = None
+        if answer is None:
+            answer = (await self._getaddrinfo(name), self.fallback_ttl)
+        self._store(name, *answer)
+        return answer[0]
+
+    async def resolve_many(self, names):
+        """
+        Resolves `names` concurrently (at most `concurrency` at once, one
+        socket per nameserver). Returns {name: [addresses] or None}.
+        """
+        wanted = {}
+        for name in names:
+            wanted.setdefault(name, name.lower().rstrip("."))
+        results = {}
+        loop = asyncio.get_running_loop()
+        clients = []
+        try:
+            # DNS sockets are only opened when something misses the cache
+            if self.servers and any(self._cached(key) is None for key in wanted.values()):
+                for server in self.servers:
+                    try:
+                        _, client = await loop.create_datagram_endpoint(
+                            _DnsClient, remote_addr=(server, 53)
+                        )
+                    except OSError:
+                        continue
+                    clients.append(client)
+
+            async def one(key):
+                results[key] = await self._resolve(clients, key)
+
+            keys = list(dict.fromkeys(wanted.values()))
+            await run_bounded(keys, one, min(self.concurrency, len(keys)))
+        finally:
+            for client in clients:
+                client.transport.close()
+        return {name: results[key] for name, key in wanted.items()}
+
+    async def resolve(self, name):
+        addrs = (await self.resolve_many([name]))[name]
+        if not addrs:
+            raise ValueError(f"Unable to resolve target hostname: {name}")
+        return addrs
+
+    def resolve_many_sync(self, names):
+        """
+        resolve_many() for synchronous callers. It blocks the calling
+        thread until every name is resolved; code running on an event loop
+        should await resolve_many() instead.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.resolve_many(names))
+        # called from a loop thread anyway: the loop stalls until this
+        # returns, and asyncio.run() cannot nest, so resolve on a private
+        # loop in another thread
+        with ThreadPoolExecutor(1) as pool:
+            return pool.submit(asyncio.run, self.resolve_many(names)).result()
+
+
+# shared by target parsing, so repeated scans of a name reuse its answer
+DEFAULT_RESOLVER = Resolver()
@@ -0,0 +1,41 @@
+import threading
+
+
+class RttEstimator:
+    """
+    Smoothed round-trip estimator in the style of TCP's retransmission
+    timer (RFC 6298). Every answered probe (SYN-ACK or RST) feeds a
+    sample; the connect timeout is SRTT + K * RTTVAR, clamped to
+    [min_timeout, max_timeout]. Until the first sample arrives the
+    initial timeout is used.
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    K = 4
+
+    def __init__(self, initial=1.0, min_timeout=0.1, max_timeout=5.0):
+        self.initial = initial
+        self.min_timeout = min_timeout
+        self.max_timeout = max(max_timeout, min_timeout)
+        self.srtt = None
+        self.rttvar = None
+        self.samples = 0
+        self._lock = threading.Lock()
+
+    def update(self, sample):
+        with self._lock:
+            if self.srtt is None:
+                self.srtt = sample
+                self.rttvar = sample / 2
+            else:
+                self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - sample)
+                self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * sample
+            self.samples += 1
+
+    def timeout(self):
+        if self.srtt is None:
+            value = self.initial
+        else:
+            value = self.srtt + self.K * self.rttvar
+        return min(self.max_timeout, max(self.min_timeout, value))
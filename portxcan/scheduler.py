@@ -0,0 +1,24 @@
+import asyncio
+
+
+async def run_bounded(items, worker, limit):
+    """
+    Calls `await worker(item)` for every item while keeping at most
+    `limit` calls in flight. A finished probe immediately frees its slot
+    for the next item (sliding window), and items are pulled lazily so
+    memory does not grow with the size of `items`.
+    """
+    items = iter(items)
+
+    async def _drain():
+        # all drainers share one iterator; asyncio never interleaves a
+        # plain next() call, so every item is handed out exactly once
+        for item in items:
+            await worker(item)
+
+    tasks = [asyncio.create_task(_drain()) for _ in range(max(1, limit))]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for t in tasks:
+            t.cancel()
@@ -0,0 +1,182 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import time
+
+from portxcan.checkpoint import Checkpoint, job_signature
+from portxcan.engine import ScanEngine
+from portxcan.sinks import call_result_cb, stream_results
+from portxcan.states import STATES
+from portxcan.targets import as_sequence
+
+
+# shards report progress at most this often
+PROGRESS_INTERVAL = 0.2
+
+
+def _shard_main(shard, shards, hosts, ports, options, checkpoint, events):
+    last = 0.0
+
+    def progress_cb(scanned, total):
+        nonlocal last
+        now = time.monotonic()
+        if now - last >= PROGRESS_INTERVAL:
+            last = now
+            events.put((shard, "progress", (scanned, engine.window)))
+
+    def result_cb(entry):
+        events.put((shard, "result", entry))
+
+    if checkpoint:
+        path, meta = checkpoint
+        checkpoint = Checkpoint(path, meta)
+
+    try:
+        engine = ScanEngine(
+            hosts, ports,
+            progress_cb=progress_cb,
+            result_cb=result_cb,
+            keep_results=False,
+            checkpoint=checkpoint,
+            shard=(shard, shards),
+            **options
+        )
+        asyncio.run(engine.run())
+    except Exception as e:
+        events.put((shard, "error", repr(e)))
+    else:
+        events.put((shard, "done", (engine.scanned, engine.unresolved, engine.states)))
+
+
+class ShardedScanner:
+    """
+    Splits one scan across `shards` processes, each running a ScanEngine
+    on every shards-th (host, port) pair with its own event loop and its
+    own `concurrency` budget. Results and progress from all shards are
+    merged here, so callers use it exactly like a ScanEngine (except that
+    a shared `limiter` cannot cross processes; use rate/host_rate).
+    """
+
+    def __init__(
+        self,
+        hosts,
+        ports,
+        shards=None,
+        progress_cb=None,
+        result_cb=None,
+        keep_results=True,
+        checkpoint=None,
+        **options
+    ):
+        self.hosts = as_sequence(hosts)
+        self.ports = ports
+        self.shards = max(1, shards or os.cpu_count() or 1)
+        # rate caps are for the whole scan; pairs are spread over all
+        # shards, so each process gets an equal share of both
+        for key in ("rate", "host_rate"):
+            if options.get(key):
+                options[key] = options[key] / self.shards
+        self.options = options
+
+        self.progress_cb = progress_cb
+        self.result_cb = result_cb
+        self.keep_results = keep_results
+        self.results = []
+        self.total = len(self.hosts) * len(self.ports)
+        self.scanned = 0
+        self.unresolved = 0
+        self.states = dict.fromkeys(STATES, 0)
+
+        # each shard keeps its own checkpoint next to this one
+        self.checkpoint = checkpoint
+        self._scanned = [0] * self.shards
+        self._windows = [0] * self.shards
+
+    @property
+    def window(self):
+        """Connects allowed in flight, summed over the running shards."""
+        return sum(self._windows)
+
+    def _progress(self):
+        self.scanned = sum(self._scanned)
+        if self.progress_cb:
+            try:
+                self.progress_cb(self.scanned, self.total)
+            except Exception:
+                pass
+
+    async def _deliver(self, entry):
+        if self.keep_results:
+            self.results.append(entry)
+        try:
+            await call_result_cb(self.result_cb, entry)
+        except Exception:
+            pass
+
+    async def run(self):
+        if self.checkpoint:
+            self.checkpoint.signature = job_signature(self.hosts, self.ports)
+            self.checkpoint.save()
+
+        ctx = multiprocessing.get_context("spawn")
+        events = ctx.Queue()
+        procs = []
+        for k in range(self.shards):
+            ckpt = None
+            if self.checkpoint:
+                ckpt = (self.checkpoint.shard(k, self.shards).path, self.checkpoint.meta)
+            p = ctx.Process(
+                target=_shard_main,
+                args=(k, self.shards, self.hosts, self.ports, self.options, ckpt, events),
+                daemon=True,
+            )
+            p.start()
+            procs.append(p)
+
+        loop = asyncio.get_running_loop()
+        running = set(range(self.shards))
+        errors = []
+        try:
+            while running:
+                try:
+                    shard, kind, payload = await loop.run_in_executor(None, events.get, True, 0.5)
+                except queue.Empty:
+                    # a shard that died without reporting fails the scan
+                    for k in list(running):
+                        if not procs[k].is_alive():
+                            running.discard(k)
+                            errors.append(f"shard {k} exited with code {procs[k].exitcode}")
+                    continue
+
+                if kind == "result":
+                    await self._deliver(payload)
+                    continue
+                if kind == "error":
+                    errors.append(f"shard {shard}: {payload}")
+                    running.discard(shard)
+                elif kind == "done":
+                    self._scanned[shard], unresolved, states = payload
+                    self.unresolved += unresolved
+                    for state, count in states.items():
+                        self.states[state] += count
+                    self._windows[shard] = 0
+                    running.discard(shard)
+                else:
+                    self._scanned[shard], self._windows[shard] = payload
+                self._progress()
+        finally:
+            for p in procs:
+                if p.is_alive():
+                    p.terminate()
+                p.join()
+
+        if errors:
+            raise RuntimeError("; ".join(errors))
+        if self.checkpoint:
+            self.checkpoint.save(complete=True)
+        return self.results
+
+    def stream(self, maxsize=1000):
+        """Async iterator over results as they are found."""
+        return stream_results(self, maxsize)
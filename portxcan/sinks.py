@@ -0,0 +1,134 @@
+import abc
+import asyncio
+import csv
+import inspect
+import json
+import os
+import time
+
+
+CSV_FIELDS = ["host", "port", "service", "product", "version", "banner", "state"]
+
+
+async def call_result_cb(cb, entry):
+    if cb is None:
+        return
+    res = cb(entry)
+    if inspect.isawaitable(res):
+        await res
+
+
+async def stream_results(scanner, maxsize=1000):
+    """
+    Runs `scanner` and yields its results as they are found. The queue is
+    bounded, so a slow consumer pauses the scan instead of buffering the
+    whole result set. Any result_cb already set on the scanner still runs.
+    """
+    queue = asyncio.Queue(maxsize)
+    done = object()
+    previous = scanner.result_cb
+
+    async def _cb(entry):
+        await call_result_cb(previous, entry)
+        await queue.put(entry)
+
+    async def _run():
+        try:
+            await scanner.run()
+        finally:
+            await queue.put(done)
+
+    scanner.result_cb = _cb
+    task = asyncio.create_task(_run())
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            yield item
+        await task
+    finally:
+        task.cancel()
+        scanner.result_cb = previous
+
+
+class _Writer(abc.ABC):
+    """
+    Appends results to a file as they arrive and flushes every
+    `flush_every` entries or `flush_interval` seconds, whichever comes
+    first, so a crash only loses the last unflushed batch.
+    """
+
+    def __init__(self, filename, flush_every=100, flush_interval=1.0, fsync=False):
+        self.filename = filename
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.count = 0
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._f = None
+
+    def open(self):
+        self._f = open(self.filename, "a", newline="", encoding="utf-8")
+        return self
+
+    @abc.abstractmethod
+    def _write(self, entry):
+        """Writes one entry to the open file."""
+
+    def write(self, entry):
+        if self._f is None:
+            self.open()
+        self._write(entry)
+        self.count += 1
+        self._pending += 1
+        if (self._pending >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        if self._f is None:
+            return
+        self._f.flush()
+        if self.fsync:
+            os.fsync(self._f.fileno())
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        if self._f is not None:
+            self.flush()
+            self._f.close()
+            self._f = None
+
+    # usable directly as a scanner result_cb
+    def __call__(self, entry):
+        self.write(entry)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class NdjsonWriter(_Writer):
+    """One JSON object per line."""
+
+    def _write(self, entry):
+        self._f.write(json.dumps(entry) + "\n")
+
+
+class CsvWriter(_Writer):
+    """CSV with the report columns; the header is written once per file."""
+
+    def open(self):
+        super().open()
+        self._csv = csv.writer(self._f)
+        if self._f.tell() == 0:
+            self._csv.writerow(CSV_FIELDS)
+        return self
+
+    def _write(self, entry):
+        self._csv.writerow([entry.get(k, "") for k in CSV_FIELDS])
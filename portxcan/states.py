@@ -0,0 +1,59 @@
+import asyncio
+import errno
+
+
+# port states, as reported in the "state" key of result dicts
+OPEN = "open"          # handshake completed
+CLOSED = "closed"      # RST: the host is up, nothing listens
+FILTERED = "filtered"  # no answer, or an ICMP unreachable/prohibited
+ERROR = "error"        # the probe itself failed (e.g. out of local sockets)
+
+STATES = (OPEN, CLOSED, FILTERED, ERROR)
+
+# errors a firewall or router in the path produces
+FILTERED_ERRNOS = {
+    errno.ETIMEDOUT, errno.EHOSTUNREACH, errno.ENETUNREACH,
+    errno.EACCES, errno.EPERM, errno.EAGAIN, errno.EWOULDBLOCK,
+}
+
+
+def state_of(exc):
+    """State of a port whose connect raised `exc`."""
+    if isinstance(exc, ConnectionRefusedError):
+        return CLOSED
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError)):
+        return FILTERED
+    if isinstance(exc, OSError):
+        return state_of_errno(exc.errno)
+    return ERROR
+
+
+def state_of_errno(rc):
+    """Same for the return code of socket.connect_ex()."""
+    if rc == 0:
+        return OPEN
+    if rc == errno.ECONNREFUSED:
+        return CLOSED
+    if rc in FILTERED_ERRNOS:
+        return FILTERED
+    return ERROR
+
+
+def port_entry(host, port, state, service, banner=None):
+    """
+    A result dict. Open ports start out as "Not disclosed" until their
+    banner is read; other states have no banner.
+    """
+    if banner is None:
+        banner = "Not disclosed" if state == OPEN else ""
+    entry = {
+        "port": port,
+        "state": state,
+        "service": service,
+        "banner": banner,
+        "product": "",
+        "version": ""
+    }
+    if host is not None:
+        entry = {"host": host, **entry}
+    return entry
@@ -0,0 +1,212 @@
+import os
+import random
+import socket
+import struct
+import threading
+import time
+import zlib
+
+from portxcan.permute import CyclicPermutation
+from portxcan.states import CLOSED, FILTERED, OPEN, STATES, port_entry
+from portxcan.targets import as_sequence, has_ipv6
+from portxcan.utils import get_service_name
+
+TCP_SYN = 0x02
+TCP_RST = 0x04
+TCP_ACK = 0x10
+
+
+def can_syn_scan():
+    """True when the process may open raw sockets (root / CAP_NET_RAW)."""
+    try:
+        s = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_TCP)
+    except (PermissionError, OSError, AttributeError):
+        return False
+    s.close()
+    return True
+
+
+def checksum(data):
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def source_address(host):
+    # let the routing table pick the outgoing interface address
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.connect((host, 9))
+        return s.getsockname()[0]
+
+
+class SynScanner:
+    """
+    Half-open TCP scanner. SYNs are crafted and sent from one raw socket at
+    a fixed packet rate while a receiver thread matches SYN-ACK / RST
+    replies. Sequence numbers are a keyed hash of the destination, so the
+    receiver needs no per-probe state to validate a reply.
+    """
+
+    def __init__(
+        self,
+        hosts,
+        ports,
+        rate=10000,
+        timeout=1,
+        src_port=None,
+        progress_cb=None,
+        result_cb=None,
+        randomize=True
+    ):
+        self.hosts = as_sequence(hosts)
+        if has_ipv6(self.hosts):
+            # packets are built with IPv4 headers and checksums
+            raise ValueError("SYN scans support IPv4 targets only; use a connect scan")
+        self.ports = as_sequence(ports)
+        self.rate = rate
+        # visit (host, port) pairs in a pseudo-random permutation
+        self.randomize = randomize
+        self.timeout = timeout
+        self.src_port = src_port or random.randint(40000, 60000)
+
+        self.results = []
+        self.total = len(self.hosts) * len(self.ports)
+        self.scanned = 0
+        # RSTs are only counted; pairs that never answered are filtered
+        self.closed = 0
+
+        # optional progress callback (CLI or Web UI)
+        self.progress_cb = progress_cb
+        # called from the receiver thread with each open port
+        self.result_cb = result_cb
+
+        self._secret = os.urandom(8)
+        self._seen = set()
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._src_ips = {}
+
+    def _cookie(self, host, port):
+        data = socket.inet_aton(host) + struct.pack("!H", port) + self._secret
+        return zlib.crc32(data) & 0xFFFFFFFF
+
+    def _src_ip(self, host):
+        ip = self._src_ips.get(host)
+        if ip is None:
+            ip = source_address(host)
+            self._src_ips[host] = ip
+        return ip
+
+    def build_syn(self, src_ip, host, port):
+        seq = self._cookie(host, port)
+        offset = 5 << 4
+        header = struct.pack(
+            "!HHLLBBHHH",
+            self.src_port, port, seq, 0, offset, TCP_SYN, 1024, 0, 0
+        )
+        pseudo = struct.pack(
+            "!4s4sBBH",
+            socket.inet_aton(src_ip), socket.inet_aton(host),
+            0, socket.IPPROTO_TCP, len(header)
+        )
+        csum = checksum(pseudo + header)
+        return header[:16] + struct.pack("!H", csum) + header[18:]
+
+    def handle_packet(self, packet):
+        if len(packet) < 20:
+            return
+        ihl = (packet[0] & 0x0F) * 4
+        if len(packet) < ihl + 20:
+            return
+        src = socket.inet_ntoa(packet[12:16])
+        sport, dport, _, ack, _, flags = struct.unpack(
+            "!HHLLBB", packet[ihl:ihl + 14]
+        )
+        if dport != self.src_port:
+            return
+        if ack != (self._cookie(src, sport) + 1) & 0xFFFFFFFF:
+            return
+
+        if flags & TCP_SYN and flags & TCP_ACK:
+            with self._lock:
+                if (src, sport) in self._seen:
+                    return
+                self._seen.add((src, sport))
+                entry = port_entry(src, sport, OPEN, get_service_name(sport))
+                self.results.append(entry)
+            if self.result_cb:
+                try:
+                    self.result_cb(entry)
+                except Exception:
+                    pass
+        elif flags & TCP_RST:
+            with self._lock:
+                self.closed += 1
+
+    @property
+    def states(self):
+        counts = dict.fromkeys(STATES, 0)
+        counts[OPEN] = len(self.results)
+        counts[CLOSED] = self.closed
+        counts[FILTERED] = max(0, self.scanned - counts[OPEN] - counts[CLOSED])
+        return counts
+
+    def receiver(self, sock):
+        while not self._done.is_set():
+            try:
+                packet = sock.recv(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.handle_packet(packet)
+
+    def _tick(self):
+        self.scanned += 1
+        if self.progress_cb:
+            try:
+                self.progress_cb(self.scanned, self.total)
+            except Exception:
+                pass
+
+    def run(self):
+        send_sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_TCP)
+        recv_sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_TCP)
+        recv_sock.settimeout(0.2)
+
+        rx = threading.Thread(target=self.receiver, args=(recv_sock,), daemon=True)
+        rx.start()
+
+        interval = 1.0 / self.rate if self.rate else 0
+        next_send = time.perf_counter()
+        try:
+            nhosts = len(self.hosts)
+            order = CyclicPermutation(self.total) if self.randomize else range(self.total)
+            for i in order:
+                host, port = self.hosts[i % nhosts], self.ports[i // nhosts]
+                if interval:
+                    delay = next_send - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    next_send = max(next_send, time.perf_counter() - 1) + interval
+                try:
+                    send_sock.sendto(
+                        self.build_syn(self._src_ip(host), host, port),
+                        (host, 0)
+                    )
+                except OSError:
+                    pass
+                self._tick()
+
+            # give late replies one timeout to arrive
+            time.sleep(self.timeout)
+        finally:
+            self._done.set()
+            rx.join()
+            send_sock.close()
+            recv_sock.close()
+
+        return self.results
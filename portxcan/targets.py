@@ -0,0 +1,355 @@
+import array
+import asyncio
+import bisect
+import ipaddress
+import os
+import re
+import socket
+from collections.abc import Sequence
+
+from portxcan.resolver import DEFAULT_RESOLVER
+
+
+class TargetSet(Sequence):
+    """
+    A set of IP addresses kept as sorted, merged integer ranges. Length,
+    indexing and membership are computed from the ranges and iteration is
+    lazy, so a /8 costs a few integers instead of 16 million strings.
+    Duplicates and overlaps disappear when the ranges are merged. Ranges
+    are packed into flat arrays (about 40 bytes each), which keeps IPv6
+    hitlists of millions of scattered addresses affordable.
+    """
+
+    def __init__(self, spans=()):
+        self._versions = array.array("B")
+        self._bounds = bytearray()
+        starts = []
+        total = 0
+        for version, lo, hi in _merge(spans):
+            self._versions.append(version)
+            self._bounds += lo.to_bytes(16, "big") + hi.to_bytes(16, "big")
+            starts.append(total)
+            total += hi - lo + 1
+        try:
+            self._starts = array.array("Q", starts)
+        except OverflowError:
+            self._starts = starts  # whole IPv6 prefixes, as in exclusions
+        self._len = total
+        self.spans = _Spans(self)
+
+    def _span(self, k):
+        at = 32 * k
+        lo = int.from_bytes(self._bounds[at:at + 16], "big")
+        hi = int.from_bytes(self._bounds[at + 16:at + 32], "big")
+        return self._versions[k], lo, hi
+
+    @property
+    def versions(self):
+        """The IP versions present, e.g. {4} or {4, 6}."""
+        return set(self._versions)
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._len))]
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("target index out of range")
+        k = bisect.bisect_right(self._starts, i) - 1
+        version, lo, _ = self._span(k)
+        return _format(version, lo + i - self._starts[k])
+
+    def __iter__(self):
+        for version, lo, hi in self.spans:
+            for n in range(lo, hi + 1):
+                yield _format(version, n)
+
+    def __contains__(self, address):
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        key = (ip.version, int(ip))
+        k = bisect.bisect_right(self.spans, (key[0], key[1], float("inf"))) - 1
+        if k < 0:
+            return False
+        version, lo, hi = self.spans[k]
+        return version == key[0] and lo <= key[1] <= hi
+
+    def __repr__(self):
+        return f"<TargetSet {len(self)} addresses in {len(self.spans)} ranges>"
+
+    def exclude(self, other):
+        """This set minus the addresses of `other`."""
+        out = []
+        cuts = other.spans
+        j = 0
+        for version, lo, hi in self.spans:
+            while j < len(cuts) and (cuts[j][0], cuts[j][2]) < (version, lo):
+                j += 1
+            k = j
+            while k < len(cuts) and (cuts[k][0], cuts[k][1]) <= (version, hi):
+                _, clo, chi = cuts[k]
+                if clo > lo:
+                    out.append((version, lo, clo - 1))
+                lo = max(lo, chi + 1)
+                k += 1
+            if lo <= hi:
+                out.append((version, lo, hi))
+        return TargetSet(out)
+
+
+class _Spans(Sequence):
+    """Read-only (version, lo, hi) view of a TargetSet's packed ranges."""
+
+    def __init__(self, targets):
+        self._targets = targets
+
+    def __len__(self):
+        return len(self._targets._versions)
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [self[j] for j in range(*k.indices(len(self)))]
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError("span index out of range")
+        return self._targets._span(k)
+
+    def __repr__(self):
+        # the same text as a list of tuples, which checkpoint signatures hash
+        return repr(list(self))
+
+
+def _merge(spans):
+    merged = []
+    for version, lo, hi in sorted(spans):
+        if merged and merged[-1][0] == version and lo <= merged[-1][2] + 1:
+            if hi > merged[-1][2]:
+                merged[-1] = (version, merged[-1][1], hi)
+        else:
+            merged.append((version, lo, hi))
+    return merged
+
+
+def _format(version, n):
+    if version == 4:
+        return socket.inet_ntoa(n.to_bytes(4, "big"))
+    return str(ipaddress.IPv6Address(n))
+
+
+def as_sequence(hosts):
+    """Keeps lazy sequences (TargetSet, range, list) as they are."""
+    if isinstance(hosts, Sequence) and not isinstance(hosts, str):
+        return hosts
+    return list(hosts)
+
+
+def has_ipv6(hosts):
+    """True if any of `hosts` is an IPv6 address."""
+    versions = getattr(hosts, "versions", None)
+    if versions is not None:
+        return 6 in versions
+    return any(":" in host for host in hosts)
+
+
+# ─── Parsing ──────────────────────────────────────
+# IPv6 blocks are only expanded address by address up to a /112; larger
+# ones (a /64 alone is 2**64 addresses) must be given as hitlist files
+MAX_IPV6_SWEEP = 1 << 16
+
+
+def _routable(ip):
+    # connecting a datagram socket sends nothing, it only asks for a route
+    family = socket.AF_INET6 if ip.version == 6 else socket.AF_INET
+    try:
+        with socket.socket(family, socket.SOCK_DGRAM) as s:
+            s.connect((str(ip), 9))
+        return True
+    except OSError:
+        return False
+
+
+def _pick(addrs):
+    # the first IPv4 and the first IPv6 address, in resolver order
+    first = {}
+    for addr in addrs:
+        ip = ipaddress.ip_address(addr)
+        first.setdefault(ip.version, ip)
+    picked = list(first.values())
+    return [ip for ip in picked if _routable(ip)] or picked
+
+
+def resolve_addresses(name, resolver=None):
+    """
+    The addresses to scan for a hostname: the first IPv4 and the first
+    IPv6 address it resolves to. A family this machine has no route for
+    is left out unless it is the only one.
+    """
+    addrs = (resolver or DEFAULT_RESOLVER).resolve_many_sync([name])[name]
+    if not addrs:
+        raise ValueError(f"Unable to resolve target hostname: {name}")
+    return _pick(addrs)
+
+
+def _sweep(version, lo, hi, item):
+    if version == 6 and hi - lo + 1 > MAX_IPV6_SWEEP:
+        raise ValueError(
+            f"IPv6 block {item} is too large to sweep (more than a /112); "
+            "list its addresses in a hitlist file (@file) instead"
+        )
+    return [(version, lo, hi)]
+
+
+def _spans(item, whole=False):
+    if "/" in item:
+        try:
+            net = ipaddress.ip_network(item, strict=False)
+        except ValueError:
+            raise ValueError("Invalid CIDR notation")
+        lo, hi = int(net.network_address), int(net.broadcast_address)
+        # same addresses as network.hosts(); exclusions take the whole block
+        if not whole:
+            if net.version == 4 and net.prefixlen <= 30:
+                lo, hi = lo + 1, hi - 1
+            elif net.version == 6 and net.prefixlen <= 126:
+                lo += 1
+            return _sweep(net.version, lo, hi, item)
+        return [(net.version, lo, hi)]
+
+    first, sep, last = item.partition("-")
+    if sep:
+        try:
+            start = ipaddress.ip_address(first)
+        except ValueError:
+            start = None  # a hostname with a dash in it
+        if start is not None:
+            try:
+                if last.isdigit() and start.version == 4:
+                    # 10.0.0.1-50 means 10.0.0.1-10.0.0.50
+                    end = ipaddress.ip_address(first.rsplit(".", 1)[0] + "." + last)
+                else:
+                    end = ipaddress.ip_address(last)
+            except ValueError:
+                raise ValueError(f"Invalid address range: {item}")
+            if end.version != start.version or end < start:
+                raise ValueError(f"Invalid address range: {item}")
+            if whole:
+                return [(start.version, int(start), int(end))]
+            return _sweep(start.version, int(start), int(end), item)
+
+    try:
+        ip = ipaddress.ip_address(item)
+    except ValueError:
+        return None  # a hostname, resolved with the others in one batch
+    n = int(ip)
+    return [(ip.version, n, n)]
+
+
+def _items(spec, files):
+    for item in re.split(r"[\s,]+", spec.strip()):
+        if not item:
+            continue
+        if item.startswith("@"):
+            if not files:
+                raise ValueError("Target files are not allowed here")
+            yield from _file_items(item[1:])
+        else:
+            yield item
+
+
+def _file_items(path):
+    try:
+        with open(os.path.expanduser(path), encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0]
+                for item in re.split(r"[\s,]+", line.strip()):
+                    if item:
+                        yield item
+    except OSError as e:
+        raise ValueError(f"Cannot read target file {path}: {e.strerror}")
+
+
+def _collect(spec, exclude, files):
+    include, skip, names = [], [], []
+
+    def add(item, whole):
+        spans = _spans(item, whole)
+        if spans is None:
+            names.append((item, whole))
+        else:
+            (skip if whole else include).extend(spans)
+
+    for item in _items(spec, files):
+        if item.startswith("!"):
+            add(item[1:], True)
+        else:
+            add(item, False)
+    if exclude:
+        for item in _items(exclude, files):
+            add(item.lstrip("!"), True)
+    return include, skip, names
+
+
+def _build(include, skip, names, resolved):
+    for name, whole in names:
+        addrs = resolved.get(name)
+        if not addrs:
+            raise ValueError(f"Unable to resolve target hostname: {name}")
+        for ip in _pick(addrs):
+            n = int(ip)
+            (skip if whole else include).append((ip.version, n, n))
+
+    targets = TargetSet(include)
+    if skip:
+        targets = targets.exclude(TargetSet(skip))
+    if not targets:
+        raise ValueError("No targets to scan")
+    return targets
+
+
+def parse_targets(spec, exclude=None, files=True, resolver=None):
+    """
+    Parses a target spec into a TargetSet. Items are separated by commas
+    or whitespace:
+
+        10.0.0.1, example.com       single addresses and hostnames
+        2001:db8::1                 IPv6 addresses
+        10.0.0.0/8                  CIDR blocks (network/broadcast skipped)
+        2001:db8::/120              IPv6 blocks, up to a /112
+        10.0.0.1-10.0.0.50          ranges; 10.0.0.1-50 for short
+        @targets.txt                one or more items per line, # comments
+        !10.0.5.0/24                exclusions, also accepted in `exclude`
+
+    Hostnames expand to one address per family they resolve to; they
+    are resolved together through a cached, concurrent resolver (see
+    portxcan.resolver), so long hostname lists resolve quickly. Wider
+    IPv6 space is scanned from hitlists: @file lines are read one at a
+    time and kept as packed ranges, never as strings.
+
+    files=False rejects @file items (for specs from untrusted users).
+    """
+    include, skip, names = _collect(spec, exclude, files)
+    resolved = {}
+    if names:
+        resolver = resolver or DEFAULT_RESOLVER
+        resolved = resolver.resolve_many_sync([name for name, _ in names])
+    return _build(include, skip, names, resolved)
+
+
+async def parse_targets_async(spec, exclude=None, files=True, resolver=None):
+    """
+    parse_targets() for event loops: items are parsed on a worker thread
+    and hostnames resolved concurrently without blocking the loop.
+    """
+    loop = asyncio.get_running_loop()
+    include, skip, names = await loop.run_in_executor(None, _collect, spec, exclude, files)
+    resolved = {}
+    if names:
+        resolver = resolver or DEFAULT_RESOLVER
+        resolved = await resolver.resolve_many([name for name, _ in names])
+    return await loop.run_in_executor(None, _build, include, skip, names, resolved)
@@ -0,0 +1,227 @@
+import struct
+
+from portxcan.probes import Probe, match_probe
+
+
+# most UDP services ignore an empty datagram, so every well-known port
+# gets a request its protocol is obliged to answer
+
+
+# ─── Helpers ──────────────────────────────────────
+def _dns_name(name):
+    out = b""
+    for label in name.split("."):
+        if label:
+            out += bytes([len(label)]) + label.encode()
+    return out + b"\x00"
+
+
+def _dns_query(name, qtype, qclass=1, ident=0x5058):
+    header = struct.pack("!HHHHHH", ident, 0x0100, 1, 0, 0, 0)
+    return header + _dns_name(name) + struct.pack("!HH", qtype, qclass)
+
+
+def _tlv(tag, body):
+    # BER with short-form lengths, enough for a small SNMP request
+    return bytes([tag, len(body)]) + body
+
+
+def _ber_int(value):
+    return _tlv(0x02, bytes([value]))
+
+
+DNS_RCODES = {0: "NOERROR", 1: "FORMERR", 2: "SERVFAIL", 3: "NXDOMAIN", 4: "NOTIMP", 5: "REFUSED"}
+
+
+# ─── Parsers ──────────────────────────────────────
+def parse_dns(data):
+    if len(data) < 12 or data[:2] != b"\x50\x58" or not data[2] & 0x80:
+        return None
+    rcode = data[3] & 0x0F
+    return f"DNS ({DNS_RCODES.get(rcode, rcode)})"
+
+
+def parse_ntp(data):
+    if len(data) < 48:
+        return None
+    version = (data[0] >> 3) & 0x7
+    return f"NTP v{version}, stratum {data[1]}"
+
+
+_SYS_DESCR = b"\x06\x08\x2b\x06\x01\x02\x01\x01\x01\x00"
+
+
+def parse_snmp(data):
+    if data[:1] != b"\x30":
+        return None
+    # the value follows the OID in the response's only varbind
+    pos = data.find(_SYS_DESCR)
+    if pos >= 0:
+        pos += len(_SYS_DESCR)
+        if data[pos:pos + 1] == b"\x04" and len(data) > pos + 1:
+            size = data[pos + 1]
+            value = data[pos + 2:pos + 2 + size].decode(errors="ignore").strip()
+            if value:
+                return f"SNMP {value.splitlines()[0]}"
+    return "SNMP"
+
+
+def parse_tftp(data):
+    if data[:2] == b"\x00\x03":
+        return "TFTP"
+    if data[:2] == b"\x00\x05":
+        message = data[4:].split(b"\x00", 1)[0].decode(errors="ignore").strip()
+        return f"TFTP ({message})" if message else "TFTP"
+    return None
+
+
+IKE_COOKIE = b"PortXcan"
+
+
+def parse_ike(data):
+    if len(data) < 28 or data[:8] != IKE_COOKIE:
+        return None
+    major, minor = data[17] >> 4, data[17] & 0x0F
+    return f"IKEv{major}" + (f".{minor}" if minor else "")
+
+
+def parse_netbios(data):
+    if len(data) < 57 or data[:2] != b"\x50\x58":
+        return None
+    # 12-byte header, then the echoed name (34), type/class/ttl/length (10)
+    if data[56] and len(data) >= 72:
+        name = data[57:72].decode(errors="ignore").strip()
+        if name:
+            return f"NetBIOS {name}"
+    return "NetBIOS"
+
+
+def parse_ssdp(data):
+    if not data.startswith(b"HTTP/1.1"):
+        return None
+    for line in data.decode(errors="ignore").split("\r\n")[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "server" and value.strip():
+            return f"SSDP {value.strip()}"
+    return "SSDP"
+
+
+def parse_mdns(data):
+    if len(data) < 12 or not data[2] & 0x80:
+        return None
+    return "mDNS"
+
+
+def parse_memcached_udp(data):
+    # 8-byte UDP frame header before the text reply
+    if not data[8:].startswith(b"VERSION"):
+        return None
+    return "Memcached " + data[8:].split(b"\r\n", 1)[0].decode(errors="ignore")
+
+
+def parse_rpc(data):
+    if len(data) < 24 or data[:4] != b"PXRP":
+        return None
+    reply, accepted = struct.unpack("!II", data[4:12])
+    return "RPC portmapper" if reply == 1 and accepted == 0 else "RPC"
+
+
+def parse_sip(data):
+    if not data.startswith(b"SIP/2.0"):
+        return None
+    lines = data.decode(errors="ignore").split("\r\n")
+    parts = [lines[0].strip()]
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() in ("server", "user-agent") and value.strip():
+            parts.append(value.strip())
+            break
+    return " | ".join(parts)
+
+
+def parse_any(data):
+    # unknown protocol: show its first line if it is text
+    text = data.decode(errors="ignore").strip()
+    line = text.splitlines()[0] if text else ""
+    return line[:80] if line.isprintable() else None
+
+
+# ─── Payloads ─────────────────────────────────────
+def _snmp_get():
+    varbind = _tlv(0x30, _SYS_DESCR + b"\x05\x00")
+    pdu = _tlv(0xA0, _tlv(0x02, b"\x50\x58") + _ber_int(0) + _ber_int(0) + _tlv(0x30, varbind))
+    return _tlv(0x30, _ber_int(0) + _tlv(0x04, b"public") + pdu)
+
+
+def _ike_main_mode():
+    # IKEv1 main mode offering 3DES/SHA1/PSK/group 2; responders answer
+    # even proposals they reject, with a NO-PROPOSAL-CHOSEN notify
+    attrs = struct.pack("!HHHHHHHHHHHH",
+                        0x8001, 5, 0x8002, 2, 0x8003, 1, 0x8004, 2, 0x800B, 1, 0x800C, 28800)
+    transform = struct.pack("!BBHBBH", 0, 0, 8 + len(attrs), 1, 1, 0) + attrs
+    proposal = struct.pack("!BBHBBBB", 0, 0, 8 + len(transform), 1, 1, 0, 1) + transform
+    sa = struct.pack("!BBHII", 0, 0, 12 + len(proposal), 1, 1) + proposal
+    header = IKE_COOKIE + b"\x00" * 8 + struct.pack("!BBBBII", 1, 0x10, 2, 0, 0, 28 + len(sa))
+    return header + sa
+
+
+def _netbios_status():
+    # NBSTAT query for the wildcard name "*"
+    name = b"\x20" + b"CK" + b"A" * 30 + b"\x00"
+    return struct.pack("!HHHHHH", 0x5058, 0, 1, 0, 0, 0) + name + struct.pack("!HH", 0x21, 1)
+
+
+def _rpc_null():
+    # portmapper (100000) v2 NULL procedure with AUTH_NONE
+    return b"PXRP" + struct.pack("!IIIIIIIII", 0, 2, 100000, 2, 0, 0, 0, 0, 0)
+
+
+def _sip_options(host):
+    return (
+        f"OPTIONS sip:nm@{host} SIP/2.0\r\n"
+        f"Via: SIP/2.0/UDP {host}:5060;branch=z9hG4bK-portxcan\r\n"
+        f"From: <sip:nm@portxcan>;tag=portxcan\r\nTo: <sip:nm@{host}>\r\n"
+        "Call-ID: portxcan\r\nCSeq: 1 OPTIONS\r\nMax-Forwards: 70\r\n"
+        "Content-Length: 0\r\n\r\n"
+    ).encode()
+
+
+DNS = Probe("dns", _dns_query("version.bind", 16, 3), parse_dns)
+NTP = Probe("ntp", b"\x1b" + b"\x00" * 47, parse_ntp)
+SNMP = Probe("snmp", _snmp_get(), parse_snmp)
+TFTP = Probe("tftp", b"\x00\x01portxcan.txt\x00octet\x00", parse_tftp)
+IKE = Probe("ike", _ike_main_mode(), parse_ike)
+NETBIOS = Probe("netbios", _netbios_status(), parse_netbios)
+SSDP = Probe("ssdp", (
+    b"M-SEARCH * HTTP/1.1\r\nHOST: 239.255.255.250:1900\r\n"
+    b"MAN: \"ssdp:discover\"\r\nMX: 1\r\nST: ssdp:all\r\n\r\n"
+), parse_ssdp)
+MDNS = Probe("mdns", _dns_query("_services._dns-sd._udp.local", 12, 0x8001), parse_mdns)
+MEMCACHED = Probe("memcached", b"\x00\x01\x00\x00\x00\x01\x00\x00version\r\n", parse_memcached_udp)
+RPC = Probe("rpc", _rpc_null(), parse_rpc)
+SIP = Probe("sip", _sip_options, parse_sip)
+EMPTY = Probe("empty", b"", parse_any)
+
+
+UDP_PROBES = {
+    53: DNS,
+    69: TFTP,
+    111: RPC,
+    123: NTP,
+    137: NETBIOS,
+    161: SNMP,
+    500: IKE,
+    1900: SSDP,
+    5060: SIP,
+    5353: MDNS,
+    11211: MEMCACHED,
+}
+
+
+def udp_probe_for_port(port):
+    """The request to send to a UDP port (an empty datagram if unknown)."""
+    return UDP_PROBES.get(port, EMPTY)
+
+
+def udp_banner(port, data):
+    return match_probe(udp_probe_for_port(port), data) or "Not disclosed"
@@ -0,0 +1,263 @@
+import array
+import asyncio
+import ipaddress
+import socket
+import struct
+import time
+
+from portxcan.checkpoint import job_signature
+from portxcan.permute import CyclicPermutation
+from portxcan.ratelimit import RateLimiter
+from portxcan.sinks import call_result_cb, stream_results
+from portxcan.states import CLOSED, FILTERED, OPEN, STATES, port_entry
+from portxcan.targets import as_sequence
+from portxcan.udp_probes import udp_banner, udp_probe_for_port
+from portxcan.utils import get_service_name
+
+
+# Linux extended socket errors: ICMP errors for an unconnected socket are
+# queued with the original destination, so they can be matched to a probe
+IP_RECVERR = getattr(socket, "IP_RECVERR", 11)
+IPV6_RECVERR = getattr(socket, "IPV6_RECVERR", 25)
+MSG_ERRQUEUE = getattr(socket, "MSG_ERRQUEUE", 0x2000)
+SO_EE_ORIGIN_ICMP = 2
+SO_EE_ORIGIN_ICMP6 = 3
+
+# (ICMP type, code) meaning "nothing listens on this port"
+PORT_UNREACHABLE = {(3, 3), (1, 4)}
+
+
+class UdpScanner:
+    """
+    Asyncio UDP scanner. Each address family gets one unconnected datagram
+    socket; probes carry a payload the service must answer (see
+    portxcan.udp_probes) and are paced by their own rate limit, because
+    kernels rate-limit the ICMP port-unreachable errors that mark closed
+    ports. A reply makes a port open, a port unreachable closed, and any
+    other ICMP unreachable filtered. Silent ports are re-probed `retries`
+    times and then reported filtered, which for UDP means "open or
+    filtered". ICMP matching needs Linux; elsewhere closed ports also look
+    filtered.
+    """
+
+    def __init__(
+        self,
+        hosts,
+        ports,
+        timeout=1,
+        retries=1,
+        rate=1000,
+        host_rate=None,
+        limiter=None,
+        randomize=True,
+        seed=None,
+        progress_cb=None,
+        result_cb=None,
+        keep_results=True,
+        report=(OPEN,)
+    ):
+        self.hosts = as_sequence(hosts)
+        self.ports = as_sequence(ports)
+        self.timeout = timeout
+        self.retries = retries
+
+        # datagrams/s, globally and per host; closed ports only show up if
+        # the target's ICMP budget is not exhausted
+        self.limiter = limiter
+        if limiter is None and (rate or host_rate):
+            self.limiter = RateLimiter(rate, host_rate, backoff=False)
+
+        self.randomize = randomize
+        if randomize and seed is None:
+            seed = int(job_signature(self.hosts, self.ports, order="udp")[:16], 16)
+        self.seed = seed
+
+        self.progress_cb = progress_cb
+        self.result_cb = result_cb
+        self.keep_results = keep_results
+        self.results = []
+        self.report = set(report)
+        self.states = dict.fromkeys(STATES, 0)
+
+        self.total = len(self.hosts) * len(self.ports)
+        self.scanned = 0
+
+        self._sockets = {}
+        self._addresses = {}
+        # (address, port) -> (pair, deadline), oldest first
+        self._inflight = {}
+        self._silent = array.array("Q")
+        self._deliveries = set()
+
+    def _pair(self, i):
+        nhosts = len(self.hosts)
+        return self.hosts[i % nhosts], self.ports[i // nhosts]
+
+    def _order(self):
+        if self.randomize:
+            return iter(CyclicPermutation(self.total, self.seed))
+        return iter(range(self.total))
+
+    def _address(self, host):
+        addr = self._addresses.get(host)
+        if addr is None:
+            try:
+                addr = str(ipaddress.ip_address(host))
+            except ValueError:
+                addr = socket.getaddrinfo(host, None, type=socket.SOCK_DGRAM)[0][4][0]
+            self._addresses[host] = addr
+        return addr
+
+    def _socket(self, addr):
+        family = socket.AF_INET6 if ":" in addr else socket.AF_INET
+        sock = self._sockets.get(family)
+        if sock is None:
+            sock = socket.socket(family, socket.SOCK_DGRAM)
+            sock.setblocking(False)
+            try:
+                if family == socket.AF_INET6:
+                    sock.setsockopt(socket.IPPROTO_IPV6, IPV6_RECVERR, 1)
+                else:
+                    sock.setsockopt(socket.IPPROTO_IP, IP_RECVERR, 1)
+            except OSError:
+                pass  # no extended errors on this platform
+            asyncio.get_running_loop().add_reader(sock.fileno(), self._readable, sock)
+            self._sockets[family] = sock
+        return sock
+
+    # ─── Receiving ────────────────────────────────────
+    def _readable(self, sock):
+        self._read_errors(sock)
+        while True:
+            try:
+                data, addr = sock.recvfrom(65535)
+            except BlockingIOError:
+                break
+            except OSError:
+                # the pending ICMP error; its details are in the error queue
+                self._read_errors(sock)
+                continue
+            self._answer(addr[0], addr[1], OPEN, data)
+
+    def _read_errors(self, sock):
+        while True:
+            try:
+                _, ancdata, _, addr = sock.recvmsg(512, 512, MSG_ERRQUEUE)
+            except OSError:
+                return
+            for level, kind, cdata in ancdata:
+                if kind not in (IP_RECVERR, IPV6_RECVERR) or len(cdata) < 8:
+                    continue
+                _, origin, icmp_type, code = struct.unpack("=IBBB", cdata[:7])
+                if origin not in (SO_EE_ORIGIN_ICMP, SO_EE_ORIGIN_ICMP6):
+                    continue
+                state = CLOSED if (icmp_type, code) in PORT_UNREACHABLE else FILTERED
+                self._answer(addr[0], addr[1], state, None)
+
+    def _answer(self, addr, port, state, data):
+        pending = self._inflight.pop((addr, port), None)
+        if pending is not None:  # else late or unsolicited
+            self._resolve(pending[0], state, data)
+
+    def _resolve(self, i, state, data):
+        host, port = self._pair(i)
+        self.states[state] += 1
+        if state in self.report:
+            entry = port_entry(host, port, state, get_service_name(port),
+                               udp_banner(port, data) if data else "")
+            entry["protocol"] = "udp"
+            if self.keep_results:
+                self.results.append(entry)
+            task = asyncio.ensure_future(self._deliver(entry))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+
+    async def _deliver(self, entry):
+        try:
+            await call_result_cb(self.result_cb, entry)
+        except Exception:
+            pass
+
+    # ─── Sending ──────────────────────────────────────
+    def _expire(self, now):
+        # deadlines grow with send order, so the oldest probes come first
+        while self._inflight:
+            key = next(iter(self._inflight))
+            pair, deadline = self._inflight[key]
+            if deadline > now:
+                break
+            del self._inflight[key]
+            self._silent.append(pair)
+
+    def _progress(self):
+        if self.progress_cb:
+            try:
+                self.progress_cb(self.scanned, self.total)
+            except Exception:
+                pass
+
+    async def _send(self, i, first):
+        host, port = self._pair(i)
+        if self.limiter:
+            await self.limiter.acquire(host)
+        addr = self._address(host)
+        sock = self._socket(addr)
+        key = (addr, port)
+        # a retry replaces the old entry, moving it to the back of the line
+        self._inflight.pop(key, None)
+        self._inflight[key] = (i, time.monotonic() + self.timeout)
+        failed = False
+        while True:
+            try:
+                sock.sendto(udp_probe_for_port(port).request(host), key)
+                break
+            except BlockingIOError:
+                await asyncio.sleep(0.001)  # socket buffer full
+            except OSError:
+                # usually the ICMP error of an earlier probe, reported on
+                # this call: take it from the error queue and send again
+                self._read_errors(sock)
+                if failed:
+                    # unroutable and the like: nothing will ever answer
+                    self._answer(addr, port, FILTERED, None)
+                    break
+                failed = True
+        if first:
+            self.scanned += 1
+            self._progress()
+
+    async def _pass(self, pairs, first):
+        for n, i in enumerate(pairs):
+            await self._send(i, first)
+            if n % 256 == 0:
+                self._expire(time.monotonic())
+                await asyncio.sleep(0)  # let replies in when not rate-limited
+        # wait out the probes still in flight
+        while self._inflight:
+            self._expire(time.monotonic())
+            await asyncio.sleep(0.05)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            pairs = self._order()
+            for attempt in range(self.retries + 1):
+                await self._pass(pairs, first=attempt == 0)
+                pairs, self._silent = self._silent, array.array("Q")
+                if not pairs:
+                    break
+
+            # still silent after every retry: open|filtered
+            for i in pairs:
+                self._resolve(i, FILTERED, None)
+            await asyncio.gather(*self._deliveries)
+        finally:
+            for sock in self._sockets.values():
+                loop.remove_reader(sock.fileno())
+                sock.close()
+            self._sockets = {}
+        return self.results
+
+    def stream(self, maxsize=1000):
+        """Async iterator over results as they are found."""
+        return stream_results(self, maxsize)
@@ -1,10 +1,10 @@
-import socket
 import json
 import csv
 from datetime import datetime
-import ipaddress
 import sys
 
+from portxcan.targets import parse_targets, parse_targets_async, resolve_addresses
+
 def end_progress():
     sys.stdout.write("\n")
 
@@ -18,133 +18,138 @@ def print_progress(current, total, prefix=""):
     )
     sys.stdout.flush()
 def resolve_target(target):
-    try:
-        return socket.gethostbyname(target)
-    except socket.gaierror:
-        raise ValueError("Unable to resolve target hostname")
+    # IPv4 or IPv6, whichever the resolver prefers and is routable
+    return str(resolve_addresses(target)[0])
     
-COMMON_SERVICES = {
-    # --- File Transfer ---
-    20: "FTP-DATA",
-    21: "FTP",
-    22: "SSH",
-    69: "TFTP",
-    115: "SFTP",
-
-    # --- Remote Access ---
-    23: "TELNET",
-    3389: "RDP",
-    5900: "VNC",
-    5901: "VNC-1",
-    5902: "VNC-2",
-    2222: "SSH-ALT",
-
-    # --- Email ---
-    25: "SMTP",
-    110: "POP3",
-    143: "IMAP",
-    465: "SMTPS",
-    587: "SMTP-Submission",
-    993: "IMAPS",
-    995: "POP3S",
-
-    # --- Web ---
-    80: "HTTP",
-    443: "HTTPS",
-    8080: "HTTP-ALT",
-    8000: "HTTP-DEV",
-    8008: "HTTP-ALT",
-    8443: "HTTPS-ALT",
-    8888: "HTTP-ALT",
-
-    # --- Name / Directory Services ---
-    53: "DNS",
-    88: "Kerberos",
-    389: "LDAP",
-    636: "LDAPS",
-    3268: "Global-Catalog",
-    3269: "Global-Catalog-SSL",
-
-    # --- Windows / SMB ---
-    135: "MSRPC",
-    137: "NetBIOS-NS",
-    138: "NetBIOS-DGM",
-    139: "NetBIOS-SSN",
-    445: "SMB",
-    593: "RPC-over-HTTP",
-
-    # --- Databases ---
-    1433: "MSSQL",
-    1521: "Oracle",
-    1830: "Oracle-DB",
-    2049: "NFS",
-    2082: "cPanel",
-    2083: "cPanel-SSL",
-    2086: "WHM",
-    2087: "WHM-SSL",
-    2095: "Webmail",
-    2096: "Webmail-SSL",
-    3306: "MySQL",
-    5432: "PostgreSQL",
-    5433: "PostgreSQL-ALT",
-    6379: "Redis",
-    27017: "MongoDB",
-
-    # --- Application Servers ---
-    7001: "WebLogic",
-    7002: "WebLogic-SSL",
-    8005: "Tomcat-Shutdown",
-    8009: "Tomcat-AJP",
-    8081: "HTTP-ALT",
-    8181: "HTTP-ALT",
-    9000: "PHP-FPM",
-    9042: "Cassandra",
-    9200: "Elasticsearch",
-    9300: "Elasticsearch-Cluster",
-
-    # --- Monitoring / Management ---
-    10000: "Webmin",
-    9090: "Prometheus",
-    3000: "Grafana",
-    5601: "Kibana",
-
-    # --- DevOps / Containers ---
-    2375: "Docker",
-    2376: "Docker-SSL",
-    6443: "Kubernetes-API",
-    10250: "Kubelet",
-    10255: "Kubelet-RO",
-
-    # --- VPN ---
-    1194: "OpenVPN",
-    500: "IPSec-IKE",
-    1701: "L2TP",
-    4500: "IPSec-NAT-T",
-
-    # --- Messaging / Queues ---
-    5672: "RabbitMQ",
-    5671: "RabbitMQ-SSL",
-    61616: "ActiveMQ",
-    9092: "Kafka",
-
-    # --- Cache / Search ---
-    11211: "Memcached",
-    8983: "Solr",
-
-    # --- Version Control ---
-    9418: "Git",
-    3690: "Subversion",
-
-    # --- Time / Infra ---
-    123: "NTP",
-    161: "SNMP",
-    162: "SNMP-TRAP",
+# well-known ports by category; the categories double as port profiles
+# (see portxcan.ports)
+SERVICE_CATEGORIES = {
+    "file-transfer": {
+        20: "FTP-DATA",
+        21: "FTP",
+        22: "SSH",
+        69: "TFTP",
+        115: "SFTP",
+    },
+    "remote-access": {
+        23: "TELNET",
+        3389: "RDP",
+        5900: "VNC",
+        5901: "VNC-1",
+        5902: "VNC-2",
+        2222: "SSH-ALT",
+    },
+    "email": {
+        25: "SMTP",
+        110: "POP3",
+        143: "IMAP",
+        465: "SMTPS",
+        587: "SMTP-Submission",
+        993: "IMAPS",
+        995: "POP3S",
+    },
+    "web": {
+        80: "HTTP",
+        443: "HTTPS",
+        8080: "HTTP-ALT",
+        8000: "HTTP-DEV",
+        8008: "HTTP-ALT",
+        8443: "HTTPS-ALT",
+        8888: "HTTP-ALT",
+    },
+    "directory": {
+        53: "DNS",
+        88: "Kerberos",
+        389: "LDAP",
+        636: "LDAPS",
+        3268: "Global-Catalog",
+        3269: "Global-Catalog-SSL",
+    },
+    "windows": {
+        135: "MSRPC",
+        137: "NetBIOS-NS",
+        138: "NetBIOS-DGM",
+        139: "NetBIOS-SSN",
+        445: "SMB",
+        593: "RPC-over-HTTP",
+    },
+    "databases": {
+        1433: "MSSQL",
+        1521: "Oracle",
+        1830: "Oracle-DB",
+        2049: "NFS",
+        2082: "cPanel",
+        2083: "cPanel-SSL",
+        2086: "WHM",
+        2087: "WHM-SSL",
+        2095: "Webmail",
+        2096: "Webmail-SSL",
+        3306: "MySQL",
+        5432: "PostgreSQL",
+        5433: "PostgreSQL-ALT",
+        6379: "Redis",
+        27017: "MongoDB",
+    },
+    "app-servers": {
+        7001: "WebLogic",
+        7002: "WebLogic-SSL",
+        8005: "Tomcat-Shutdown",
+        8009: "Tomcat-AJP",
+        8081: "HTTP-ALT",
+        8181: "HTTP-ALT",
+        9000: "PHP-FPM",
+        9042: "Cassandra",
+        9200: "Elasticsearch",
+        9300: "Elasticsearch-Cluster",
+    },
+    "monitoring": {
+        10000: "Webmin",
+        9090: "Prometheus",
+        3000: "Grafana",
+        5601: "Kibana",
+    },
+    "devops": {
+        2375: "Docker",
+        2376: "Docker-SSL",
+        6443: "Kubernetes-API",
+        10250: "Kubelet",
+        10255: "Kubelet-RO",
+    },
+    "vpn": {
+        1194: "OpenVPN",
+        500: "IPSec-IKE",
+        1701: "L2TP",
+        4500: "IPSec-NAT-T",
+    },
+    "messaging": {
+        5672: "RabbitMQ",
+        5671: "RabbitMQ-SSL",
+        61616: "ActiveMQ",
+        9092: "Kafka",
+    },
+    "cache": {
+        11211: "Memcached",
+        8983: "Solr",
+    },
+    "vcs": {
+        9418: "Git",
+        3690: "Subversion",
+    },
+    "infra": {
+        123: "NTP",
+        161: "SNMP",
+        162: "SNMP-TRAP",
+    },
+    "misc": {
+        179: "BGP",
+        4433: "HTTPS-ALT",
+        5060: "SIP",
+        5061: "SIP-TLS",
+    },
+}
 
-    # --- Misc ---
-    179: "BGP",
-    4433: "HTTPS-ALT",
-    5060: "SIP",
-    5061: "SIP-TLS",
+COMMON_SERVICES = {
+    port: name for services in SERVICE_CATEGORIES.values() for port, name in services.items()
 }
 
 
@@ -163,30 +168,33 @@ def write_json_report(filename, target, results):
 def write_csv_report(filename, results):
     with open(filename, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
-        writer.writerow(["host", "port", "service", "banner"])
+        writer.writerow(["host", "port", "service", "product", "version", "banner", "state"])
         for entry in results:
             writer.writerow([
                 entry.get("host"),
                 entry.get("port"),
                 entry.get("service"),
-                entry.get("banner")
+                entry.get("product", ""),
+                entry.get("version", ""),
+                entry.get("banner"),
+                entry.get("state", "open")
             ])
 def get_service_name(port):
     return COMMON_SERVICES.get(port, "Unknown")
 
-def expand_target(target):
+def expand_target(target, exclude=None, files=True):
     """
-    Returns a list of IP addresses.
+    Returns the addresses to scan as a lazy TargetSet.
     Supports:
     - Single IP
     - Hostname
     - CIDR range
+    - Address ranges, target files (@file) and exclusions,
+      see portxcan.targets.parse_targets
     """
-    if "/" in target:
-        try:
-            network = ipaddress.ip_network(target, strict=False)
-            return [str(ip) for ip in network.hosts()]
-        except ValueError:
-            raise ValueError("Invalid CIDR notation")
-    else:
-        return [resolve_target(target)]
+    return parse_targets(target, exclude, files)
+
+
+async def expand_target_async(target, exclude=None, files=True):
+    """expand_target() that does not block the event loop while resolving."""
+    return await parse_targets_async(target, exclude, files)
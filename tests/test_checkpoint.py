@@ -0,0 +1,130 @@
+import asyncio
+import socket
+
+from portxcan.checkpoint import Checkpoint, Frontier, job_signature
+from portxcan.engine import ScanEngine
+from portxcan.permute import CyclicPermutation
+from portxcan.states import ERROR, OPEN
+
+
+def test_frontier_watermark():
+    frontier = Frontier()
+    for index in (2, 0, 3):
+        frontier.finish(index)
+    assert (frontier.watermark, frontier.done) == (1, {2, 3})
+    frontier.finish(1)
+    assert (frontier.watermark, frontier.done, frontier.count) == (4, set(), 4)
+    # finishing twice counts once
+    frontier.finish(2)
+    assert frontier.count == 4
+    assert frontier.is_done(3) and not frontier.is_done(4)
+
+
+def test_save_and_load(tmp_path):
+    ckpt = Checkpoint(str(tmp_path / "scan.json"), {"target": "10.0.0.0/24"})
+    ckpt.signature = "job"
+    ckpt.record({"host": "10.0.0.1", "port": 22})
+    for index in (0, 1, 5):
+        ckpt.finish(index)
+    ckpt.save()
+    ckpt.close()
+
+    again = Checkpoint(ckpt.path)
+    assert again.is_pending()
+    assert again.pending_meta() == {"target": "10.0.0.0/24"}
+    assert again.load("job")
+    assert (again.frontier.watermark, again.frontier.done) == (2, {5})
+    assert list(again.saved_results()) == [{"host": "10.0.0.1", "port": 22}]
+
+
+def test_other_job_results_are_dropped(tmp_path):
+    ckpt = Checkpoint(str(tmp_path / "scan.json"))
+    ckpt.signature = "old"
+    ckpt.record({"host": "10.0.0.1", "port": 22})
+    ckpt.save()
+    ckpt.close()
+
+    other = Checkpoint(ckpt.path)
+    assert not other.load("new")
+    assert list(other.saved_results()) == []
+    assert other.frontier.count == 0
+
+
+def test_complete_checkpoint_is_not_pending(tmp_path):
+    ckpt = Checkpoint(str(tmp_path / "scan.json"))
+    ckpt.save(complete=True)
+    assert not ckpt.is_pending()
+    assert ckpt.pending_meta() is None
+
+
+def _listener():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen()
+    return sock
+
+
+def test_engine_resumes_from_frontier(tmp_path):
+    listener = _listener()
+    port = listener.getsockname()[1]
+    ports = range(port - 20, port + 20)
+    try:
+        first = Checkpoint(str(tmp_path / "scan.json"))
+        engine = ScanEngine(["127.0.0.1"], ports, timeout=0.5, grab_banners=False,
+                            checkpoint=first, retries=0)
+        asyncio.run(engine.run())
+        assert [e["port"] for e in engine.results] == [port]
+
+        # pretend the scan stopped halfway: only the first 10 pairs are done
+        order = f"permuted {engine.seed}"
+        resumed = Checkpoint(first.path)
+        resumed.signature = job_signature(engine.hosts, engine.ports, None, order)
+        resumed.frontier = Frontier(10)
+        resumed.save()
+
+        resumed = Checkpoint(first.path)
+        engine = ScanEngine(["127.0.0.1"], ports, timeout=0.5, grab_banners=False,
+                            checkpoint=resumed, retries=0)
+        asyncio.run(engine.run())
+    finally:
+        listener.close()
+    # the open port was replayed from the results file or found again
+    assert [e["port"] for e in engine.results] == [port]
+    assert engine.scanned == len(ports)
+    assert engine.states[OPEN] + engine.states["closed"] == len(ports) - 10
+    assert resumed.frontier.watermark == len(ports)
+
+
+def test_unresolved_pairs_do_not_stall_the_frontier(tmp_path):
+    ckpt = Checkpoint(str(tmp_path / "scan.json"))
+    engine = ScanEngine(["127.0.0.1"], range(1, 101), grab_banners=False, checkpoint=ckpt)
+
+    async def out_of_sockets(host, port, index=None, scale=1.0):
+        engine.unresolved += 1
+        return None
+
+    engine.probe = out_of_sockets
+    asyncio.run(engine.run())
+    assert engine.states[ERROR] == 100
+    assert (ckpt.frontier.watermark, ckpt.frontier.done) == (100, set())
+
+
+def test_resume_restarts_the_walk_at_the_watermark(tmp_path):
+    hosts = [f"10.0.0.{i}" for i in range(10)]
+    ckpt = Checkpoint(str(tmp_path / "scan.json"))
+    engine = ScanEngine(hosts, range(1, 101), checkpoint=ckpt, shard=(1, 3), fit_fds=False)
+    asyncio.run(engine._resume())
+    walk = engine._pairs()
+    started = [next(walk) for _ in range(50)]
+    # 40..44 were still in flight when the scan stopped
+    for index, _ in started[:40] + started[45:]:
+        ckpt.finish(index)
+    ckpt.save()
+    steps = [step for step, _ in CyclicPermutation(engine.total, engine.seed).walk()]
+    remaining = started[40:45] + list(walk)
+
+    resumed = Checkpoint(ckpt.path)
+    engine = ScanEngine(hosts, range(1, 101), checkpoint=resumed, shard=(1, 3), fit_fds=False)
+    asyncio.run(engine._resume())
+    assert (resumed.frontier.watermark, resumed.frontier.step) == (40, steps[40])
+    assert list(engine._pairs()) == remaining
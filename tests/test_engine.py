@@ -0,0 +1,100 @@
+import asyncio
+import socket
+import time
+
+import pytest
+
+from portxcan.engine import ScanEngine
+from portxcan.states import CLOSED, FILTERED, OPEN
+
+
+@pytest.fixture
+def ports():
+    """(open, closed, black-holed) loopback ports."""
+    socks = []
+
+    def bound():
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        socks.append(sock)
+        return sock
+
+    listener = bound()
+    listener.listen()
+    closed = socket.socket()
+    closed.bind(("127.0.0.1", 0))
+    closed_port = closed.getsockname()[1]
+    closed.close()
+    # a full accept queue makes the kernel drop further SYNs unanswered
+    blackhole = bound()
+    blackhole.listen(0)
+    for _ in range(3):
+        c = socket.socket()
+        c.setblocking(False)
+        c.connect_ex(blackhole.getsockname())
+        socks.append(c)
+    time.sleep(0.1)
+    yield listener.getsockname()[1], closed_port, blackhole.getsockname()[1]
+    for sock in socks:
+        sock.close()
+
+
+def test_probe_states(ports):
+    open_port, closed_port, blackholed = ports
+    engine = ScanEngine(["127.0.0.1"], ports, timeout=0.2, adaptive=False, grab_banners=False,
+                        retries=0, report=(OPEN, CLOSED, FILTERED))
+    asyncio.run(engine.run())
+    states = {e["port"]: e["state"] for e in engine.results}
+    assert states == {open_port: OPEN, closed_port: CLOSED, blackholed: FILTERED}
+    assert engine.scanned == engine.total == 3
+
+
+def test_filtered_ports_are_retried_with_a_longer_timeout(ports):
+    blackholed = ports[2]
+    engine = ScanEngine(["127.0.0.1"], [blackholed], timeout=0.1, adaptive=False,
+                        grab_banners=False, retries=2, retry_backoff=2.0, retry_delay=0.01)
+    timeouts = []
+    connect_timeout = engine.connect_timeout
+
+    def recorded(host, scale=1.0):
+        timeouts.append(connect_timeout(host, scale))
+        return timeouts[-1]
+
+    engine.connect_timeout = recorded
+    asyncio.run(engine.run())
+    assert engine.states[FILTERED] == 1
+    assert timeouts == pytest.approx([0.1, 0.2, 0.4])
+
+
+def test_rtt_state_is_bounded():
+    hosts = [f"10.0.0.{i}" for i in range(10)]
+    engine = ScanEngine(hosts, [80], timeout=1, rtt_hosts=3)
+    assert engine.connect_timeout(hosts[0]) == 1
+    for host in hosts:
+        engine._sample_rtt(host, 0.01)
+    assert list(engine._rtt) == hosts[-3:]
+    # evicted hosts fall back to the estimate shared by all hosts
+    assert engine.rtt(hosts[0]) is engine._global_rtt
+    assert engine._global_rtt.samples == 10
+    assert engine.connect_timeout(hosts[0]) == engine.min_timeout
+
+
+def test_autotuned_window_grows_past_concurrency():
+    engine = ScanEngine(["127.0.0.1"], range(1, 501), concurrency=10, max_concurrency=40,
+                        autotune=True, adaptive=False, grab_banners=False, fit_fds=False)
+    assert (engine.window, engine.max_concurrency) == (10, 40)
+    asyncio.run(engine.run())
+    # loopback answers every probe (mostly with RSTs)
+    assert engine.window == 40
+
+
+def test_shards_split_the_pairs():
+    hosts = [f"10.0.0.{i}" for i in range(30)]
+    ports = range(1, 101)
+    seen = []
+    for k in range(7):
+        engine = ScanEngine(hosts, ports, shard=(k, 7), fit_fds=False)
+        pairs = [engine._pair(i) for _, i in engine._pairs()]
+        assert len(pairs) == engine.total
+        seen += pairs
+    assert sorted(seen) == sorted((host, port) for host in hosts for port in ports)
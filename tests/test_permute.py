@@ -0,0 +1,37 @@
+import pytest
+
+from portxcan.permute import CyclicPermutation, is_prime, next_prime, prime_factors
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 3, 4, 10, 97, 100, 1000, 65535, 100003])
+def test_visits_every_index_once(n):
+    order = list(CyclicPermutation(n, seed=7))
+    assert len(order) == n
+    assert sorted(order) == list(range(n))
+
+
+def test_seed_fixes_the_order():
+    assert list(CyclicPermutation(5000, seed=1)) == list(CyclicPermutation(5000, seed=1))
+    assert list(CyclicPermutation(5000, seed=1)) != list(CyclicPermutation(5000, seed=2))
+
+
+def test_walk_resumes_from_a_step():
+    perm = CyclicPermutation(1000, seed=3)
+    steps = list(perm.walk())
+    step, _ = steps[400]
+    assert list(perm.walk(step + 1)) == steps[401:]
+
+
+def test_order_is_shuffled():
+    order = list(CyclicPermutation(10000, seed=11))
+    assert order != sorted(order)
+    # neighbours in the walk are rarely neighbours in the range
+    adjacent = sum(abs(a - b) == 1 for a, b in zip(order, order[1:]))
+    assert adjacent < 100
+
+
+def test_primes():
+    assert [n for n in range(30) if is_prime(n)] == [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]
+    assert next_prime(65535) == 65537
+    assert prime_factors(2 ** 4 * 3 * 65537) == {2, 3, 65537}
+    assert prime_factors(600851475143) == {71, 839, 1471, 6857}
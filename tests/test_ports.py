@@ -0,0 +1,44 @@
+import pytest
+
+from portxcan.ports import PORT_PROFILES, PortSet, parse_ports
+
+
+def test_ports_ranges_and_exclusions():
+    ports = parse_ports("443, 80 22,8000-8003 !8001")
+    assert list(ports) == [22, 80, 443, 8000, 8002, 8003]
+    assert str(ports) == "22,80,443,8000,8002-8003"
+    assert ports[3] == 8000 and ports[-1] == 8003
+    assert 8001 not in ports and 443 in ports
+
+
+def test_open_ended_ranges():
+    assert parse_ports("-1024").ranges == [(1, 1024)]
+    assert parse_ports("60000-").ranges == [(60000, 65535)]
+    assert len(parse_ports("all")) == 65535
+
+
+def test_profiles():
+    top100 = parse_ports("top-100")
+    assert len(top100) == 100
+    assert all(port in parse_ports("top-1000") for port in top100)
+    assert 6379 in parse_ports("common")
+    assert parse_ports("TOP-100, !80") == top100.exclude(PortSet([(80, 80)]))
+    for name in PORT_PROFILES:
+        assert len(parse_ports(name))
+
+
+def test_str_round_trips():
+    ports = parse_ports("top-1000")
+    assert parse_ports(str(ports)) == ports
+
+
+@pytest.mark.parametrize("spec, error", [
+    ("0", "Invalid port"),
+    ("65536", "Invalid port"),
+    ("90-80", "Invalid port range"),
+    ("http", "Unknown port or profile"),
+    ("80, !80", "No ports"),
+])
+def test_invalid_specs(spec, error):
+    with pytest.raises(ValueError, match=error):
+        parse_ports(spec)
@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+from portxcan.ratelimit import RateLimiter, TokenBucket
+
+
+def test_bucket_allows_a_burst_then_spaces_tokens():
+    bucket = TokenBucket(rate=10, burst=2)
+    waits = [bucket.reserve() for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2:] == pytest.approx([0.1, 0.2], abs=0.01)
+    # a lower factor stretches the wait
+    assert bucket.reserve(factor=0.5) == pytest.approx(0.6, abs=0.02)
+
+
+def test_threads_share_one_bucket_per_host():
+    limiter = RateLimiter(host_rate=10, burst=1, backoff=False)
+    waits = []
+    start = threading.Barrier(20)
+
+    def take():
+        start.wait()
+        waits.append(limiter.reserve("10.0.0.1"))
+
+    threads = [threading.Thread(target=take) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(limiter._hosts) == 1
+    # one bucket: a single free token, the rest queue up behind it
+    assert sorted(waits) == pytest.approx([i / 10 for i in range(20)], abs=0.02)
+
+
+def test_idle_hosts_are_forgotten():
+    limiter = RateLimiter(host_rate=1, burst=1, max_hosts=2)
+    limiter.reserve("10.0.0.1")
+    limiter.reserve("10.0.0.2")
+    limiter._hosts["10.0.0.2"].stamp -= 1  # refilled long ago
+    limiter.reserve("10.0.0.3")
+    assert set(limiter._hosts) == {"10.0.0.1", "10.0.0.3"}
+
+
+def test_loss_spike_halves_the_rate_and_recovers():
+    limiter = RateLimiter(rate=100, window=10)
+    for _ in range(10):
+        limiter.record(True)
+    for _ in range(10):
+        limiter.record(False)
+    assert limiter.factor == 0.5
+    for _ in range(10):
+        limiter.record(True)
+    assert limiter.factor == 0.625
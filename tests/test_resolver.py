@@ -0,0 +1,95 @@
+import asyncio
+import socket
+import struct
+
+from portxcan.resolver import (
+    QTYPE_A, QTYPE_AAAA, QTYPE_CNAME, QTYPE_SOA, RCODE_NOERROR, RCODE_NXDOMAIN,
+    Resolver, parse_reply, search_options,
+)
+
+
+def _name(name):
+    return b"".join(bytes([len(label)]) + label.encode() for label in name.split(".")) + b"\x00"
+
+
+def _reply(qtype, answers=(), authority=(), rcode=RCODE_NOERROR, name="example.com"):
+    # answers/authority: (type, ttl, rdata); owner names point at the question
+    header = struct.pack("!HHHHHH", 0x1234, 0x8180 | rcode, 1, len(answers), len(authority), 0)
+    question = _name(name) + struct.pack("!HH", qtype, 1)
+    records = b"".join(
+        b"\xc0\x0c" + struct.pack("!HHIH", rtype, 1, ttl, len(rdata)) + rdata
+        for rtype, ttl, rdata in (*answers, *authority)
+    )
+    return header + question + records
+
+
+def test_a_records():
+    data = _reply(QTYPE_A, [
+        (QTYPE_A, 300, socket.inet_aton("192.0.2.1")),
+        (QTYPE_A, 120, socket.inet_aton("192.0.2.2")),
+    ])
+    assert parse_reply(data, QTYPE_A) == (RCODE_NOERROR, ["192.0.2.1", "192.0.2.2"], 120)
+
+
+def test_aaaa_records_skip_other_types():
+    data = _reply(QTYPE_AAAA, [
+        (QTYPE_A, 30, socket.inet_aton("192.0.2.1")),
+        (QTYPE_AAAA, 600, socket.inet_pton(socket.AF_INET6, "2001:db8::1")),
+    ])
+    # the stray A record is skipped, but its TTL is not used either
+    assert parse_reply(data, QTYPE_AAAA) == (RCODE_NOERROR, ["2001:db8::1"], 600)
+
+
+def test_cname_chain_ttl():
+    data = _reply(QTYPE_A, [
+        (QTYPE_CNAME, 60, _name("www.example.net")),
+        (QTYPE_A, 3600, socket.inet_aton("198.51.100.7")),
+    ])
+    assert parse_reply(data, QTYPE_A) == (RCODE_NOERROR, ["198.51.100.7"], 60)
+
+
+def test_nxdomain_uses_soa_minimum():
+    soa = _name("ns.example.com") + _name("admin.example.com") + struct.pack("!IIIII", 1, 2, 3, 4, 45)
+    data = _reply(QTYPE_A, authority=[(QTYPE_SOA, 900, soa)], rcode=RCODE_NXDOMAIN)
+    assert parse_reply(data, QTYPE_A) == (RCODE_NXDOMAIN, [], 45)
+
+
+def test_no_caching_information():
+    assert parse_reply(_reply(QTYPE_A), QTYPE_A) == (RCODE_NOERROR, [], None)
+
+
+def test_search_options(tmp_path):
+    conf = tmp_path / "resolv.conf"
+    conf.write_text(
+        "nameserver 10.0.0.10\n"
+        "search ns.svc.cluster.local svc.cluster.local.\n"
+        "options ndots:5 timeout:1  # comment\n"
+    )
+    assert search_options(str(conf)) == (["ns.svc.cluster.local", "svc.cluster.local"], 5)
+    assert search_options(str(tmp_path / "missing")) == ([], 1)
+
+
+def test_direct_lookups_follow_ndots():
+    resolver = Resolver(servers=[])
+    resolver.search, resolver.ndots = ["svc.cluster.local"], 2
+    assert not resolver._direct("db.ns")
+    assert resolver._direct("www.example.com")
+    assert not resolver._direct("printer.local")
+    assert not resolver._direct("localhost")
+    resolver.search = []
+    assert resolver._direct("db.ns")
+
+
+def test_getaddrinfo_fallback_is_cached():
+    resolver = Resolver(servers=[])
+    calls = []
+
+    async def getaddrinfo(name):
+        calls.append(name)
+        return ["192.0.2.9"] if name == "db.ns" else None
+
+    resolver._getaddrinfo = getaddrinfo
+    for _ in range(2):
+        result = asyncio.run(resolver.resolve_many(["db.ns", "DB.ns.", "gone.invalid"]))
+        assert result == {"db.ns": ["192.0.2.9"], "DB.ns.": ["192.0.2.9"], "gone.invalid": None}
+    assert sorted(calls) == ["db.ns", "gone.invalid"]
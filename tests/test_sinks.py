@@ -0,0 +1,76 @@
+import asyncio
+import csv
+import json
+
+from portxcan.sinks import CSV_FIELDS, CsvWriter, NdjsonWriter, stream_results
+
+
+ENTRIES = [
+    {"host": "10.0.0.1", "port": 22, "state": "open", "service": "ssh", "banner": "SSH-2.0"},
+    {"host": "10.0.0.2", "port": 80, "state": "open", "service": "http"},
+]
+
+
+def test_ndjson_appends_one_object_per_line(tmp_path):
+    path = str(tmp_path / "scan.ndjson")
+    with NdjsonWriter(path) as writer:
+        writer(ENTRIES[0])
+    with NdjsonWriter(path) as writer:
+        writer(ENTRIES[1])
+        assert writer.count == 1
+    with open(path, encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == ENTRIES
+
+
+def test_ndjson_flushes_every_n_entries(tmp_path):
+    path = tmp_path / "scan.ndjson"
+    writer = NdjsonWriter(str(path), flush_every=2, flush_interval=60)
+    writer.write(ENTRIES[0])
+    assert path.read_text() == ""
+    writer.write(ENTRIES[1])
+    assert len(path.read_text().splitlines()) == 2
+    writer.close()
+
+
+def test_csv_writes_the_header_once(tmp_path):
+    path = str(tmp_path / "scan.csv")
+    for entry in ENTRIES:
+        with CsvWriter(path) as writer:
+            writer(entry)
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == CSV_FIELDS
+    assert rows[1] == ["10.0.0.1", "22", "ssh", "", "", "SSH-2.0", "open"]
+    # missing fields are left empty
+    assert rows[2] == ["10.0.0.2", "80", "http", "", "", "", "open"]
+
+
+class _Scanner:
+    def __init__(self, count):
+        self.count = count
+        self.produced = 0
+        self.result_cb = None
+
+    async def run(self):
+        for port in range(self.count):
+            await self.result_cb({"port": port})
+            self.produced += 1
+
+
+def test_stream_results_applies_backpressure():
+    scanner = _Scanner(100)
+    seen = []
+    scanner.result_cb = seen.append
+
+    async def consume():
+        ahead = []
+        async for entry in stream_results(scanner, maxsize=5):
+            await asyncio.sleep(0)
+            ahead.append(scanner.produced - entry["port"])
+        return ahead
+
+    ahead = asyncio.run(consume())
+    # the scan never runs more than the queue size ahead of the consumer
+    assert max(ahead) <= 6
+    assert len(seen) == 100
+    assert scanner.result_cb == seen.append
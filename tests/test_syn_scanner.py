@@ -0,0 +1,75 @@
+import socket
+import struct
+
+import pytest
+
+from portxcan.states import CLOSED, OPEN
+from portxcan.syn_scanner import TCP_ACK, TCP_RST, TCP_SYN, SynScanner, can_syn_scan, checksum
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _reply(scanner, src, sport, flags, ack=None):
+    # IPv4 header without options, then the TCP header up to the flags
+    if ack is None:
+        ack = (scanner._cookie(src, sport) + 1) & 0xFFFFFFFF
+    ip = bytes([0x45]) + bytes(11) + socket.inet_aton(src) + socket.inet_aton("127.0.0.1")
+    tcp = struct.pack("!HHLLBBHHH", sport, scanner.src_port, 0, ack, 5 << 4, flags, 0, 0, 0)
+    return ip + tcp
+
+
+def test_checksum():
+    # RFC 1071 example: words 0001 f203 f4f5 f6f7 sum to 0xddf2
+    assert checksum(bytes.fromhex("0001f203f4f5f6f7")) == ~0xDDF2 & 0xFFFF
+    # odd lengths are padded with a zero byte
+    assert checksum(b"\x01") == checksum(b"\x01\x00")
+
+
+def test_build_syn_checksum_verifies():
+    scanner = SynScanner(["127.0.0.1"], [80], src_port=40000)
+    header = scanner.build_syn("127.0.0.1", "127.0.0.1", 80)
+    pseudo = struct.pack(
+        "!4s4sBBH", socket.inet_aton("127.0.0.1"), socket.inet_aton("127.0.0.1"),
+        0, socket.IPPROTO_TCP, len(header)
+    )
+    assert checksum(pseudo + header) == 0
+    sport, dport, seq, _, _, flags = struct.unpack("!HHLLBB", header[:14])
+    assert (sport, dport, flags) == (40000, 80, TCP_SYN)
+    assert seq == scanner._cookie("127.0.0.1", 80)
+
+
+def test_handle_packet_validates_replies():
+    scanner = SynScanner(["127.0.0.1"], [80, 81], src_port=40000)
+    scanner.handle_packet(_reply(scanner, "127.0.0.1", 80, TCP_SYN | TCP_ACK))
+    # duplicates and replies with a wrong cookie are ignored
+    scanner.handle_packet(_reply(scanner, "127.0.0.1", 80, TCP_SYN | TCP_ACK))
+    scanner.handle_packet(_reply(scanner, "127.0.0.1", 82, TCP_SYN | TCP_ACK, ack=1))
+    scanner.handle_packet(_reply(scanner, "127.0.0.1", 81, TCP_RST | TCP_ACK))
+    assert [(e["host"], e["port"], e["state"]) for e in scanner.results] == [("127.0.0.1", 80, OPEN)]
+    assert scanner.closed == 1
+
+
+def test_rejects_ipv6_targets():
+    with pytest.raises(ValueError):
+        SynScanner(["::1"], [80])
+
+
+@pytest.mark.skipif(not can_syn_scan(), reason="needs raw sockets (root / CAP_NET_RAW)")
+def test_loopback_scan():
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    open_port = listener.getsockname()[1]
+    closed_port = _free_port()
+    try:
+        scanner = SynScanner(["127.0.0.1"], [open_port, closed_port], timeout=0.5)
+        results = scanner.run()
+    finally:
+        listener.close()
+    assert [(e["port"], e["state"]) for e in results] == [(open_port, OPEN)]
+    assert scanner.states[CLOSED] == 1
+    assert scanner.scanned == 2
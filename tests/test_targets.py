@@ -0,0 +1,57 @@
+import pytest
+
+from portxcan.targets import TargetSet, has_ipv6, parse_targets
+
+
+def test_cidr_skips_network_and_broadcast():
+    targets = parse_targets("10.0.0.0/30")
+    assert list(targets) == ["10.0.0.1", "10.0.0.2"]
+    assert list(parse_targets("10.0.0.0/31")) == ["10.0.0.0", "10.0.0.1"]
+
+
+def test_ranges_and_exclusions():
+    targets = parse_targets("10.0.0.1-10, 10.0.0.5-10.0.0.20, !10.0.0.8", exclude="10.0.0.20")
+    assert len(targets) == 18
+    assert targets.spans[:] == [(4, 0x0A000001, 0x0A000007), (4, 0x0A000009, 0x0A000013)]
+    assert "10.0.0.8" not in targets and "10.0.0.19" in targets
+    assert targets[0] == "10.0.0.1" and targets[-1] == "10.0.0.19"
+
+
+def test_large_blocks_stay_lazy():
+    targets = parse_targets("10.0.0.0/8")
+    assert len(targets) == 2 ** 24 - 2
+    assert len(targets.spans) == 1
+    assert targets[2 ** 23] == "10.128.0.1"
+
+
+def test_ipv6():
+    targets = parse_targets("2001:db8::/126, 192.0.2.1")
+    assert list(targets) == ["192.0.2.1", "2001:db8::1", "2001:db8::2", "2001:db8::3"]
+    assert targets.versions == {4, 6} and has_ipv6(targets)
+    with pytest.raises(ValueError, match="too large"):
+        parse_targets("2001:db8::/64")
+
+
+def test_hitlist_file(tmp_path):
+    hitlist = tmp_path / "hosts.txt"
+    hitlist.write_text("# lab\n192.0.2.1, 192.0.2.2\n\n2001:db8::10  # router\n")
+    assert list(parse_targets(f"@{hitlist}")) == ["192.0.2.1", "192.0.2.2", "2001:db8::10"]
+    with pytest.raises(ValueError, match="not allowed"):
+        parse_targets(f"@{hitlist}", files=False)
+
+
+@pytest.mark.parametrize("spec", ["10.0.0.0/33", "10.0.0.9-10.0.0.1", "10.0.0.1-::1"])
+def test_invalid_specs(spec):
+    with pytest.raises(ValueError):
+        parse_targets(spec)
+
+
+def test_everything_excluded():
+    with pytest.raises(ValueError, match="No targets"):
+        parse_targets("10.0.0.1", exclude="10.0.0.0/24")
+
+
+def test_target_set_merges_spans():
+    targets = TargetSet([(4, 1, 5), (4, 6, 8), (4, 3, 4), (6, 1, 1)])
+    assert targets.spans[:] == [(4, 1, 8), (6, 1, 1)]
+    assert len(targets) == 9
@@ -0,0 +1,49 @@
+import importlib
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+pytest.importorskip("multipart")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # the app opens its SQLite store under the working directory on import
+    monkeypatch.chdir(tmp_path)
+    app = importlib.import_module("web.app")
+    # no startup events: nothing here reaches the worker pool
+    return TestClient(app.app)
+
+
+def test_hostile_target_is_escaped(client):
+    r = client.post("/scan", data={"target": "10.0.0.1-<svg>", "ports": "80"})
+    assert r.status_code == 200
+    assert "<svg" not in r.text
+    assert "10.0.0.1-&lt;svg&gt;" in r.text
+
+
+def test_hostile_port_spec_is_escaped(client):
+    r = client.post("/scan", data={"target": "127.0.0.1", "ports": "<img src=x onerror=alert(1)>"})
+    assert r.status_code == 200
+    assert "<img" not in r.text
+    assert "&lt;img" in r.text
+
+
+def test_unresolvable_hostname_is_escaped(client, monkeypatch):
+    from portxcan import targets
+    from portxcan.resolver import Resolver
+
+    resolver = Resolver(servers=[])
+
+    async def getaddrinfo(name):
+        return None
+
+    resolver._getaddrinfo = getaddrinfo
+    monkeypatch.setattr(targets, "DEFAULT_RESOLVER", resolver)
+    r = client.post("/scan", data={"target": "<b>x", "ports": "80"})
+    assert r.status_code == 200
+    assert "<b>" not in r.text
+    assert "Unable to resolve target hostname: &lt;b&gt;x" in r.text
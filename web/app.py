@@ -3,20 +3,49 @@ from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from collections import defaultdict
 import csv
 import io
+import json
+import os
 import uuid
 import asyncio
 from datetime import datetime
 
-from portxcan.async_scanner import AsyncPortScanner
-from portxcan.utils import expand_target
-from web.templates import index_page, progress_page, results_page, history_page
+from portxcan.checkpoint import Checkpoint, pending_checkpoints
+from portxcan.ports import parse_ports
+from portxcan.sinks import CSV_FIELDS
+from portxcan.utils import expand_target_async
+from web.events import ScanChannel, finished_sse
+from web.store import ResultBatcher, ScanStore
+from web.workers import WorkerError, WorkerPool
+from web.templates import error_page, index_page, progress_page, results_page, history_page
 
 app = FastAPI(title="PortXcan Web")
 
 # ---------------------------
-# In-memory scan state
+# Scan state
 # ---------------------------
+# Live progress of running scans (plus a few recent finished ones) stays in
+# memory; scans and their results are persisted in SQLite.
 SCAN_STATE = {}
+CHANNELS = {}
+MAX_FINISHED_IN_MEMORY = 50
+HISTORY_PAGE_SIZE = 20
+RESULTS_PAGE_SIZE = 500
+
+STORE = ScanStore()
+
+# scans run in worker processes so they never compete with request
+# handling for this event loop
+POOL = WorkerPool()
+
+
+def evict_finished():
+    finished = [sid for sid, st in SCAN_STATE.items() if st["done"]]
+    for sid in finished[:max(0, len(finished) - MAX_FINISHED_IN_MEMORY)]:
+        del SCAN_STATE[sid]
+
+
+def get_scan(scan_id):
+    return SCAN_STATE.get(scan_id) or STORE.get_scan(scan_id)
 
 
 # ---------------------------
@@ -28,58 +57,160 @@ def index():
 
 
 # ---------------------------
-# Start scan (with live progress)
+# Scan task
 # ---------------------------
-@app.post("/scan", response_class=HTMLResponse)
-async def start_scan(
-    target: str = Form(...),
-    start: int = Form(1),
-    end: int = Form(1024)
-):
-    scan_id = str(uuid.uuid4())
-
-    try:
-        targets = expand_target(target)
-    except ValueError as e:
-        return HTMLResponse(f"<h3>Error: {e}</h3>")
-
-    total_ports = len(targets) * (end - start + 1)
+def launch_scan(scan_id, target, targets, spec, ports, timestamp, ttl=None, discover=True):
+    # `spec` is the port spec as typed, `ports` the PortSet it parsed to
+    total_ports = len(targets) * len(ports)
 
     SCAN_STATE[scan_id] = {
         "id": scan_id,
         "done": False,
         "scanned": 0,
         "total": total_ports,
-        "results": defaultdict(list),
         "target": target,
-        "start_port": start,
-        "end_port": end,
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "start_port": ports[0],
+        "end_port": ports[-1],
+        "ports": spec,
+        "timestamp": timestamp,
         "open_count": 0,
     }
+    STORE.create_scan(SCAN_STATE[scan_id], ttl)
+
+    # progress is checkpointed to disk so a server restart resumes the scan
+    checkpoint = Checkpoint.for_key(scan_id, meta={
+        "scan_id": scan_id,
+        "target": target,
+        "start_port": ports[0],
+        "end_port": ports[-1],
+        "ports": spec,
+        "timestamp": timestamp,
+        "ttl": ttl,
+        "discover": discover,
+    })
+
+    channel = CHANNELS[scan_id] = ScanChannel()
 
     async def run_scan():
-        for host in targets:
-            def progress_cb(scanned, total):
-                SCAN_STATE[scan_id]["scanned"] += 1
-
-            scanner = AsyncPortScanner(
-                target=host,
-                start_port=start,
-                end_port=end,
-                timeout=1,
-                progress_cb=progress_cb
-            )
-            results = await scanner.run()
-            for r in results:
-                SCAN_STATE[scan_id]["results"][host].append(r)
-
-        SCAN_STATE[scan_id]["done"] = True
-        # Compute open port count for history
-        count = sum(len(v) for v in SCAN_STATE[scan_id]["results"].values())
-        SCAN_STATE[scan_id]["open_count"] = count
+        state = SCAN_STATE[scan_id]
+        batcher = ResultBatcher(STORE, scan_id)
+
+        def publish():
+            channel.publish_progress(
+                scanned=state["scanned"], total=state["total"], open=state["open_count"],
+                window=state.get("window"))
+
+        def progress_cb(scanned, total, window=None):
+            # host discovery can shrink the total before the scan starts
+            state["scanned"] = scanned
+            state["total"] = total
+            state["window"] = window
+            batcher.tick()
+            publish()
+
+        def result_cb(entry):
+            # results reach the database in small batches as they are found
+            batcher.add(entry)
+            state["open_count"] += 1
+            channel.publish_result(entry)
+            publish()
+
+        job = {
+            "id": scan_id,
+            "hosts": targets,
+            "ports": ports,
+            "timeout": 1,
+            "discover": discover,
+            "checkpoint": checkpoint.path,
+            "meta": checkpoint.meta,
+        }
+        try:
+            try:
+                await POOL.submit(job, progress_cb, result_cb)
+            finally:
+                batcher.flush()
+            checkpoint.remove()
+        except WorkerError as e:
+            # the checkpoint stays behind, so the scan resumes on restart
+            state["error"] = str(e)
+        finally:
+            STORE.finish_scan(scan_id, state["scanned"], state["total"], state["open_count"])
+            state["done"] = True
+            evict_finished()
+            channel.close()
+            CHANNELS.pop(scan_id, None)
 
     asyncio.create_task(run_scan())
+    return total_ports
+
+
+@app.on_event("startup")
+async def start_workers():
+    POOL.start()
+
+
+@app.on_event("shutdown")
+def stop_workers():
+    POOL.close()
+
+
+@app.get("/api/workers")
+def workers():
+    return JSONResponse(POOL.stats())
+
+
+@app.on_event("startup")
+async def resume_scans():
+    for ckpt in pending_checkpoints():
+        meta = ckpt.meta
+        if "scan_id" not in meta:
+            continue
+        # checkpoints written before port specs only have start/end
+        spec = meta.get("ports") or f'{meta["start_port"]}-{meta["end_port"]}'
+        try:
+            targets = await expand_target_async(meta["target"], files=False)
+            ports = parse_ports(spec)
+        except ValueError:
+            continue
+        launch_scan(meta["scan_id"], meta["target"], targets, spec, ports,
+                    meta["timestamp"], meta.get("ttl"), meta.get("discover", True))
+
+
+@app.on_event("startup")
+async def purge_jobs():
+    async def purge():
+        while True:
+            for scan_id in STORE.purge_expired():
+                SCAN_STATE.pop(scan_id, None)
+            await asyncio.sleep(60)
+
+    asyncio.create_task(purge())
+
+
+# ---------------------------
+# Start scan (with live progress)
+# ---------------------------
+@app.post("/scan", response_class=HTMLResponse)
+async def start_scan(
+    target: str = Form(...),
+    start: int = Form(1),
+    end: int = Form(1024),
+    ports: str = Form(""),
+    force: bool = Form(False)
+):
+    scan_id = str(uuid.uuid4())
+
+    # a port spec ("22,80,8000-8100", "top-1000", ...) replaces start/end
+    spec = ports.strip() or f"{start}-{end}"
+    try:
+        targets = await expand_target_async(target, files=False)
+        portset = parse_ports(spec)
+    except ValueError as e:
+        return HTMLResponse(error_page(e))
+
+    # force scans every address instead of only the hosts that respond
+    total_ports = launch_scan(scan_id, target, targets, spec, portset,
+                              datetime.now().strftime("%Y-%m-%d %H:%M:%S"), discover=not force)
 
     return HTMLResponse(progress_page(scan_id, total_ports))
 
@@ -89,34 +220,95 @@ async def start_scan(
 # ---------------------------
 @app.get("/progress/{scan_id}")
 def progress(scan_id: str):
-    state = SCAN_STATE.get(scan_id)
+    state = get_scan(scan_id)
     if not state:
         return JSONResponse({"error": "Invalid scan ID"}, status_code=404)
     return JSONResponse({
         "scanned": state["scanned"],
         "total": state["total"],
+        "open": state["open_count"],
+        "window": state.get("window"),
         "done": state["done"],
     })
 
 
+# ---------------------------
+# Live events (progress + new open ports)
+# ---------------------------
+@app.get("/events/{scan_id}")
+def events(scan_id: str):
+    channel = CHANNELS.get(scan_id)
+    if channel:
+        stream = channel.sse()
+    else:
+        state = get_scan(scan_id)
+        if not state:
+            return JSONResponse({"error": "Invalid scan ID"}, status_code=404)
+        stream = finished_sse(state)
+    return StreamingResponse(stream, media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+
 # ---------------------------
 # Results page
 # ---------------------------
 @app.get("/results/{scan_id}", response_class=HTMLResponse)
-def results(scan_id: str):
-    state = SCAN_STATE.get(scan_id)
+def results(scan_id: str, page: int = 1):
+    state = get_scan(scan_id)
     if not state:
         return HTMLResponse("<h3>Invalid scan ID</h3>")
-    return HTMLResponse(results_page(scan_id, state))
+
+    count = STORE.count_results(scan_id)
+    pages = max(1, -(-count // RESULTS_PAGE_SIZE))
+    page = min(max(1, page), pages)
+
+    grouped = defaultdict(list)
+    for e in STORE.get_results(scan_id, (page - 1) * RESULTS_PAGE_SIZE, RESULTS_PAGE_SIZE):
+        grouped[e.pop("host")].append(e)
+
+    view = dict(state, results=grouped, services=STORE.count_services(scan_id))
+    return HTMLResponse(results_page(scan_id, view, page, pages))
 
 
 # ---------------------------
 # History page
 # ---------------------------
 @app.get("/history", response_class=HTMLResponse)
-def history():
-    scans = list(SCAN_STATE.values())
-    return HTMLResponse(history_page(scans))
+def history(page: int = 1):
+    pages = max(1, -(-STORE.count_scans() // HISTORY_PAGE_SIZE))
+    page = min(max(1, page), pages)
+
+    # running scans report live counters from memory
+    scans = [
+        SCAN_STATE.get(s["id"], s)
+        for s in STORE.list_scans((page - 1) * HISTORY_PAGE_SIZE, HISTORY_PAGE_SIZE)
+    ]
+    return HTMLResponse(history_page(scans, page, pages))
+
+
+# ---------------------------
+# Paginated results API
+# ---------------------------
+@app.get("/api/results/{scan_id}")
+def api_results(scan_id: str, offset: int = 0, limit: int = 500):
+    if not get_scan(scan_id):
+        return JSONResponse({"error": "Invalid scan ID"}, status_code=404)
+    limit = min(max(1, limit), 5000)
+    return JSONResponse({
+        "scan_id": scan_id,
+        "offset": offset,
+        "limit": limit,
+        "total": STORE.count_results(scan_id),
+        "results": STORE.get_results(scan_id, offset, limit),
+    })
+
+
+@app.get("/api/search")
+def api_search(host: str = None, port: int = None, offset: int = 0, limit: int = 100):
+    limit = min(max(1, limit), 1000)
+    return JSONResponse(STORE.search(host, port, offset, limit))
 
 
 # ---------------------------
@@ -124,20 +316,19 @@ def history():
 # ---------------------------
 @app.get("/export/json/{scan_id}")
 def export_json_by_id(scan_id: str):
-    state = SCAN_STATE.get(scan_id)
-    if not state:
+    if not get_scan(scan_id):
         return JSONResponse({"error": "Invalid scan ID"}, status_code=404)
 
-    data = []
-    for host, entries in state["results"].items():
-        for e in entries:
-            data.append({
-                "host": host,
-                "port": e["port"],
-                "service": e["service"],
-                "banner": e["banner"]
-            })
-    return JSONResponse(data)
+    def rows():
+        # serialize one entry at a time instead of building the whole list
+        yield "["
+        first = True
+        for e in STORE.iter_results(scan_id):
+            yield ("" if first else ",") + json.dumps(e)
+            first = False
+        yield "]"
+
+    return StreamingResponse(rows(), media_type="application/json")
 
 
 # ---------------------------
@@ -145,44 +336,126 @@ def export_json_by_id(scan_id: str):
 # ---------------------------
 @app.get("/export/csv/{scan_id}")
 def export_csv_by_id(scan_id: str):
-    state = SCAN_STATE.get(scan_id)
-    if not state:
+    if not get_scan(scan_id):
         return HTMLResponse("Invalid scan ID", status_code=404)
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["host", "port", "service", "banner"])
-
-    for host, entries in state["results"].items():
-        for e in entries:
-            writer.writerow([host, e["port"], e["service"], e["banner"]])
+    def rows():
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(CSV_FIELDS)
+        for e in STORE.iter_results(scan_id):
+            writer.writerow([e.get(k, "") for k in CSV_FIELDS])
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+        yield output.getvalue()
 
-    output.seek(0)
     return StreamingResponse(
-        output,
+        rows(),
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=portxcan_results.csv"}
     )
 
 
 # ---------------------------
-# JSON API (standalone)
+# JSON job API
 # ---------------------------
+# Scans are submitted as jobs and return at once; status and results are
+# polled (cursor pagination) or streamed as NDJSON. API jobs are deleted
+# JOB_TTL seconds after they finish.
+JOB_TTL = float(os.environ.get("PORTXCAN_JOB_TTL", 24 * 3600))
+JOB_PAGE_LIMIT = 5000
+
+
+def job_status(scan_id, state):
+    if not state["done"]:
+        status = "running" if POOL.is_running(scan_id) else "queued"
+    elif state.get("error"):
+        status = "error"
+    else:
+        status = "done"
+    return {
+        "job_id": scan_id,
+        "status": status,
+        "target": state["target"],
+        "start_port": state["start_port"],
+        "end_port": state["end_port"],
+        "ports": state.get("ports"),
+        "scanned": state["scanned"],
+        "total": state["total"],
+        "open_count": state["open_count"],
+        "error": state.get("error"),
+    }
+
+
+@app.post("/api/jobs")
 @app.get("/api/scan")
-async def api_scan(target: str, start: int = 1, end: int = 1024):
-    targets = expand_target(target)
-    all_results = []
-
-    for host in targets:
-        scanner = AsyncPortScanner(
-            target=host,
-            start_port=start,
-            end_port=end,
-            timeout=1
-        )
-        results = await scanner.run()
-        for r in results:
-            r["host"] = host
-        all_results.extend(results)
-
-    return JSONResponse(all_results)
+async def api_submit(target: str, start: int = 1, end: int = 1024, ports: str = None,
+                     force: bool = False):
+    if not ports and not 1 <= start <= end <= 65535:
+        return JSONResponse({"error": "Invalid port range"}, status_code=400)
+    spec = ports.strip() if ports else f"{start}-{end}"
+    try:
+        targets = await expand_target_async(target, files=False)
+        portset = parse_ports(spec)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    scan_id = str(uuid.uuid4())
+    launch_scan(scan_id, target, targets, spec, portset,
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S"), JOB_TTL, discover=not force)
+    return JSONResponse(job_status(scan_id, SCAN_STATE[scan_id]), status_code=202, headers={
+        "Location": f"/api/jobs/{scan_id}",
+    })
+
+
+@app.get("/api/jobs/{scan_id}")
+def api_job(scan_id: str):
+    state = get_scan(scan_id)
+    if not state:
+        return JSONResponse({"error": "Unknown job"}, status_code=404)
+    return JSONResponse(job_status(scan_id, state))
+
+
+@app.get("/api/jobs/{scan_id}/results")
+def api_job_results(scan_id: str, cursor: int = 0, limit: int = 500):
+    """
+    One page of results in discovery order. Pass `next_cursor` back to
+    get the next page; `complete` is true once the job is finished and
+    every result has been returned.
+    """
+    state = get_scan(scan_id)
+    if not state:
+        return JSONResponse({"error": "Unknown job"}, status_code=404)
+    done = state["done"]
+    limit = min(max(1, limit), JOB_PAGE_LIMIT)
+    results, next_cursor = STORE.results_after(scan_id, cursor, limit)
+    return JSONResponse({
+        "job_id": scan_id,
+        "results": results,
+        "next_cursor": next_cursor,
+        "complete": done and len(results) < limit,
+    })
+
+
+@app.get("/api/jobs/{scan_id}/results.ndjson")
+def api_job_stream(scan_id: str, cursor: int = 0, follow: bool = True):
+    """All results as NDJSON; with `follow` the stream stays open until the job ends."""
+    if not get_scan(scan_id):
+        return JSONResponse({"error": "Unknown job"}, status_code=404)
+
+    async def rows():
+        position = cursor
+        while True:
+            # read the flag first: a job seen as done has flushed everything
+            state = get_scan(scan_id)
+            done = not follow or state is None or state["done"]
+            results, position = STORE.results_after(scan_id, position, 1000)
+            for e in results:
+                yield json.dumps(e) + "\n"
+            if len(results) < 1000:
+                if done:
+                    return
+                await asyncio.sleep(0.5)
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
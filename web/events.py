@@ -0,0 +1,100 @@
+"""
+Push channel from a running scan to the browsers watching it.
+"""
+import asyncio
+import json
+import time
+
+
+class _Subscriber:
+    def __init__(self, maxsize):
+        self.results = asyncio.Queue(maxsize)
+        self.wake = asyncio.Event()
+        self.lagged = False
+
+
+class ScanChannel:
+    """
+    Fan-out of one scan's progress and results. Publishing never blocks:
+    progress is a single latest value that each subscriber reads when it
+    gets around to it, and results go into a bounded per-subscriber
+    queue. A subscriber whose queue fills up is marked lagged and stops
+    receiving results (the browser then reloads them from the database),
+    so a slow client can never stall the scan.
+    """
+
+    def __init__(self, queue_size=500):
+        self.queue_size = queue_size
+        self.progress = {}
+        self.done = False
+        self._subs = set()
+
+    def _wake(self):
+        for sub in self._subs:
+            sub.wake.set()
+
+    def publish_progress(self, **progress):
+        self.progress = progress
+        self._wake()
+
+    def publish_result(self, entry):
+        for sub in self._subs:
+            if sub.lagged:
+                continue
+            try:
+                sub.results.put_nowait(entry)
+            except asyncio.QueueFull:
+                sub.lagged = True
+            sub.wake.set()
+
+    def close(self):
+        self.done = True
+        self._wake()
+
+    async def sse(self, tick=0.25, heartbeat=15.0):
+        """Server-sent events; progress is coalesced to one event per `tick`."""
+        sub = _Subscriber(self.queue_size)
+        self._subs.add(sub)
+        sub.wake.set()
+        sent_progress = None
+        told_lagged = False
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(sub.wake.wait(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                sub.wake.clear()
+                started = time.monotonic()
+
+                while not sub.results.empty():
+                    yield _event("result", sub.results.get_nowait())
+                if sub.lagged and not told_lagged:
+                    told_lagged = True
+                    yield _event("lagged", {})
+                if self.progress and self.progress != sent_progress:
+                    sent_progress = self.progress
+                    yield _event("progress", sent_progress)
+                if self.done:
+                    yield _event("done", {})
+                    return
+
+                # let further ticks pile up into the next event
+                await asyncio.sleep(max(0, tick - (time.monotonic() - started)))
+        finally:
+            self._subs.discard(sub)
+
+
+def _event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+def finished_sse(state):
+    """Event stream for a scan that is no longer running."""
+    yield _event("progress", {
+        "scanned": state["scanned"],
+        "total": state["total"],
+        "open": state["open_count"],
+    })
+    yield _event("done", {})
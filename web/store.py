@@ -0,0 +1,252 @@
+"""
+SQLite-backed scan history for the web UI.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+
+DB_PATH = os.path.join(".portxcan", "portxcan.db")
+
+RESULT_FIELDS = ["host", "port", "service", "product", "version", "banner", "state"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id          TEXT PRIMARY KEY,
+    target      TEXT NOT NULL,
+    start_port  INTEGER,
+    end_port    INTEGER,
+    ports       TEXT,
+    timestamp   TEXT,
+    created     REAL NOT NULL,
+    done        INTEGER NOT NULL DEFAULT 0,
+    scanned     INTEGER NOT NULL DEFAULT 0,
+    total       INTEGER NOT NULL DEFAULT 0,
+    open_count  INTEGER NOT NULL DEFAULT 0,
+    finished    REAL,
+    ttl         REAL
+);
+CREATE INDEX IF NOT EXISTS idx_scans_created ON scans(created);
+
+CREATE TABLE IF NOT EXISTS results (
+    scan_id  TEXT NOT NULL,
+    host     TEXT NOT NULL,
+    port     INTEGER NOT NULL,
+    service  TEXT,
+    product  TEXT,
+    version  TEXT,
+    banner   TEXT,
+    state    TEXT NOT NULL DEFAULT 'open'
+);
+CREATE INDEX IF NOT EXISTS idx_results_scan ON results(scan_id, host, port);
+CREATE INDEX IF NOT EXISTS idx_results_seq ON results(scan_id);
+CREATE INDEX IF NOT EXISTS idx_results_host ON results(host);
+CREATE INDEX IF NOT EXISTS idx_results_port ON results(port);
+"""
+
+_SCAN_COLS = "id, target, start_port, end_port, ports, timestamp, done, scanned, total, open_count"
+
+
+def _scan_row(row):
+    keys = [c.strip() for c in _SCAN_COLS.split(",")]
+    scan = dict(zip(keys, row))
+    scan["done"] = bool(scan["done"])
+    return scan
+
+
+class ScanStore:
+    """
+    One shared connection in WAL mode, so readers (history, exports) never
+    block the scan tasks writing result batches. Calls are short and
+    serialized by a lock, which keeps them safe from the threadpool that
+    runs sync endpoints.
+    """
+
+    def __init__(self, path=DB_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def _migrate(self):
+        # columns added after the first release of the schema
+        cols = {r[1] for r in self._db.execute("PRAGMA table_info(scans)")}
+        if cols:
+            for name, kind in (("finished", "REAL"), ("ttl", "REAL"), ("ports", "TEXT")):
+                if name not in cols:
+                    self._db.execute(f"ALTER TABLE scans ADD COLUMN {name} {kind}")
+        cols = {r[1] for r in self._db.execute("PRAGMA table_info(results)")}
+        if cols and "state" not in cols:
+            # only open ports were stored before
+            self._db.execute("ALTER TABLE results ADD COLUMN state TEXT NOT NULL DEFAULT 'open'")
+
+    # ── Writes ──────────────────────────────────────
+    def create_scan(self, scan, ttl=None):
+        """`ttl` (seconds) makes the scan expire that long after it finishes."""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO scans (id, target, start_port, end_port, ports, timestamp, created, total, ttl) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET done = 0, open_count = 0, finished = NULL",
+                (scan["id"], scan["target"], scan["start_port"], scan["end_port"],
+                 scan.get("ports"), scan["timestamp"], time.time(), scan["total"], ttl),
+            )
+            # a resumed scan replays its results, start from a clean slate
+            self._db.execute("DELETE FROM results WHERE scan_id = ?", (scan["id"],))
+
+    def add_results(self, scan_id, entries):
+        if not entries:
+            return
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO results (scan_id, host, port, service, product, version, banner, state) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(scan_id, *(e.get(k, "") for k in RESULT_FIELDS[:-1]), e.get("state", "open"))
+                 for e in entries],
+            )
+
+    def finish_scan(self, scan_id, scanned, total, open_count):
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE scans SET done = 1, scanned = ?, total = ?, open_count = ?, "
+                "finished = ? WHERE id = ?",
+                (scanned, total, open_count, time.time(), scan_id),
+            )
+
+    def purge_expired(self):
+        """Deletes finished scans whose TTL ran out; returns their ids."""
+        with self._lock, self._db:
+            expired = [r[0] for r in self._db.execute(
+                "SELECT id FROM scans WHERE done = 1 AND ttl IS NOT NULL AND finished + ttl < ?",
+                (time.time(),),
+            )]
+            for scan_id in expired:
+                self._db.execute("DELETE FROM results WHERE scan_id = ?", (scan_id,))
+                self._db.execute("DELETE FROM scans WHERE id = ?", (scan_id,))
+        return expired
+
+    # ── Reads ───────────────────────────────────────
+    def get_scan(self, scan_id):
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {_SCAN_COLS} FROM scans WHERE id = ?", (scan_id,)
+            ).fetchone()
+        return _scan_row(row) if row else None
+
+    def count_scans(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM scans").fetchone()[0]
+
+    def list_scans(self, offset=0, limit=20):
+        """Newest first."""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {_SCAN_COLS} FROM scans ORDER BY created DESC LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+        return [_scan_row(r) for r in rows]
+
+    def count_results(self, scan_id):
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM results WHERE scan_id = ?", (scan_id,)
+            ).fetchone()[0]
+
+    def count_services(self, scan_id):
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(DISTINCT service) FROM results WHERE scan_id = ?", (scan_id,)
+            ).fetchone()[0]
+
+    def get_results(self, scan_id, offset=0, limit=500):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT host, port, service, product, version, banner, state FROM results "
+                "WHERE scan_id = ? ORDER BY host, port LIMIT ? OFFSET ?",
+                (scan_id, limit, offset),
+            ).fetchall()
+        return [dict(zip(RESULT_FIELDS, r)) for r in rows]
+
+    def iter_results(self, scan_id, batch=1000):
+        """All results of a scan, fetched in keyset-paginated batches."""
+        last = ("", -1)
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT host, port, service, product, version, banner, state FROM results "
+                    "WHERE scan_id = ? AND (host > ? OR (host = ? AND port > ?)) "
+                    "ORDER BY host, port LIMIT ?",
+                    (scan_id, last[0], last[0], last[1], batch),
+                ).fetchall()
+            if not rows:
+                return
+            for r in rows:
+                yield dict(zip(RESULT_FIELDS, r))
+            last = (rows[-1][0], rows[-1][1])
+
+    def results_after(self, scan_id, cursor=0, limit=500):
+        """
+        Results in the order they were found, starting after `cursor`.
+        Returns (results, next_cursor); results found later never sort
+        before a cursor already handed out, so polling with it is safe
+        while the scan is still running.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT rowid, host, port, service, product, version, banner, state FROM results "
+                "WHERE scan_id = ? AND rowid > ? ORDER BY rowid LIMIT ?",
+                (scan_id, cursor, limit),
+            ).fetchall()
+        if rows:
+            cursor = rows[-1][0]
+        return [dict(zip(RESULT_FIELDS, r[1:])) for r in rows], cursor
+
+    def search(self, host=None, port=None, offset=0, limit=100):
+        """Results across all scans, filtered by host and/or port."""
+        clauses, args = [], []
+        if host:
+            clauses.append("r.host = ?")
+            args.append(host)
+        if port is not None:
+            clauses.append("r.port = ?")
+            args.append(port)
+        where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT r.scan_id, s.timestamp, r.host, r.port, r.service, r.product, "
+                "r.version, r.banner, r.state FROM results r JOIN scans s ON s.id = r.scan_id "
+                f"{where} ORDER BY s.created DESC, r.host, r.port LIMIT ? OFFSET ?",
+                (*args, limit, offset),
+            ).fetchall()
+        return [dict(zip(["scan_id", "timestamp"] + RESULT_FIELDS, r)) for r in rows]
+
+
+class ResultBatcher:
+    """Buffers results of one scan and inserts them in batches."""
+
+    def __init__(self, store, scan_id, batch=200, interval=1.0):
+        self.store = store
+        self.scan_id = scan_id
+        self.batch = batch
+        self.interval = interval
+        self._buf = []
+        self._last = time.monotonic()
+
+    def add(self, entry):
+        self._buf.append(entry)
+        if len(self._buf) >= self.batch or time.monotonic() - self._last >= self.interval:
+            self.flush()
+
+    def tick(self):
+        """Flushes a partial batch once `interval` has passed."""
+        if self._buf and time.monotonic() - self._last >= self.interval:
+            self.flush()
+
+    def flush(self):
+        buf, self._buf = self._buf, []
+        self.store.add_results(self.scan_id, buf)
+        self._last = time.monotonic()
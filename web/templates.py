@@ -1,6 +1,7 @@
 """
 PortXcan Web UI — Glassmorphism Design System
 """
+from html import escape
 
 
 # ── Service colour classification ─────────────────
@@ -191,12 +192,15 @@ def index_page():
   <form method="post" action="/scan" onsubmit="document.getElementById('ld').style.display='block'">
     <div style="margin-bottom:16px" class="fu1">
       <label>Target</label>
-      <input class="gi" name="target" placeholder="IP / Hostname / CIDR" required>
+      <input class="gi" name="target" placeholder="IP / Hostname / CIDR / range, !exclude" required>
     </div>
-    <div style="display:flex;gap:12px;margin-bottom:28px" class="fu2">
-      <div style="flex:1"><label>Start Port</label><input class="gi" name="start" value="1" type="number"></div>
-      <div style="flex:1"><label>End Port</label><input class="gi" name="end" value="1024" type="number"></div>
+    <div style="margin-bottom:28px" class="fu2">
+      <label>Ports</label>
+      <input class="gi" name="ports" value="top-1000,common" placeholder="22,80,8000-8100 / top-100 / top-1000 / web, databases / all">
     </div>
+    <label style="display:flex;gap:8px;align-items:center;margin:-12px 0 24px" class="fu2">
+      <input type="checkbox" name="force" value="true"> Scan every address, even hosts that do not respond
+    </label>
     <button type="submit" class="btn fu3" style="width:100%;justify-content:center;font-size:1rem">⚡ Start Scan</button>
   </form>
   <div id="ld" style="display:none;text-align:center;margin-top:24px">
@@ -208,6 +212,12 @@ def index_page():
     return _page("PortXcan | Network Scanner", body, "home")
 
 
+# ── Error page ────────────────────────────────────
+def error_page(message):
+    # parse errors quote the submitted target / port spec back
+    return f"<h3>Error: {escape(str(message))}</h3>"
+
+
 # ── Scan progress page ───────────────────────────
 def progress_page(scan_id, total):
     body = f"""
@@ -219,38 +229,58 @@ def progress_page(scan_id, total):
   <div style="margin:32px 0"><div class="sv grad" id="pct" style="font-size:3.5rem">0%</div></div>
   <div class="pt" style="margin-bottom:16px"><div class="pf" id="fill"></div></div>
   <p style="color:#334155;font-size:.8rem" id="det">0 / {total} ports</p>
+  <div id="live" style="margin-top:24px;max-height:240px;overflow-y:auto;text-align:left"></div>
 </div>
 </div>"""
 
+    # progress and new open ports are pushed over server-sent events;
+    # polling is only the fallback for browsers/proxies that break SSE
     js = """
 <script>
-const SID="__SID__",TOT=__TOT__;
-async function poll(){try{
-const r=await fetch("/progress/"+SID),d=await r.json(),
-p=Math.min(100,Math.floor((d.scanned/TOT)*100));
-document.getElementById("fill").style.width=p+"%";
-document.getElementById("pct").textContent=p+"%";
-document.getElementById("st").textContent="Scanning ports...";
-document.getElementById("det").textContent=d.scanned+" / "+TOT+" ports";
-if(d.done){document.getElementById("st").textContent="Complete! Redirecting...";
-document.getElementById("st").classList.remove("pulse");
-setTimeout(()=>window.location="/results/"+SID,800)}}catch(e){}}
-setInterval(poll,800);poll();
+const SID="__SID__",TOT=__TOT__,$=id=>document.getElementById(id);
+function show(d){
+const tot=d.total||TOT,p=tot?Math.min(100,Math.floor((d.scanned/tot)*100)):100;
+$("fill").style.width=p+"%";$("pct").textContent=p+"%";
+$("st").textContent="Scanning ports...";
+$("det").textContent=d.scanned+" / "+tot+" ports"+(d.open?" \u2022 "+d.open+" open":"")+(d.window&&d.scanned<d.total?" \u2022 "+d.window+" in flight":"")}
+function finish(){$("st").textContent="Complete! Redirecting...";
+$("st").classList.remove("pulse");
+setTimeout(()=>window.location="/results/"+SID,800)}
+function found(e){const row=document.createElement("div");
+row.style.cssText="padding:4px 0;color:#94a3b8;font-size:.85rem";
+const badge=document.createElement("span");badge.className="badge";badge.textContent=e.port;
+row.append(badge," "+e.host+" \u2014 "+e.service);
+const live=$("live");if(live.children.length>=200)live.lastChild.remove();
+live.prepend(row)}
+async function poll(){try{const r=await fetch("/progress/"+SID),d=await r.json();
+show(d);if(d.done)finish();else setTimeout(poll,800)}catch(e){setTimeout(poll,800)}}
+if(window.EventSource){const es=new EventSource("/events/"+SID);let ok=false;
+es.addEventListener("progress",m=>{ok=true;show(JSON.parse(m.data))});
+es.addEventListener("result",m=>found(JSON.parse(m.data)));
+es.addEventListener("done",()=>{es.close();finish()});
+es.onerror=()=>{if(!ok){es.close();poll()}}}else poll();
 </script>""".replace("__SID__", scan_id).replace("__TOT__", str(total))
 
     return _page("PortXcan | Scanning", body, "", "", js)
 
 
-# ── Results page ──────────────────────────────────
-def results_page(scan_id, state):
-    entries = []
-    for host, items in state["results"].items():
-        for e in items:
-            entries.append({**e, "host": host})
+# ── Pagination ────────────────────────────────────
+def _pager(base, page, pages):
+    if pages <= 1:
+        return ""
+    prev = f'<a href="{base}?page={page - 1}" class="btn-sm btn-ghost">← Prev</a>' if page > 1 else ""
+    nxt = f'<a href="{base}?page={page + 1}" class="btn-sm btn-ghost">Next →</a>' if page < pages else ""
+    return f"""
+<div class="fu4" style="display:flex;gap:12px;align-items:center;justify-content:center;margin-top:24px">
+  {prev}<span class="sub">Page {page} of {pages}</span>{nxt}
+</div>"""
+
 
+# ── Results page ──────────────────────────────────
+def results_page(scan_id, state, page=1, pages=1):
     total = state["total"]
-    opened = len(entries)
-    services = len(set(e["service"] for e in entries)) if entries else 0
+    opened = state["open_count"]
+    services = state["services"]
 
     stats = f"""
 <div class="stats fu">
@@ -259,7 +289,7 @@ def results_page(scan_id, state):
   <div class="glass-sm sc"><div class="sv grad">{services}</div><div class="sl">Services</div></div>
 </div>"""
 
-    if not entries:
+    if not opened:
         tables = '<div class="glass fu1" style="padding:40px;text-align:center"><p class="sub">No open ports detected.</p></div>'
     else:
         tables = ""
@@ -267,14 +297,16 @@ def results_page(scan_id, state):
         for host, items in state["results"].items():
             rows = ""
             for e in items:
+                # banners and versions come straight off the network
                 cls = _svc_class(e["service"])
-                banner = e["banner"] if e["banner"] != "Not disclosed" else '<span style="color:#334155">—</span>'
-                rows += f'<tr><td><span class="badge">{e["port"]}</span></td><td class="{cls}" style="font-weight:500">{e["service"]}</td><td style="color:#94a3b8">{banner}</td></tr>'
+                banner = escape(e["banner"]) if e["banner"] != "Not disclosed" else '<span style="color:#334155">—</span>'
+                product = escape(" ".join(filter(None, (e.get("product"), e.get("version"))))) or '<span style="color:#334155">—</span>'
+                rows += f'<tr><td><span class="badge">{e["port"]}</span></td><td class="{cls}" style="font-weight:500">{escape(e["service"])}</td><td>{product}</td><td style="color:#94a3b8">{banner}</td></tr>'
             tables += f"""
 <div class="glass fu{delay}" style="padding:28px;margin-bottom:20px">
-  <h2 style="margin-bottom:16px;font-size:1.1rem;color:#7dd3fc">🖥️ {host}</h2>
+  <h2 style="margin-bottom:16px;font-size:1.1rem;color:#7dd3fc">🖥️ {escape(str(host))}</h2>
   <div style="overflow-x:auto"><table class="gt">
-    <thead><tr><th>Port</th><th>Service</th><th>Banner</th></tr></thead>
+    <thead><tr><th>Port</th><th>Service</th><th>Product</th><th>Banner</th></tr></thead>
     <tbody>{rows}</tbody></table></div>
 </div>"""
             delay = min(delay + 1, 4)
@@ -289,13 +321,13 @@ def results_page(scan_id, state):
     body = f"""
 <div class="page">
   <h1 class="fu" style="margin-bottom:24px">Scan Results</h1>
-  {stats}{tables}{export}
+  {stats}{tables}{_pager(f"/results/{scan_id}", page, pages)}{export}
 </div>"""
     return _page("PortXcan | Results", body, "home")
 
 
 # ── History page ──────────────────────────────────
-def history_page(scans):
+def history_page(scans, page=1, pages=1):
     if not scans:
         cards = """
 <div class="glass fu1" style="padding:48px;text-align:center">
@@ -305,11 +337,11 @@ def history_page(scans):
     else:
         cards = '<div style="display:grid;gap:16px">'
         delay = 1
-        for s in reversed(scans):
+        for s in scans:
             sid = s["id"]
-            target = s.get("target", "N/A")
-            ts = s.get("timestamp", "")
-            ports = f'{s.get("start_port", "?")}-{s.get("end_port", "?")}'
+            target = escape(s.get("target", "N/A"))
+            ts = escape(s.get("timestamp", ""))
+            ports = escape(s.get("ports") or f'{s.get("start_port", "?")}-{s.get("end_port", "?")}')
             opened = s.get("open_count", 0)
             done = s.get("done", False)
             status = f'<span style="color:#34d399">✓ {opened} open</span>' if done else '<span class="pulse" style="color:#fbbf24">⏳ In progress</span>'
@@ -331,6 +363,6 @@ def history_page(scans):
 <div class="page">
   <h1 class="fu" style="margin-bottom:8px">Scan History</h1>
   <p class="sub fu" style="margin-bottom:32px">All your recent scans in one place</p>
-  {cards}
+  {cards}{_pager("/history", page, pages)}
 </div>"""
     return _page("PortXcan | History", body, "history")
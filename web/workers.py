@@ -0,0 +1,242 @@
+"""
+Out-of-process scan workers for the web backend.
+"""
+import asyncio
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+from portxcan.checkpoint import Checkpoint
+from portxcan.discovery import HostDiscovery
+from portxcan.engine import ScanEngine
+from portxcan.sharding import ShardedScanner
+from portxcan.targets import TargetSet
+
+
+WORKERS = int(os.environ.get("PORTXCAN_WORKERS", min(4, os.cpu_count() or 1)))
+MAX_SOCKETS = int(os.environ.get("PORTXCAN_MAX_SOCKETS", 2000))
+# processes each scan is split across (see portxcan.sharding)
+SHARDS = int(os.environ.get("PORTXCAN_SHARDS", 1))
+# connection attempts/s across the pool, and per destination host
+RATE = float(os.environ.get("PORTXCAN_RATE", 0)) or None
+HOST_RATE = float(os.environ.get("PORTXCAN_HOST_RATE", 0)) or None
+
+# progress ticks crossing the process boundary are coalesced to this rate
+PROGRESS_INTERVAL = 0.2
+
+
+def _run_job(job, events, concurrency, banner_concurrency, shards, rate, host_rate):
+    job_id = job["id"]
+    last = 0.0
+
+    def progress_cb(scanned, total):
+        nonlocal last
+        now = time.monotonic()
+        if now - last >= PROGRESS_INTERVAL or scanned >= total:
+            last = now
+            events.put((job_id, "progress", (scanned, total, engine.window)))
+
+    def result_cb(entry):
+        events.put((job_id, "result", entry))
+
+    checkpoint = None
+    if job.get("checkpoint"):
+        checkpoint = Checkpoint(job["checkpoint"], job.get("meta"))
+
+    # dead hosts are dropped before the scan unless the job forces them;
+    # the shrunk total goes out with the first progress tick. A resumed
+    # job reuses the live hosts its checkpoint was written for instead of
+    # discovering a different set
+    hosts = job["hosts"]
+    if job.get("discover") and len(hosts) > 1:
+        saved = checkpoint.pending_meta() if checkpoint else None
+        if saved and "alive" in saved:
+            hosts = TargetSet(saved["alive"])
+        else:
+            hosts = asyncio.run(HostDiscovery(hosts, concurrency=concurrency).run())
+        if checkpoint:
+            checkpoint.meta["alive"] = list(hosts.spans)
+        events.put((job_id, "progress", (0, len(hosts) * len(job["ports"]), None)))
+        if not hosts:
+            return
+
+    # shards split the job's socket budget between them; within its share
+    # a scan's AIMD window starts at half and grows to all of it while
+    # probes are answered
+    share = max(1, concurrency // shards)
+    options = dict(
+        hosts=hosts,
+        ports=job["ports"],
+        timeout=job.get("timeout", 1),
+        concurrency=max(1, share // 2),
+        max_concurrency=share,
+        autotune=True,
+        banner_concurrency=max(1, banner_concurrency // shards),
+        progress_cb=progress_cb,
+        result_cb=result_cb,
+        keep_results=False,
+        checkpoint=checkpoint,
+        rate=rate,
+        host_rate=host_rate
+    )
+    if shards > 1:
+        engine = ShardedScanner(shards=shards, **options)
+    else:
+        engine = ScanEngine(**options)
+    asyncio.run(engine.run())
+    events.put((job_id, "progress", (engine.scanned, engine.total, engine.window)))
+
+
+def _worker_main(jobs, events, concurrency, banner_concurrency, shards, rate, host_rate):
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        events.put((job["id"], "started", os.getpid()))
+        try:
+            _run_job(job, events, concurrency, banner_concurrency, shards, rate, host_rate)
+        except Exception as e:
+            events.put((job["id"], "error", repr(e)))
+        else:
+            events.put((job["id"], "done", None))
+
+
+class WorkerError(Exception):
+    pass
+
+
+class WorkerPool:
+    """
+    A fixed set of worker processes, each running one scan at a time on
+    its own event loop. Jobs wait in a shared queue, so at most `workers`
+    scans run at once, and every job gets an equal share of `max_sockets`
+    (connect slots plus banner readers), which bounds the sockets open
+    across the whole pool. Progress and results come back over a queue
+    and are dispatched to the job's callbacks on the web event loop.
+    """
+
+    def __init__(self, workers=WORKERS, max_sockets=MAX_SOCKETS, shards=SHARDS,
+                 rate=RATE, host_rate=HOST_RATE):
+        self.workers = max(1, workers)
+        self.shards = max(1, shards)
+        # like sockets, the global rate is split evenly between the workers
+        self.rate = rate / self.workers if rate else None
+        self.host_rate = host_rate
+        per_job = max(2, max_sockets // self.workers)
+        self.banner_concurrency = max(1, per_job // 4)
+        self.concurrency = per_job - self.banner_concurrency
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._jobs = self._ctx.Queue()
+        self._events = self._ctx.Queue()
+        self._procs = []
+        self._handlers = {}
+        self._running = {}
+        self._loop = None
+        self._reader = None
+        self._closed = False
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        for _ in range(self.workers):
+            self._spawn()
+        self._reader = threading.Thread(target=self._read_events, daemon=True)
+        self._reader.start()
+
+    def _spawn(self):
+        p = self._ctx.Process(
+            target=_worker_main,
+            args=(self._jobs, self._events, self.concurrency, self.banner_concurrency,
+                  self.shards, self.rate, self.host_rate),
+            # daemonic processes cannot start shard processes of their own
+            daemon=self.shards == 1,
+        )
+        p.start()
+        self._procs.append(p)
+
+    def submit(self, job, progress_cb=None, result_cb=None):
+        """Queues a scan job; returns a future resolved when it finishes."""
+        future = self._loop.create_future()
+        self._handlers[job["id"]] = (future, progress_cb, result_cb)
+        self._jobs.put(job)
+        return future
+
+    def is_running(self, job_id):
+        return job_id in self._running
+
+    def stats(self):
+        return {
+            "workers": len(self._procs),
+            "running": len(self._running),
+            "queued": len(self._handlers) - len(self._running),
+            "sockets_per_job": self.concurrency + self.banner_concurrency,
+        }
+
+    def _read_events(self):
+        last_reap = time.monotonic()
+        while True:
+            try:
+                msg = self._events.get(timeout=1.0)
+            except queue.Empty:
+                msg = ()
+            except (EOFError, OSError):
+                return
+            if msg is None:
+                return
+            if msg:
+                self._loop.call_soon_threadsafe(self._dispatch, *msg)
+            if time.monotonic() - last_reap >= 1.0:
+                last_reap = time.monotonic()
+                self._loop.call_soon_threadsafe(self._reap)
+
+    def _dispatch(self, job_id, kind, payload):
+        handler = self._handlers.get(job_id)
+        if handler is None:
+            return
+        future, progress_cb, result_cb = handler
+
+        if kind == "started":
+            self._running[job_id] = payload
+        elif kind == "progress":
+            if progress_cb:
+                progress_cb(*payload)
+        elif kind == "result":
+            if result_cb:
+                result_cb(payload)
+        else:
+            del self._handlers[job_id]
+            self._running.pop(job_id, None)
+            if future.done():
+                return
+            if kind == "error":
+                future.set_exception(WorkerError(payload))
+            else:
+                future.set_result(None)
+
+    def _reap(self):
+        # a crashed worker fails its job and is replaced
+        for p in list(self._procs):
+            if p.is_alive():
+                continue
+            self._procs.remove(p)
+            for job_id, pid in list(self._running.items()):
+                if pid == p.pid:
+                    self._dispatch(job_id, "error", f"worker {pid} exited with code {p.exitcode}")
+            if not self._closed:
+                self._spawn()
+
+    def close(self, timeout=5.0):
+        self._closed = True
+        for _ in self._procs:
+            self._jobs.put(None)
+        for p in self._procs:
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
+        self._events.put(None)
+        for future, _, _ in self._handlers.values():
+            future.cancel()
+        self._handlers.clear()
+        self._running.clear()